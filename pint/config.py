@@ -12,6 +12,10 @@ _auth = 'pint'
 # PINT install dir
 _install_dir = os.path.abspath(os.path.dirname(__file__))
 
+# A directory set with set_cache_dir(), used instead of the appdirs
+# user_cache_dir if not None
+_cache_dir = None
+
 def datapath(fname):
     """Returns the full path to the requested data file.  Will first search
     the appdirs user_data_dir (typically $HOME/.local/share/pint on linux)
@@ -30,3 +34,24 @@ def datapath(fname):
 
     return None
 
+
+def set_cache_dir(path):
+    """Use path as the PINT cache dir instead of the appdirs user_cache_dir.
+    Pass None to go back to the default."""
+    global _cache_dir
+    _cache_dir = path
+
+def cachepath(fname):
+    """Returns the full path to a file in the PINT cache dir (the appdirs
+    user_cache_dir, typically $HOME/.cache/pint on linux, or the dir set
+    with set_cache_dir()), creating the dir if necessary.  Returns None if
+    the dir can not be created."""
+    cache_dir = _cache_dir
+    if cache_dir is None:
+        cache_dir = appdirs.user_cache_dir(_app,_auth)
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            return None
+    return os.path.join(cache_dir,fname)
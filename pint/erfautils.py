@@ -31,7 +31,156 @@ OM = 1.00273781191135448 * 2.0 * np.pi / SECS_PER_DAY
 # arcsec to radians
 asec2rad = 4.84813681109536e-06
 
-def gcrs_posvel_from_itrf(loc, toas, obsname='obs'):
+# Optional TerrestrialRotation grid used by gcrs_posvel_from_itrf() when no
+# grid is given.  None computes the Earth orientation exactly at each time.
+eop_grid = None
+
+_iers_columns = {}
+
+def iers_interp(mjds, column):
+    """Linearly interpolate a column of the IERS table at the given MJDs."""
+    if column not in _iers_columns:
+        if 'MJD' not in _iers_columns:
+            _iers_columns['MJD'] = np.asarray(iers_tab['MJD'],
+                                              dtype=np.float64)
+        _iers_columns[column] = np.asarray(iers_tab[column], dtype=np.float64)
+    return np.interp(mjds, _iers_columns['MJD'], _iers_columns[column])
+
+
+def earth_orientation(tt1, tt2, mjds):
+    """Return the (N x 3 x 3) GCRS to CIRS (precession-nutation) and polar
+    motion matrices at the TT Julian dates tt1 + tt2 (arrays), with the
+    IERS corrections interpolated at mjds."""
+    # Get x, y coords of Celestial Intermediate Pole and CIO locator s
+    X, Y, S = erfa.xys00a(tt1, tt2)
+    # Get dX and dY from IERS A in arcsec and convert to radians
+    #dX = iers_interp(mjds, 'dX_2000A_B') * asec2rad
+    #dY = iers_interp(mjds, 'dY_2000A_B') * asec2rad
+    # Get dX and dY from IERS B in arcsec and convert to radians
+    dX = iers_interp(mjds, 'dX_2000A') * asec2rad
+    dY = iers_interp(mjds, 'dY_2000A') * asec2rad
+    # Get GCRS to CIRS matrices
+    rc2i = erfa.c2ixys(X+dX, Y+dY, S)
+    # Gets the TIO locator s'
+    sp = erfa.sp00(tt1, tt2)
+    # Get X and Y from IERS A in arcsec and convert to radians
+    #xp = iers_interp(mjds, 'PM_X_B') * asec2rad
+    #yp = iers_interp(mjds, 'PM_Y_B') * asec2rad
+    # Get X and Y from IERS B in arcsec and convert to radians
+    xp = iers_interp(mjds, 'PM_x') * asec2rad
+    yp = iers_interp(mjds, 'PM_y') * asec2rad
+    # Get the polar motion matrices
+    rpm = erfa.pom00(xp, yp, sp)
+    return rc2i, rpm
+
+
+class TerrestrialRotation(object):
+    """Rotation from GCRS to ITRS coordinates, cached on a time grid.
+
+    The rotation is the product of the precession-nutation (GCRS to CIRS),
+    Earth rotation angle and polar motion matrices (IAU 2006/2000A,
+    CIO-based, with IERS B corrections as in earth_orientation()). The
+    Earth rotation angle is computed exactly for each time; the two slowly
+    varying matrices are computed once per grid node (nodes are kept, so
+    repeated calls over the same span reuse them) and linearly
+    interpolated.  The interpolation error grows as step**2; for the
+    default 3 hour step it is below 1e-9 rad, i.e. below 1 cm at the
+    surface of the Earth and a few mm at low Earth orbit.
+
+    Parameters
+    ----------
+    step : float
+        Grid step in days.
+    """
+    def __init__(self, step=0.125):
+        self.step = step
+        self._nodes = {}
+
+    def _node_matrices(self, nodes):
+        missing = np.array([k for k in nodes if k not in self._nodes],
+                           dtype=np.int64)
+        if len(missing) > 0:
+            mjds = missing * self.step
+            jd1 = np.zeros_like(mjds) + erfa.DJM0
+            rc2i, rpm = earth_orientation(jd1, mjds, mjds)
+            for ii, k in enumerate(missing):
+                self._nodes[k] = (rc2i[ii], rpm[ii])
+        rc2i = np.array([self._nodes[k][0] for k in nodes])
+        rpm = np.array([self._nodes[k][1] for k in nodes])
+        return rc2i, rpm
+
+    def matrices_jd(self, tt1, tt2, ut11, ut12):
+        """Return the interpolated (N x 3 x 3) GCRS to CIRS and polar
+        motion matrices, and the Earth rotation angles, at the TT and UT1
+        Julian dates tt1 + tt2 and ut11 + ut12 (arrays)."""
+        mjd_tt = (tt1 - erfa.DJM0) + tt2
+        g = mjd_tt / self.step
+        k0 = np.floor(g).astype(np.int64)
+        w = (g - k0)[:, None, None]
+        nodes, inv = np.unique(np.concatenate((k0, k0 + 1)),
+                               return_inverse=True)
+        rc2i, rpm = self._node_matrices(nodes)
+        i0, i1 = inv[:len(k0)], inv[len(k0):]
+        rc2i = (1.0 - w) * rc2i[i0] + w * rc2i[i1]
+        rpm = (1.0 - w) * rpm[i0] + w * rpm[i1]
+        era = erfa.era00(ut11, ut12)
+        return rc2i, era, rpm
+
+    def matrices(self, time):
+        """Return the interpolated (N x 3 x 3) GCRS to CIRS and polar
+        motion matrices, and the Earth rotation angles, at the given
+        (array) Time."""
+        tt, ut1 = time.tt, time.ut1
+        return self.matrices_jd(np.atleast_1d(tt.jd1), np.atleast_1d(tt.jd2),
+                                np.atleast_1d(ut1.jd1),
+                                np.atleast_1d(ut1.jd2))
+
+    def gcrs_to_itrs(self, time, pos):
+        """Rotate (3 x N) GCRS positions at the Times time to ITRS."""
+        rc2i, era, rpm = self.matrices(time)
+        x, y, z = np.einsum('nij,jn->in', rc2i,
+                            np.asarray(pos).reshape(3, -1))
+        s, c = np.sin(era), np.cos(era)
+        tirs = np.array([c * x + s * y, c * y - s * x, z])
+        return np.einsum('nij,jn->in', rpm, tirs)
+
+
+def gcrs_posvel_from_itrf_jd(xyzm, tt1, tt2, ut11, ut12, mjds=None,
+                             grid=None):
+    """Return the (N x 3) GCRS positions (m) and velocities (m / s) of the
+    ITRF position xyzm (m) at the TT and UT1 Julian dates tt1 + tt2 and
+    ut11 + ut12 (arrays).
+
+    The IERS corrections are interpolated at mjds (default: the TT MJDs).
+    If grid is a TerrestrialRotation, the precession-nutation and polar
+    motion matrices are interpolated from it instead of being computed
+    exactly.
+    """
+    if grid is not None:
+        rc2i, theta, rpm = grid.matrices_jd(tt1, tt2, ut11, ut12)
+    else:
+        if mjds is None:
+            mjds = (tt1 - erfa.DJM0) + tt2
+        rc2i, rpm = earth_orientation(tt1, tt2, mjds)
+        # Functions of Earth Rotation Angle
+        theta = erfa.era00(ut11, ut12)
+
+    # Observatory position in the terrestrial intermediate frame
+    x, y, z = np.einsum('j,njk->kn', xyzm, rpm)
+    s, c = np.sin(theta), np.cos(theta)
+    sx, cx = s * x, c * x
+    sy, cy = s * y, c * y
+
+    # Initial positions and velocities
+    iposs = np.asarray([cx - sy, sx + cy, z]).T
+    ivels = np.asarray([OM * (-sx - cy), OM * (cx - sy), \
+                        np.zeros_like(x)]).T
+    poss = np.einsum('ij,ijk->ik', iposs, rc2i)
+    vels = np.einsum('ij,ijk->ik', ivels, rc2i)
+    return poss, vels
+
+
+def gcrs_posvel_from_itrf(loc, toas, obsname='obs', grid=None):
     """Return a list of PosVel instances for the observatory at the TOA times.
 
     Observatory location should be given in the loc argument as an astropy
@@ -48,73 +197,35 @@ def gcrs_posvel_from_itrf(loc, toas, obsname='obs'):
     a terrestrial observing station] with an extra rotation from c2ixys()
     [Form the celestial to intermediate-frame-of-date matrix given the CIP
     X,Y and the CIO locator s].
+
+    The Earth orientation is computed exactly at each time, unless grid
+    (or, if grid is None, the module-level eop_grid) is a
+    TerrestrialRotation to interpolate it from; see gcrs_posvel_from_itrf_jd().
     """
     # If the input is a single TOA (i.e. a row from the table),
     # then put it into a list
     if type(toas) == table.row.Row:
         ttoas = Time([toas['mjd']])
-        N = 1
     elif type(toas) == table.table.Table:
-        N = len(toas)
-        ttoas = toas['mjd']
+        from .toa import group_time
+        ttoas = group_time(toas)
     else:
         if toas.isscalar:
             ttoas = Time([toas])
         else:
             ttoas = toas
-        N = len(ttoas)
 
     # Get various times from the TOAs as arrays
-    tts = np.asarray([(t.jd1, t.jd2) for t in ttoas.tt]).T
-    ut1s = np.asarray([(t.jd1, t.jd2) for t in ttoas.ut1]).T
-    mjds = np.asarray(ttoas.mjd)
-
-    # Get x, y coords of Celestial Intermediate Pole and CIO locator s
-    X, Y, S = erfa.xys00a(*tts)
-
-    # Get dX and dY from IERS A in arcsec and convert to radians
-    #dX = np.interp(mjds, iers_tab['MJD'], iers_tab['dX_2000A_B']) * asec2rad
-    #dY = np.interp(mjds, iers_tab['MJD'], iers_tab['dY_2000A_B']) * asec2rad
-    # Get dX and dY from IERS B in arcsec and convert to radians
-    dX = np.interp(mjds, iers_tab['MJD'], iers_tab['dX_2000A']) * asec2rad
-    dY = np.interp(mjds, iers_tab['MJD'], iers_tab['dY_2000A']) * asec2rad
-
-    # Get GCRS to CIRS matrices
-    rc2i = erfa.c2ixys(X+dX, Y+dY, S)
-
-    # Gets the TIO locator s'
-    sp = erfa.sp00(*tts)
-
-    # Get X and Y from IERS A in arcsec and convert to radians
-    #xp = np.interp(mjds, iers_tab['MJD'], iers_tab['PM_X_B']) * asec2rad
-    #yp = np.interp(mjds, iers_tab['MJD'], iers_tab['PM_Y_B']) * asec2rad
-    # Get X and Y from IERS B in arcsec and convert to radians
-    xp = np.interp(mjds, iers_tab['MJD'], iers_tab['PM_x']) * asec2rad
-    yp = np.interp(mjds, iers_tab['MJD'], iers_tab['PM_y']) * asec2rad
-
-    # Get the polar motion matrices
-    rpm = erfa.pom00(xp, yp, sp)
+    tt, ut1 = ttoas.tt, ttoas.ut1
+    if grid is None:
+        grid = eop_grid
+    mjds = None if grid is not None else np.asarray(ttoas.mjd)
 
     # Observatory geocentric coords in m
     xyzm = np.array([a.to(u.m).value for a in loc.geocentric])
-    x, y, z = np.dot(xyzm, rpm).T
-
-    # Functions of Earth Rotation Angle
-    theta = erfa.era00(*ut1s)
-    s, c = np.sin(theta), np.cos(theta)
-    sx, cx = s * x, c * x
-    sy, cy = s * y, c * y
-
-    # Initial positions and velocities
-    iposs = np.asarray([cx - sy, sx + cy, z]).T
-    ivels = np.asarray([OM * (-sx - cy), OM * (cx - sy), \
-                        np.zeros_like(x)]).T
-    # There is probably a way to do this with np.einsum or something...
-    # and here it is .
-    poss = np.empty((N, 3), dtype=np.float64)
-    vels = np.empty((N, 3), dtype=np.float64)
-    poss = np.einsum('ij,ijk->ik', iposs, rc2i)
-    vels = np.einsum('ij,ijk->ik', ivels, rc2i)
+    poss, vels = gcrs_posvel_from_itrf_jd(xyzm, tt.jd1, tt.jd2,
+                                          ut1.jd1, ut1.jd2, mjds=mjds,
+                                          grid=grid)
     return utils.PosVel(poss.T * u.m, vels.T * u.m / u.s, obj=obsname, origin="earth")
 
 
@@ -4,7 +4,7 @@ import numpy as np
 import pint.toa as toa
 from astropy import log
 import astropy.io.fits as pyfits
-from .fits_utils import read_fits_event_mjds_tuples
+from .fits_utils import read_fits_event_mjds_tuples, split_mjd_tuples
 
 # fits_extension can be a single name or a comma-separated list of allowed
 # extension names.
@@ -48,14 +48,18 @@ def _default_obs_and_scale(mission, timesys, timeref):
     return obs, scale
 
 
-def _get_columns_from_fits(hdu, cols):
+def _get_columns_from_fits(hdu, cols, rows=None):
     new_dict = {}
     event_dat = hdu.data
     default_val = np.zeros(len(event_dat))
+    if rows is not None:
+        default_val = default_val[rows]
     # Parse and retrieve default values from the FITS columns listed in config
     for col in cols.keys():
         try:
             val = event_dat.field(cols[col])
+            if rows is not None:
+                val = val[rows]
         except ValueError:
             val = default_val
         new_dict[col] = val
@@ -77,29 +81,21 @@ def _get_timesys_and_timeref(hdu):
     return timesys, timeref
 
 
-def load_event_TOAs(eventname, mission, weights=None):
-    '''
-    Read photon event times out of a FITS file as PINT TOA objects.
+def _read_event_columns(eventname, mission, weights=None, rows=None):
+    """Read the event times and mission columns of a FITS event file.
 
-    Correctly handles raw event files, or ones processed with axBary to have
-    barycentered  TOAs. Different conditions may apply to different missions.
-
-    Parameters
-    ----------
-    eventname : str
-        File name of the FITS event list
-    mission : str
-        Name of the mission (e.g. RXTE, XMM)
-    weights : array or None
-        The array has to be of the same size as the event list. Overwrites
-        possible weight lists from mission-specific FITS files
+    The file is memory mapped, and if rows (a slice or index array) is
+    given only those rows of the event list are read.
 
     Returns
     -------
-    toalist : list of TOA objects
-    '''
+    mjds : N x 2 array of MJD tuples (see read_fits_event_mjds_tuples)
+    columns : dict of the mission FITS columns (see mission_config) as
+        numeric arrays, plus 'weights' if weights is given
+    obs, scale : the observatory and time scale of the MJDs
+    """
     # Load photon times from event file
-    hdulist = pyfits.open(eventname)
+    hdulist = pyfits.open(eventname, memmap=True)
 
     extension = mission_config[mission]["fits_extension"]
 
@@ -117,15 +113,53 @@ def load_event_TOAs(eventname, mission, weights=None):
     obs, scale = _default_obs_and_scale(mission, timesys, timeref)
 
     # Read time column from FITS file
-    mjds = read_fits_event_mjds_tuples(hdulist[1])
+    mjds = read_fits_event_mjds_tuples(hdulist[1], rows=rows)
 
-    new_kwargs = _get_columns_from_fits(hdulist[1],
-                                        mission_config[mission]["fits_columns"])
+    columns = _get_columns_from_fits(hdulist[1],
+                                     mission_config[mission]["fits_columns"],
+                                     rows=rows)
+    # Copy the columns out of the (possibly memory mapped) FITS data, in
+    # their native byte order, before closing the file
+    for key in columns.keys():
+        val = np.asarray(columns[key])
+        columns[key] = val.astype(val.dtype.newbyteorder('='))
 
     hdulist.close()
 
     if weights is not None:
-        new_kwargs["weights"] = weights
+        columns["weights"] = np.asarray(weights)
+        if rows is not None:
+            columns["weights"] = columns["weights"][rows]
+
+    return mjds, columns, obs, scale
+
+
+def load_event_TOAs(eventname, mission, weights=None):
+    '''
+    Read photon event times out of a FITS file as PINT TOA objects.
+
+    Correctly handles raw event files, or ones processed with axBary to have
+    barycentered  TOAs. Different conditions may apply to different missions.
+
+    For large event lists, get_event_TOAs() builds the TOA table directly,
+    without making a TOA object per event.
+
+    Parameters
+    ----------
+    eventname : str
+        File name of the FITS event list
+    mission : str
+        Name of the mission (e.g. RXTE, XMM)
+    weights : array or None
+        The array has to be of the same size as the event list. Overwrites
+        possible weight lists from mission-specific FITS files
+
+    Returns
+    -------
+    toalist : list of TOA objects
+    '''
+    mjds, new_kwargs, obs, scale = _read_event_columns(eventname, mission,
+                                                       weights=weights)
 
     toalist = [None] * len(mjds)
     kw = {}
@@ -138,6 +172,74 @@ def load_event_TOAs(eventname, mission, weights=None):
     return toalist
 
 
+def get_event_TOAs(eventname, mission, weights=None, minmjd=-np.inf,
+                   maxmjd=np.inf, ephem="DE421", planets=False,
+                   include_bipm=False, include_gps=False,
+                   tdb_method="astropy", rows=None):
+    '''
+    Read photon event times out of a FITS file as a PINT TOAs object.
+
+    This reads the same events as load_event_TOAs(), but builds the TOA
+    table straight from the FITS columns (see pint.toa.build_toa_table),
+    and then applies the clock corrections and computes the TDBs and
+    posvels on whole columns, as get_TOAs_list() would. No TOA object is
+    made per event.
+
+    The mission FITS columns (e.g. 'pha' or 'pi', see mission_config) are
+    stored as numeric columns of the TOA table, with their FITS data
+    types, instead of in the flags. Weights are stored in the 'weight'
+    column.
+
+    Parameters
+    ----------
+    eventname : str
+        File name of the FITS event list
+    mission : str
+        Name of the mission (e.g. RXTE, XMM)
+    weights : array or None
+        The array has to be of the same size as the event list.
+    rows : slice or array, optional
+        Only read these rows of the (memory mapped) event list, e.g. to
+        process a large file in chunks. The 'index' column of the TOA
+        table counts from the first row read.
+    minmjd, maxmjd : float
+        Only the events in this MJD range are kept.
+    ephem, planets, include_bipm, include_gps, tdb_method
+        As for get_TOAs_list(). GPS and BIPM clock corrections are not
+        included by default.
+
+    Returns
+    -------
+    TOAs object
+    '''
+    mjds, columns, obs, scale = _read_event_columns(eventname, mission,
+                                                    weights=weights,
+                                                    rows=rows)
+    if "weights" in columns:
+        columns["weight"] = columns.pop("weights")
+
+    mjd_int, mjd_frac = split_mjd_tuples(mjds)
+    del mjds
+    mjds_float = mjd_int + mjd_frac
+    idx = np.logical_and(mjds_float > minmjd, mjds_float < maxmjd)
+    if not np.all(idx):
+        mjd_int, mjd_frac = mjd_int[idx], mjd_frac[idx]
+        for key in columns.keys():
+            columns[key] = columns[key][idx]
+
+    table = toa.build_toa_table(mjd_int, mjd_frac, 0.0, np.inf, obs, None,
+                                filename=eventname, scale=scale,
+                                columns=columns)
+    if len(table) == 0:
+        log.warning("No events read from {0}".format(eventname))
+        ts = toa.TOAs(toatable=table)
+        ts.filename = eventname
+        return ts
+    return toa.get_TOAs_table(table, ephem=ephem, include_bipm=include_bipm,
+                              include_gps=include_gps, planets=planets,
+                              tdb_method=tdb_method, filename=eventname)
+
+
 def load_RXTE_TOAs(eventname):
     return load_event_TOAs(eventname, 'rxte')
 
@@ -151,3 +253,19 @@ def load_XMM_TOAs(eventname):
 
 def load_NuSTAR_TOAs(eventname):
     return load_event_TOAs(eventname, 'nustar')
+
+
+def get_RXTE_TOAs(eventname, **kwargs):
+    return get_event_TOAs(eventname, 'rxte', **kwargs)
+
+
+def get_NICER_TOAs(eventname, **kwargs):
+    return get_event_TOAs(eventname, 'nicer', **kwargs)
+
+
+def get_XMM_TOAs(eventname, **kwargs):
+    return get_event_TOAs(eventname, 'xmm', **kwargs)
+
+
+def get_NuSTAR_TOAs(eventname, **kwargs):
+    return get_event_TOAs(eventname, 'nustar', **kwargs)
@@ -100,25 +100,61 @@ def sigma_trials(sigma,trials):
         return (sigma**2 - 2*np.log(trials))**0.5
 
 
-def z2m(phases,m=2):
-    """ Return the Z^2_m test for each harmonic up to the specified m.
-        See de Jager et al. 1989 for definition.
-    """
+def harmonic_sums(phases,m=20,weights=None,chunksize=65536):
+    """ Return the sums of cos(k*phi) and sin(k*phi), optionally weighted,
+        over the phases for each harmonic k = 1..m.
 
-    phases = np.asarray(phases)*TWOPI #phase in radians
-    n = len(phases)
+        The harmonics are generated with the angle-addition recurrence
+        cos((k+1)phi) = cos(k phi)cos(phi) - sin(k phi)sin(phi) (and
+        likewise for the sine), so only cos(phi) and sin(phi) are
+        evaluated explicitly.  The phases are processed in chunks of
+        chunksize, so the temporaries do not grow with m or with the
+        number of phases.
 
-    if n < 5e3:  #faster for 100s to 1000s of phases, but requires ~20x memory of alternative
+        args
+        ----
+        phases  pulse phases in cycles
 
-        s = (np.cos(np.outer(np.arange(1,m+1),phases))).sum(axis=1)**2 +\
-            (np.sin(np.outer(np.arange(1,m+1),phases))).sum(axis=1)**2
+        kwargs
+        ------
+        m         [20] number of harmonics
+        weights   [None] optional photon weights
+        chunksize [65536] number of phases per chunk
 
-    else:
-
-        s = (np.asarray([(np.cos(k*phases)).sum() for k in range(1,m+1)]))**2 +\
-            (np.asarray([(np.sin(k*phases)).sum() for k in range(1,m+1)]))**2
+        returns
+        -------
+        (cos_sums,sin_sums), each of length m
+    """
+    phases = np.atleast_1d(np.asarray(phases))
+    if weights is not None:
+        weights = np.atleast_1d(np.asarray(weights,dtype=float))
+        if weights.shape != phases.shape:
+            raise ValueError('Must provide a weight for each phase.')
+    csums = np.zeros(m)
+    ssums = np.zeros(m)
+    for start in range(0,len(phases),chunksize):
+        x = np.mod(phases[start:start+chunksize],1).astype(float)*TWOPI
+        c1,s1 = np.cos(x),np.sin(x)
+        w = None if weights is None else weights[start:start+chunksize]
+        ck,sk = c1,s1
+        for k in range(m):
+            if k > 0:
+                ck,sk = ck*c1-sk*s1,sk*c1+ck*s1
+            if w is None:
+                csums[k] += ck.sum()
+                ssums[k] += sk.sum()
+            else:
+                csums[k] += np.dot(w,ck)
+                ssums[k] += np.dot(w,sk)
+    return csums,ssums
 
-    return (2./n)*np.cumsum(s)
+def z2m(phases,m=2):
+    """ Return the Z^2_m test for each harmonic up to the specified m.
+        See de Jager et al. 1989 for definition.
+    """
+    n = len(np.atleast_1d(phases))
+    c,s = harmonic_sums(phases,m)
+    return (2./n)*np.cumsum(c**2+s**2)
 
 def z2mw(phases,weights,m=2):
     """ Return the Z^2_m test for each harmonic up to the specified m.
@@ -127,13 +163,9 @@ def z2mw(phases,weights,m=2):
         well-distributed or assumed to be fixed, the CLT applies and the
         statistic remains calibrated.  Nice!
      """
-
-    phases = np.asarray(phases)*(2*np.pi) #phase in radians
-
-    s = (np.asarray([(np.cos(k*phases)*weights).sum() for k in range(1,m+1)]))**2 +\
-        (np.asarray([(np.sin(k*phases)*weights).sum() for k in range(1,m+1)]))**2
-
-    return np.cumsum(s) * (2./(weights**2).sum())
+    weights = np.asarray(weights,dtype=float)
+    c,s = harmonic_sums(phases,m,weights=weights)
+    return np.cumsum(c**2+s**2) * (2./(weights**2).sum())
 
 def sf_z2m(ts,m=2):
     """ Return the survival function (chance probability) according to the
@@ -154,15 +186,9 @@ def em_four(phases,m=2,weights=None):
     """ Return the empirical Fourier coefficients up to the mth harmonic.
         These are derived from the empirical trignometric moments."""
 
-    phases = np.asarray(phases)*TWOPI #phase in radians
-
-    n = len(phases) if weights is None else weights.sum()
-    weights = 1. if weights is None else weights
-
-    aks = (1./n)*np.asarray([(weights*np.cos(k*phases)).sum() for k in range(1,m+1)])
-    bks = (1./n)*np.asarray([(weights*np.sin(k*phases)).sum() for k in range(1,m+1)])
-
-    return aks,bks
+    n = len(np.atleast_1d(phases)) if weights is None else np.sum(weights)
+    aks,bks = harmonic_sums(phases,m,weights=weights)
+    return (1./n)*aks,(1./n)*bks
 
 def em_lc(coeffs,dom):
     """ Evaluate the light curve at the provided phases (0 to 1) for the
@@ -182,12 +208,7 @@ def hm(phases,m=20,c=4):
         m == maximum search harmonic
         c == offset for each successive harmonic
     """
-    phases = np.asarray(phases)*(2*np.pi) #phase in radians
-
-    s = (np.asarray([(np.cos(k*phases)).sum() for k in range(1,m+1)]))**2 +\
-        (np.asarray([(np.sin(k*phases)).sum() for k in range(1,m+1)]))**2
-
-    return ((2./len(phases))*np.cumsum(s) - c*np.arange(0,m)).max()
+    return (z2m(phases,m=m) - c*np.arange(0,m)).max()
 
 
 def hmw(phases,weights,m=20,c=4):
@@ -195,13 +216,7 @@ def hmw(phases,weights,m=20,c=4):
         sine/cosine with the weights in the argument.  The distribution
         is corrected such that the CLT still applies, i.e., it maintains
         the same calibration as the unweighted version."""
-
-    phases = np.asarray(phases)*(2*np.pi) #phase in radians
-
-    s = (np.asarray([(weights*np.cos(k*phases)).sum() for k in range(1,m+1)]))**2 +\
-        (np.asarray([(weights*np.sin(k*phases)).sum() for k in range(1,m+1)]))**2
-
-    return ( (2./(weights**2).sum()) * np.cumsum(s) - c*np.arange(0,m) ).max()
+    return (z2mw(phases,weights,m=m) - c*np.arange(0,m)).max()
 
 
 #@vec
@@ -8,7 +8,8 @@ import pint.residuals
 import astropy.units as u
 from astropy.coordinates import SkyCoord, EarthLocation
 from astropy.extern import six
-from pint.fits_utils import read_fits_event_mjds, read_fits_event_mjds_tuples
+from pint.fits_utils import read_fits_event_mjds, read_fits_event_mjds_tuples, \
+    split_mjd_tuples
 from pint.observatory import get_observatory
 
 from astropy import log
@@ -49,23 +50,20 @@ def calc_lat_weights(energies, angseps, logeref=4.1, logesig=0.5):
 
     return fgeom * np.exp(-np.power((logE-logeref)/np.sqrt(2.)/logesig,2.))
 
-def load_Fermi_TOAs(ft1name,weightcolumn=None,targetcoord=None,logeref=4.1,
-                    logesig=0.5,minweight=0.0, minmjd=0.0, maxmjd=np.inf):
-    '''
-    TOAlist = load_Fermi_TOAs(ft1name)
-      Read photon event times out of a Fermi FT1 file and return
-      a list of PINT TOA objects.
-      Correctly handles raw FT1 files, or ones processed with gtbary
-      to have barycentered or geocentered TOAs.
+def _read_Fermi_columns(ft1name, weightcolumn=None, targetcoord=None,
+                        logeref=4.1, logesig=0.5, minweight=0.0, minmjd=0.0,
+                        maxmjd=np.inf):
+    """Read the selected photons of a Fermi FT1 file as column arrays.
 
-      weightcolumn specifies the FITS column name to read the photon weights
-      from.  The special value 'CALC' causes the weights to be computed empirically
-      as in Philippe Bruel's SearchPulsation code.
-      logeref and logesig are parameters for the weight computation and are only
-      used when weightcolumn='CALC'.
+    See load_Fermi_TOAs() for the arguments.
 
-      When weights are loaded, or computed, events are filtered by weight >= minweight
-    '''
+    Returns
+    -------
+    mjds : N x 2 array of MJD tuples (see read_fits_event_mjds_tuples)
+    energies : Quantity array of photon energies
+    weights : array of photon weights, or None if weightcolumn is None
+    obs, scale : the observatory and time scale of the MJDs
+    """
     import astropy.io.fits as pyfits
     # Load photon times from FT1 file
     hdulist = pyfits.open(ft1name)
@@ -87,9 +85,10 @@ def load_Fermi_TOAs(ft1name,weightcolumn=None,targetcoord=None,logeref=4.1,
     mjds = read_fits_event_mjds_tuples(hdulist[1])
     if len(mjds) == 0:
         log.error('No MJDs read from file!')
-        raise
+        raise ValueError('No MJDs read from {0}'.format(ft1name))
 
     energies = ft1dat.field('ENERGY')*u.MeV
+    weights = None
     if weightcolumn is not None:
         if weightcolumn == 'CALC':
             photoncoords = SkyCoord(ft1dat.field('RA')*u.degree,ft1dat.field('DEC')*u.degree,frame='icrs')
@@ -105,44 +104,103 @@ def load_Fermi_TOAs(ft1name,weightcolumn=None,targetcoord=None,logeref=4.1,
             weights = weights[idx]
 
     # limit the TOAs to ones in selected MJD range
-    mjds_float = np.array([r[0] + r[1] for r in mjds])
+    mjds_float = mjds[:, 0] + mjds[:, 1]
     idx = np.logical_and((mjds_float > minmjd),(mjds_float < maxmjd))
     mjds = mjds[idx]
     energies = energies[idx]
-    if weightcolumn is not None:
-        weights = weights[idx]
+    if weights is not None:
+        weights = np.array(weights[idx], dtype=np.float64)
+    hdulist.close()
 
     if timesys == 'TDB':
         log.info("Building barycentered TOAs")
-        if weightcolumn is None:
-            toalist=[toa.TOA(m,obs='Barycenter',scale='tdb',energy=e) for m,e in zip(mjds,energies)]
-        else:
-            toalist=[toa.TOA(m,obs='Barycenter',scale='tdb',energy=e,weight=w) for m,e,w in zip(mjds,energies,weights)]
+        obs, scale = 'Barycenter', 'tdb'
+    elif timeref == 'LOCAL':
+        log.info('Building spacecraft local TOAs, with MJDs in range {0} to {1}'.format(mjds[0],mjds[-1]))
+        assert timesys == 'TT'
+        try:
+            get_observatory('Fermi')
+        except KeyError:
+            log.error('Fermi observatory not defined. Make sure you have specified an FT2 file!')
+            raise
+        obs, scale = 'Fermi', 'tt'
     else:
-        if timeref == 'LOCAL':
-            log.info('Building spacecraft local TOAs, with MJDs in range {0} to {1}'.format(mjds[0],mjds[-1]))
-            assert timesys == 'TT'
-            try:
-                fermiobs = get_observatory('Fermi')
-            except KeyError:
-                log.error('Fermi observatory not defined. Make sure you have specified an FT2 file!')
-                raise
-
-            try:
-                if weightcolumn is None:
-                    toalist=[toa.TOA(m, obs='Fermi', scale='tt',energy=e)
-                            for m,e in zip(mjds,energies)]
-                else:
-                    toalist=[toa.TOA(m, obs='Fermi', scale='tt',energy=e,weight=w)
-                            for m,e,w in zip(mjds,energies,weights)]
-            except KeyError:
-                log.error('Error processing Fermi TOAs. You may have forgotten to specify an FT2 file with --ft2')
-                raise
+        log.info("Building geocentered TOAs")
+        obs, scale = 'Geocenter', 'tt'
+
+    return mjds, energies, weights, obs, scale
+
+def load_Fermi_TOAs(ft1name,weightcolumn=None,targetcoord=None,logeref=4.1,
+                    logesig=0.5,minweight=0.0, minmjd=0.0, maxmjd=np.inf):
+    '''
+    TOAlist = load_Fermi_TOAs(ft1name)
+      Read photon event times out of a Fermi FT1 file and return
+      a list of PINT TOA objects.
+      Correctly handles raw FT1 files, or ones processed with gtbary
+      to have barycentered or geocentered TOAs.
+
+      weightcolumn specifies the FITS column name to read the photon weights
+      from.  The special value 'CALC' causes the weights to be computed empirically
+      as in Philippe Bruel's SearchPulsation code.
+      logeref and logesig are parameters for the weight computation and are only
+      used when weightcolumn='CALC'.
+
+      When weights are loaded, or computed, events are filtered by weight >= minweight
+
+      For large files, get_Fermi_TOAs() builds the TOAs directly from
+      the FITS columns, without making a TOA object per photon.
+    '''
+    mjds, energies, weights, obs, scale = _read_Fermi_columns(
+        ft1name, weightcolumn=weightcolumn, targetcoord=targetcoord,
+        logeref=logeref, logesig=logesig, minweight=minweight,
+        minmjd=minmjd, maxmjd=maxmjd)
+
+    try:
+        if weights is None:
+            toalist=[toa.TOA(m,obs=obs,scale=scale,energy=e)
+                     for m,e in zip(mjds,energies)]
         else:
-            log.info("Building geocentered TOAs")
-            if weightcolumn is None:
-                toalist=[toa.TOA(m, obs='Geocenter', scale='tt',energy=e) for m,e in zip(mjds,energies)]
-            else:
-                toalist=[toa.TOA(m, obs='Geocenter', scale='tt',energy=e,weight=w) for m,e,w in zip(mjds,energies,weights)]
+            toalist=[toa.TOA(m,obs=obs,scale=scale,energy=e,weight=w)
+                     for m,e,w in zip(mjds,energies,weights)]
+    except KeyError:
+        log.error('Error processing Fermi TOAs. You may have forgotten to specify an FT2 file with --ft2')
+        raise
 
     return toalist
+
+def get_Fermi_TOAs(ft1name, weightcolumn=None, targetcoord=None,
+                   logeref=4.1, logesig=0.5, minweight=0.0, minmjd=0.0,
+                   maxmjd=np.inf, ephem="DE421", planets=False,
+                   include_bipm=False, include_gps=False,
+                   tdb_method="astropy"):
+    """Read photon event times out of a Fermi FT1 file as a TOAs object.
+
+    This selects the same photons as load_Fermi_TOAs(), but builds the TOA
+    table straight from the FITS columns (see pint.toa.build_toa_table),
+    and then applies the clock corrections and computes the TDBs and
+    posvels on whole columns, as get_TOAs_list() would. No TOA object is
+    made per photon, so this is the loader to use for large data sets.
+
+    The photon energies (MeV) are stored in the 'energy' column of the
+    TOA table, and the weights, if weightcolumn is given, in the 'weight'
+    column, instead of in the flags.
+
+    As for get_TOAs_list(), ephem and planets select the solar system
+    ephemeris and whether planet positions are computed; GPS and BIPM
+    clock corrections are not included by default, as for Fermi events.
+    """
+    mjds, energies, weights, obs, scale = _read_Fermi_columns(
+        ft1name, weightcolumn=weightcolumn, targetcoord=targetcoord,
+        logeref=logeref, logesig=logesig, minweight=minweight,
+        minmjd=minmjd, maxmjd=maxmjd)
+
+    columns = {'energy': energies}
+    if weights is not None:
+        columns['weight'] = weights
+    mjd_int, mjd_frac = split_mjd_tuples(mjds)
+    table = toa.build_toa_table(mjd_int, mjd_frac, 0.0, np.inf, obs, None,
+                                filename=ft1name, scale=scale,
+                                columns=columns)
+    return toa.get_TOAs_table(table, ephem=ephem, include_bipm=include_bipm,
+                              include_gps=include_gps, planets=planets,
+                              tdb_method=tdb_method, filename=ft1name)
@@ -10,12 +10,15 @@ except ImportError:
     from astropy._erfa import DAYSEC as SECS_PER_DAY
 from .utils import fortran_float
 
-def read_fits_event_mjds_tuples(event_hdu,timecolumn='TIME'):
+def read_fits_event_mjds_tuples(event_hdu,timecolumn='TIME',rows=None):
     """Read a set of MJDs from a FITS HDU, with proper converstion of times to MJD
 
     The FITS time format is defined here:
     https://heasarc.gsfc.nasa.gov/docs/journal/timing3.html
 
+    If rows (a slice or index array) is given, only those rows are read,
+    so that a memory mapped event list can be processed in chunks.
+
     Returns
     -------
     mjds: MJDs returned are tuples of two doubles (jd1, jd2), as use by
@@ -51,11 +54,32 @@ def read_fits_event_mjds_tuples(event_hdu,timecolumn='TIME'):
     # Should check timecolumn units to be sure they are seconds!
 
     # MJD = (TIMECOLUMN + TIMEZERO)/SECS_PER_DAY + MJDREF
-    mjds = np.array([(MJDREF, tt) for tt in (event_dat.field(timecolumn)
-        + TIMEZERO)/SECS_PER_DAY])
+    times = event_dat.field(timecolumn)
+    if rows is not None:
+        times = times[rows]
+    times = (np.asarray(times, dtype=np.longdouble) + TIMEZERO)/SECS_PER_DAY
+    mjds = np.empty((len(times), 2), dtype=np.longdouble)
+    mjds[:, 0] = MJDREF
+    mjds[:, 1] = times
 
     return mjds
 
+def split_mjd_tuples(mjds):
+    """Split an N x 2 array of MJD tuples, as returned by
+    read_fits_event_mjds_tuples(), into integer and fractional day arrays.
+
+    Both parts are float64, and the fractional part is in [0, 1), so no
+    precision is lost when they are passed on to astropy Time().
+    """
+    mjds = np.asarray(mjds, dtype=np.longdouble).reshape(-1, 2)
+    i0 = np.floor(mjds[:, 0])
+    i1 = np.floor(mjds[:, 1])
+    frac = (mjds[:, 0] - i0) + (mjds[:, 1] - i1)
+    carry = np.floor(frac)
+    mjd_int = (i0 + i1 + carry).astype(np.float64)
+    mjd_frac = (frac - carry).astype(np.float64)
+    return mjd_int, mjd_frac
+
 def read_fits_event_mjds(event_hdu,timecolumn='TIME'):
     """Read a set of MJDs from a FITS HDU, with proper converstion of times to MJD
 
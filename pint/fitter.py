@@ -4,6 +4,7 @@ import numpy as np
 import astropy.units as u
 import abc
 import scipy.optimize as opt, scipy.linalg as sl
+import scipy.sparse as sps
 from .residuals import resids
 
 
@@ -84,9 +85,9 @@ class Fitter(object):
         for k, v in fitp.items():
             getattr(self.model, k).uncertainty_value = v
 
-    def get_designmatrix(self):
+    def get_designmatrix(self, sparse=False):
         return self.model.designmatrix(toas=self.toas.table,
-                incfrozen=False, incoffset=True)
+                incfrozen=False, incoffset=True, sparse=sparse)
 
     def minimize_func(self, x, *args):
         """Wrapper function for the residual class, meant to be passed to
@@ -114,6 +115,8 @@ class PowellFitter(Fitter):
     def fit_toas(self, maxiter=20):
         # Initial guesses are model params
         fitp = self.get_fitparams_num()
+        # Only the components whose parameters a step changes are recomputed
+        self.model.enable_cache()
         self.fitresult=opt.minimize(self.minimize_func, list(fitp.values()),
                                     args=tuple(fitp.keys()),
                                     options={'maxiter':maxiter},
@@ -122,6 +125,7 @@ class PowellFitter(Fitter):
         # necessarily the one that yields the best fit
         self.minimize_func(np.atleast_1d(self.fitresult.x),
                            *list(fitp.keys()))
+        self.model.disable_cache()
 
 
 class WlsFitter(Fitter):
@@ -133,23 +137,33 @@ class WlsFitter(Fitter):
         super(WlsFitter, self).__init__(toas=toas, model=model)
         self.method = 'weighted_least_square'
 
-    def fit_toas(self, maxiter=1, threshold=False):
-        """Run a linear weighted least-squared fitting method"""
+    def fit_toas(self, maxiter=1, threshold=False, sparse=False):
+        """Run a linear weighted least-squared fitting method
+
+        If sparse is True, the DMX and JUMP columns of the design matrix are
+        kept sparse and the fit is solved through the normal equations
+        M^T M, which never forms M densely. This squares the condition
+        number of the fit, so directions with singular values below about
+        sqrt(eps) * s[0] are dropped. The default dense SVD of M keeps them.
+        """
         chi2 = 0
         for i in range(maxiter):
             fitp = self.get_fitparams()
             fitpv = self.get_fitparams_num()
             fitperrs = self.get_fitparams_uncertainty()
             # Define the linear system
-            M, params, units, scale_by_F0 = self.get_designmatrix()
+            M, params, units, scale_by_F0 = self.get_designmatrix(sparse=sparse)
             # Get residuals and TOA uncertainties in seconds
             self.update_resids()
             residuals = self.resids.time_resids.to(u.s).value
             Nvec = self.toas.get_errors().to(u.s).value
 
             # "Whiten" design matrix and residuals by dividing by uncertainties
-            M = M/Nvec.reshape((-1,1))
             residuals = residuals / Nvec
+            if sps.issparse(M):
+                M = sps.diags(1.0/Nvec).dot(M)
+            else:
+                M = M/Nvec.reshape((-1,1))
 
             # For each column in design matrix except for col 0 (const. pulse
             # phase), subtract the mean value, and scale by the column RMS.
@@ -158,9 +172,18 @@ class WlsFitter(Fitter):
             # NOTE, We remove subtract mean value here, since it did not give us a
             # fast converge fitting.
             # M[:,1:] -= M[:,1:].mean(axis=0)
-            fac = M.std(axis=0)
-            fac[0] = 1.0
-            M /= fac
+            if sps.issparse(M):
+                mean = np.asarray(M.mean(axis=0)).ravel()
+                msq = np.asarray(M.multiply(M).mean(axis=0)).ravel()
+                fac = np.sqrt(np.maximum(msq - mean**2, 0.0))
+                # The normal equations below square the condition number,
+                # so the Offset column is scaled to unit RMS too
+                fac[0] = np.sqrt(msq[0])
+                M = M.dot(sps.diags(1.0/fac)).tocsc()
+            else:
+                fac = M.std(axis=0)
+                fac[0] = 1.0
+                M /= fac
 
             # Singular value decomp of design matrix:
             #   M = U s V^T
@@ -168,27 +191,48 @@ class WlsFitter(Fitter):
             #   M, U are Ntoa x Nparam
             #   s is Nparam x Nparam diagonal matrix encoded as 1-D vector
             #   V^T is Nparam x Nparam
-            U, s, Vt = sl.svd(M, full_matrices=False)
+            if sps.issparse(M):
+                # With a sparse DMX/JUMP block, never form M densely. Since
+                #   M^T M = V s^2 V^T  and  U^T r = s^-1 V^T M^T r
+                # the decomposition of the small M^T M gives V and s. This
+                # squares the condition number: s^2 is only determined to
+                # about eps * s[0]^2, so smaller modes are always dropped.
+                _, s2, Vt = sl.svd(M.T.dot(M).toarray())
+                s = np.sqrt(s2)
+                VtMtr = np.dot(Vt, M.T.dot(residuals))
+            else:
+                U, s, Vt = sl.svd(M, full_matrices=False)
 
             # Note, here we could do various checks like report
             # matrix condition number or zero out low singular values.
             #print 'log_10 cond=', np.log10(s.max()/s.min())
             # Note, Check the threshold from data precision level.Borrowed from
-            # np Curve fit.
-            if threshold:
-                threshold_val = np.finfo(np.longdouble).eps * max(M.shape) * s[0]
-                s[s<threshold_val] = 0.0
-            # Sigma = np.dot(Vt.T / s, U.T)
+            # np Curve fit. For the normal equations the cut is applied to
+            # s^2, the quantity the (float64) decomposition actually resolved.
+            sinv = np.zeros_like(s)
+            if sps.issparse(M):
+                keep = s2 > np.finfo(np.float64).eps * max(M.shape) * s2[0]
+            elif threshold:
+                keep = s > np.finfo(np.longdouble).eps * max(M.shape) * s[0]
+            else:
+                keep = s > 0
+            sinv[keep] = 1.0 / s[keep]
+            if sps.issparse(M):
+                Utr = VtMtr * sinv
+            else:
+                Utr = np.dot(U.T, residuals)
+            # Sigma = np.dot(Vt.T * sinv, U.T)
             # The post-fit parameter covariance matrix
             #   Sigma = V s^-2 V^T
-            Sigma = np.dot(Vt.T / (s**2), Vt)
+            # with 1/s = 0 for the dropped modes.
+            Sigma = np.dot(Vt.T * sinv**2, Vt)
             # Parameter uncertainties.  Scale by fac recovers original units.
             errs = np.sqrt(np.diag(Sigma)) / fac
 
             # The delta-parameter values
             #   dpars = V s^-1 U^T r
             # Scaling by fac recovers original units
-            dpars = np.dot(Vt.T, np.dot(U.T,residuals)/s) / fac
+            dpars = np.dot(Vt.T, Utr * sinv) / fac
             for ii, pn in enumerate(fitp.keys()):
                 uind = params.index(pn)             # Index of designmatrix
                 un = 1.0 / (units[uind])     # Unit in designmatrix
@@ -221,8 +265,8 @@ class GLSFitter(Fitter):
             fitpv = self.get_fitparams_num()
             fitperrs = self.get_fitparams_uncertainty()
 
-            # Define the linear system
-            M, params, units, scale_by_F0 = self.get_designmatrix()
+            # Define the linear system. The DMX/JUMP columns stay sparse.
+            M, params, units, scale_by_F0 = self.get_designmatrix(sparse=True)
 
             # Get residuals and TOA uncertainties in seconds
             self.update_resids()
@@ -235,31 +279,38 @@ class GLSFitter(Fitter):
                 phiinv = np.zeros(M.shape[1])
                 if Mn is not None and phi is not None:
                     phiinv = np.concatenate((phiinv, 1/phi))
-                    M = np.hstack((M, Mn))
+                    if sps.issparse(M):
+                        M = sps.hstack((M, Mn)).tocsc()
+                    else:
+                        M = np.hstack((M, Mn))
 
             # normalize the design matrix
-            norm = np.sqrt(np.sum(M**2, axis=0))
+            if sps.issparse(M):
+                norm = np.sqrt(np.asarray(M.multiply(M).sum(axis=0)).ravel())
+            else:
+                norm = np.sqrt(np.sum(M**2, axis=0))
             ntmpar = len(fitp)
             if M.shape[1] > ntmpar:
                 norm[ntmpar:] = 1
             if np.any(norm == 0):
                 print("Warning: one or more of the design-matrix columns is null.")
-            M /= norm
+            if sps.issparse(M):
+                M = M.dot(sps.diags(1.0/norm)).tocsc()
+            else:
+                M /= norm
 
-            # compute covariance matrices
+            # compute covariance matrices. Neither form builds an
+            # Ntoa x Ntoa matrix.
             if full_cov:
-                cov = self.model.covariance_matrix(self.toas.table)
-                cf = sl.cho_factor(cov)
-                cm = sl.cho_solve(cf, M)
-                mtcm = np.dot(M.T, cm)
-                mtcy = np.dot(cm.T, residuals)
-
+                cov = self.model.noise_covariance(self.toas.table)
             else:
-                Nvec = self.model.scaled_sigma(self.toas.table).to(u.s).value**2
-                cinv = 1 / Nvec
-                mtcm = np.dot(M.T, cinv[:,None]*M)
+                # The noise basis is fit in the augmented system, so only the
+                # white noise and the ECORR blocks weight the TOAs.
+                cov = self.model.white_noise_covariance(self.toas.table)
+            mtcm = cov.quad_form(M)
+            if not full_cov:
                 mtcm += np.diag(phiinv)
-                mtcy = np.dot(M.T, cinv*residuals)
+            mtcy = cov.quad_form(M, residuals)
 
 
             try:
@@ -278,11 +329,8 @@ class GLSFitter(Fitter):
 
 
             # compute linearized chisq
-            newres = residuals - np.dot(M, xhat)
-            if full_cov:
-                chi2 = np.dot(newres, sl.cho_solve(cf, newres))
-            else:
-                chi2 = np.dot(newres, cinv*newres)
+            newres = residuals - M.dot(xhat)
+            chi2 = cov.quad_form(newres)
 
             # compute absolute estimates, normalized errors, covariance matrix
             dpars = xhat/norm
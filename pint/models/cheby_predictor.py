@@ -0,0 +1,338 @@
+"""Two-dimensional Chebyshev phase predictors in time and frequency.
+
+A predictor segment gives the pulse phase at topocentric time t (mjd) and
+observing frequency f (MHz) over TIME_RANGE x FREQ_RANGE as
+
+    PHASE(t, f) = sum_ij C(i,j) T_i(x) T_j(y) + DISPERSION_CONSTANT / f**2
+
+with x and y the time and frequency mapped onto [-1, 1], so that one set of
+segments serves every channel of a wideband observation. The file layout
+follows the tempo2 ChebyModelSet predictor files:
+
+    ChebyModelSet 2 segments
+    ChebyModel BEGIN
+    PSRNAME B1855+09
+    SITENAME ao
+    TIME_RANGE 55000.0 55000.041666666666666668
+    FREQ_RANGE 1100.0 1700.0
+    DISPERSION_CONSTANT -1234.5
+    NCOEFF_TIME 12
+    NCOEFF_FREQ 2
+    COEFFS C(0,0) C(0,1)
+    COEFFS C(1,0) C(1,1)
+    ...
+    ChebyModel END
+
+where, as in tempo2, the C(i,0) and C(0,j) coefficients enter the sums
+above with half weight (and C(0,0) with a quarter weight). The absolute
+phase is carried in the coefficients, so they are written and evaluated in
+extended precision.
+"""
+from __future__ import absolute_import, print_function, division
+import numpy as np
+import numpy.polynomial.chebyshev as cheb
+import pint.toa as toa
+import pint.utils as utils
+from ..phase import Phase
+from .dispersion_model import DMconst
+from .polycos import _dd_add, _dd_mul, _two_prod, _to_dd
+
+SECS_PER_DAY = 86400.0
+
+
+def _dd_div(ah, al, b):
+    """Divide double-double (ah, al) by the double b."""
+    q = ah/b
+    p, e = _two_prod(q, b)
+    r = ((ah - p) - e + al)/b
+    hi = q + r
+    return hi, r - (hi - q)
+
+
+def _fit_cheby_segments(model, tStart, tStop, obs, freqStart, freqStop,
+                        ncoeffTime, ncoeffFreq, numNodes, dispConst):
+    """Fit the Chebyshev coefficients of a set of segments.
+
+    The model is phased once at a grid of Chebyshev nodes in time and
+    frequency for every segment (plus each segment midpoint). In the mapped
+    coordinates the nodes are the same for every segment, so all the
+    segments are fitted by one least-squares solve with one right-hand side
+    per segment.
+
+    Return
+    ---------
+    (nseg x ncoeffTime x ncoeffFreq) longdouble coefficients, with the
+    T_i(x) T_j(y) terms at full weight.
+    """
+    nseg = len(tStart)
+    numFreqNodes = max(2*ncoeffFreq, ncoeffFreq+1)
+    xn = np.cos(np.pi*(np.arange(numNodes)+0.5)/numNodes)
+    yn = np.cos(np.pi*(np.arange(numFreqNodes)+0.5)/numFreqNodes)
+    X, Y = [a.ravel() for a in np.meshgrid(xn, yn, indexing='ij')]
+    tmid = (tStart+tStop)/2.0
+    halfSpan = (tStop-tStart)/2.0
+    fmid = (freqStart+freqStop)/2.0
+    fhalf = (freqStop-freqStart)/2.0
+    # Each segment has its grid of nodes followed by its midpoint
+    times = np.hstack((tmid[:,None] + halfSpan[:,None]*X[None,:],
+                       tmid[:,None])).ravel()
+    freqs = np.tile(np.append(fmid + fhalf*Y, fmid), nseg)
+    mjdInt = np.floor(times)
+    tt = toa.build_toa_table(mjdInt, times-mjdInt, 0.0, freqs, obs, None)
+    toas = toa.get_TOAs_table(tt)
+    ph = model.phase(toas.table)
+    order = np.argsort(toas.table['index'])
+    phInt = ph.int.value[order].reshape(nseg, len(X)+1)
+    phFrac = ph.frac.value[order].reshape(nseg, len(X)+1)
+    refInt, refFrac = phInt[:,-1], phFrac[:,-1]
+    # Phase relative to the midpoint, without the F0 and dispersion terms
+    F0 = np.longdouble(model.F0.value)
+    dts = (halfSpan[:,None]*X[None,:])*SECS_PER_DAY
+    disp = dispConst*(1.0/(fmid + fhalf*Y)**2 - 1.0/fmid**2)
+    rdcPhase = ((phInt[:,:-1]-refInt[:,None]) +
+                (phFrac[:,:-1]-refFrac[:,None]) -
+                dts*F0).astype(float) - disp[None,:]
+    A = cheb.chebvander2d(X, Y, [ncoeffTime-1, ncoeffFreq-1])
+    c = np.linalg.lstsq(A, rdcPhase.T, rcond=-1)[0]
+    coeffs = c.T.reshape(nseg, ncoeffTime, ncoeffFreq).astype(np.longdouble)
+    # Put back the reference phase and the F0 term (F0*dt = F0*span/2*x)
+    coeffs[:,0,0] += (np.longdouble(refInt) + np.longdouble(refFrac) -
+                      dispConst/fmid**2)
+    if ncoeffTime > 1:
+        coeffs[:,1,0] += F0*halfSpan*SECS_PER_DAY
+    return coeffs
+
+
+class ChebyPredictor(object):
+    """
+    A set of Chebyshev phase predictor segments, contiguous in time and
+    sharing one frequency range.
+
+    Predictors are generated from a TimingModel with generate_predictor(),
+    or read from a file with read_predictor_file(). All the evaluation
+    methods take arrays of times and frequencies in any order.
+    """
+    def __init__(self):
+        self.psr = None
+        self.obs = None
+        self.tStart = None
+        self.tStop = None
+        self.freqStart = None
+        self.freqStop = None
+        self.dispersionConstant = None
+        self.coeffs = None
+
+    def _set_segments(self, tStart, tStop, freqStart, freqStop, dispConst,
+                      coeffs):
+        order = np.argsort(tStart)
+        self.tStart = np.asarray(tStart, dtype=np.longdouble)[order]
+        self.tStop = np.asarray(tStop, dtype=np.longdouble)[order]
+        nseg = len(self.tStart)
+        self.freqStart = (np.zeros(nseg) + freqStart)[order]
+        self.freqStop = (np.zeros(nseg) + freqStop)[order]
+        self.dispersionConstant = (np.zeros(nseg) + dispConst)[order]
+        self.coeffs = np.asarray(coeffs, dtype=np.longdouble)[order]
+        # Evaluation arrays
+        self._tmid = _to_dd((self.tStart+self.tStop)/2.0)
+        self._halfSpan = ((self.tStop-self.tStart)/2.0).astype(float)
+        self._coeffs = _to_dd(self.coeffs)
+        self._dcoeffs = cheb.chebder(self.coeffs.astype(float), axis=1)
+
+    def generate_predictor(self, model, mjdStart, mjdEnd, obs, segLength,
+                           freqStart, freqStop, ncoeffTime=12, ncoeffFreq=2,
+                           numNodes=20):
+        """
+        Generate the predictor segments.
+
+        Parameters
+        ---------
+        model : TimingModel
+            TimingModel to generate the predictor with parameters setup.
+        mjdStart, mjdEnd : float / numpy longdouble
+            Time range of the predictor in mjd
+        obs : str
+            Observatory code
+        segLength : float
+            Length of each segment [unit: minutes]
+        freqStart, freqStop : float
+            Frequency range [unit: MHz]
+        ncoeffTime, ncoeffFreq : int
+            Number of Chebyshev coefficients in time and in frequency
+        numNodes : int optional. Default 20
+            Number of time nodes for fitting. It cannot be less than
+            ncoeffTime.
+        """
+        mjdStart = np.longdouble(mjdStart)
+        mjdEnd = np.longdouble(mjdEnd)
+        if freqStop <= freqStart:
+            raise ValueError("The frequency range %s-%s MHz is empty."
+                             % (freqStart, freqStop))
+        edges = np.arange(mjdStart, mjdEnd,
+                          np.longdouble(segLength)/(60*24),
+                          dtype=np.longdouble)
+        if edges[-1] < mjdEnd:
+            edges = np.append(edges, mjdEnd)
+        numNodes = max(numNodes, ncoeffTime+1)
+        if 'DM' in model.params:
+            dispConst = -float(model.F0.value)*model.DM.value*DMconst.value
+        else:
+            dispConst = 0.0
+        tStart, tStop = edges[:-1], edges[1:]
+        coeffs = _fit_cheby_segments(model, tStart, tStop, obs,
+                                     float(freqStart), float(freqStop),
+                                     ncoeffTime, ncoeffFreq, numNodes,
+                                     dispConst)
+        self.psr = model.PSR.value
+        self.obs = obs
+        self._set_segments(tStart, tStop, float(freqStart), float(freqStop),
+                           dispConst, coeffs)
+
+    def find_segment(self, t, freq):
+        """Find the segment index for each input time and frequency."""
+        if self.coeffs is None:
+            raise AttributeError("Insufficent predictor data. Please read or "
+                                 "generate the predictor correctly.")
+        segIndex = np.searchsorted(self.tStart, t, side='right')-1
+        ok = segIndex >= 0
+        i = np.maximum(segIndex, 0)
+        ok &= ((t <= self.tStop[i]) & (freq >= self.freqStart[i]) &
+               (freq <= self.freqStop[i]))
+        if not np.all(ok):
+            bad = np.flatnonzero(~ok)
+            raise ValueError("Input time/frequency (%s, %s) is not covered "
+                             "by the predictor." % (t[bad[0]], freq[bad[0]]))
+        return segIndex
+
+    def _mapped(self, t, freq):
+        t = np.atleast_1d(np.asarray(t, dtype=np.longdouble))
+        freq = np.zeros(len(t)) + np.asarray(freq, dtype=np.float64)
+        i = self.find_segment(t, freq)
+        th, tl = _to_dd(t)
+        xh, xl = _dd_add(th, tl, -self._tmid[0][i], -self._tmid[1][i])
+        xh, xl = _dd_div(xh, xl, self._halfSpan[i])
+        fmid = (self.freqStart[i]+self.freqStop[i])/2.0
+        y = (freq-fmid)/((self.freqStop[i]-self.freqStart[i])/2.0)
+        ty = [np.ones_like(y), y]
+        for j in range(2, self.coeffs.shape[2]):
+            ty.append(2*y*ty[-1] - ty[-2])
+        return i, freq, (xh, xl), ty
+
+    def eval_abs_phase(self, t, freq):
+        """
+        Predictor evaluated absolute phase.
+
+        Parameters
+        ---------
+        t : numpy.ndarray or a single number
+            Times in mjd, in any order.
+        freq : numpy.ndarray or a single number
+            Observing frequencies in MHz, broadcast against t.
+
+        Returns
+        ---------
+        out: PINT Phase class
+             Absolute phases, in the order of t. The time sum is evaluated
+             by Clenshaw's recurrence in double-double precision.
+        """
+        i, freq, (xh, xl), ty = self._mapped(t, freq)
+        ch, cl = self._coeffs
+
+        def row(k):
+            s = np.zeros_like(xh)
+            for j in range(1, len(ty)):
+                s += ch[i,k,j]*ty[j]
+            return _dd_add(ch[i,k,0], cl[i,k,0], s, 0.0)
+
+        zero = np.zeros_like(xh)
+        b1, b2 = (zero, zero), (zero, zero)
+        for k in range(self.coeffs.shape[1]-1, 0, -1):
+            b = _dd_mul(2*xh, 2*xl, *b1)
+            b = _dd_add(b[0], b[1], -b2[0], -b2[1])
+            b2, b1 = b1, _dd_add(b[0], b[1], *row(k))
+        ph = _dd_mul(xh, xl, *b1)
+        ph = _dd_add(ph[0], ph[1], -b2[0], -b2[1])
+        ph = _dd_add(ph[0], ph[1], *row(0))
+        ph = _dd_add(ph[0], ph[1], self.dispersionConstant[i]/freq**2, 0.0)
+        ip = np.floor(ph[0] + 0.5)
+        return Phase(ip, (ph[0] - ip) + ph[1])
+
+    def eval_phase(self, t, freq):
+        """Predictor evaluated fractional phase, see eval_abs_phase()."""
+        return self.eval_abs_phase(t, freq).frac
+
+    def eval_spin_freq(self, t, freq):
+        """
+        Predictor evaluated apparent spin frequency, d(phase)/dt in Hz, at
+        times t (mjd) and observing frequencies freq (MHz).
+        """
+        i, freq, (xh, xl), ty = self._mapped(t, freq)
+        d = self._dcoeffs
+        vals = [sum(d[i,k,j]*ty[j] for j in range(len(ty)))
+                for k in range(d.shape[1])]
+        return cheb.chebval(xh, vals, tensor=False) / \
+            (self._halfSpan[i]*SECS_PER_DAY)
+
+    def write_predictor_file(self, filename):
+        """Write the predictor to a tempo2 style ChebyModelSet file."""
+        # Half weight for the zeroth order coefficients, as in tempo2
+        c = self.coeffs.copy()
+        c[:,0,:] *= 2
+        c[:,:,0] *= 2
+        ls = utils.longdouble2string
+        with open(filename, 'w') as f:
+            f.write("ChebyModelSet %d segments\n" % len(c))
+            for n in range(len(c)):
+                f.write("ChebyModel BEGIN\n")
+                f.write("PSRNAME %s\n" % self.psr)
+                f.write("SITENAME %s\n" % self.obs)
+                f.write("TIME_RANGE %s %s\n" % (ls(self.tStart[n]),
+                                                ls(self.tStop[n])))
+                f.write("FREQ_RANGE %r %r\n" % (self.freqStart[n],
+                                                self.freqStop[n]))
+                f.write("DISPERSION_CONSTANT %r\n" %
+                        self.dispersionConstant[n])
+                f.write("NCOEFF_TIME %d\n" % c.shape[1])
+                f.write("NCOEFF_FREQ %d\n" % c.shape[2])
+                for row in c[n]:
+                    f.write("COEFFS %s\n" % " ".join(ls(x) for x in row))
+                f.write("ChebyModel END\n")
+
+    def read_predictor_file(self, filename):
+        """Read a tempo2 style ChebyModelSet predictor file."""
+        segs = []
+        with open(filename) as f:
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                key = fields[0]
+                if key == 'ChebyModel' and fields[1] == 'BEGIN':
+                    seg = {}
+                elif key == 'ChebyModel' and fields[1] == 'END':
+                    segs.append(seg)
+                elif key in ('TIME_RANGE', 'COEFFS'):
+                    seg.setdefault(key, []).extend(
+                        utils.str2longdouble(x) for x in fields[1:])
+                elif key in ('PSRNAME', 'SITENAME'):
+                    seg[key] = fields[1]
+                elif key != 'ChebyModelSet':
+                    seg[key] = [float(x) for x in fields[1:]]
+        if len(segs) == 0:
+            raise ValueError("No ChebyModel segments in %s" % filename)
+        shape = (int(segs[0]['NCOEFF_TIME'][0]),
+                 int(segs[0]['NCOEFF_FREQ'][0]))
+        if any(len(s['COEFFS']) != shape[0]*shape[1] for s in segs):
+            raise ValueError("Inconsistent number of coefficients in %s"
+                             % filename)
+        coeffs = np.array([s['COEFFS'] for s in segs],
+                          dtype=np.longdouble).reshape((-1,) + shape)
+        coeffs[:,0,:] /= 2
+        coeffs[:,:,0] /= 2
+        self.psr = segs[0].get('PSRNAME')
+        self.obs = segs[0].get('SITENAME')
+        self._set_segments([s['TIME_RANGE'][0] for s in segs],
+                           [s['TIME_RANGE'][1] for s in segs],
+                           np.array([s['FREQ_RANGE'][0] for s in segs]),
+                           np.array([s['FREQ_RANGE'][1] for s in segs]),
+                           [s['DISPERSION_CONSTANT'][0] for s in segs],
+                           coeffs)
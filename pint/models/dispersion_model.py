@@ -177,6 +177,7 @@ class DispersionDMX(Dispersion):
                        parameter_type='MJD', time_scale='utc'))
         self.dm_value_funcs += [self.dmx_dm,]
         self.set_special_params(['DMX_0001', 'DMXR1_0001','DMXR2_0001'])
+        self._deriv_bfreq = None
 
     def setup(self):
         super(DispersionDMX, self).setup()
@@ -199,6 +200,8 @@ class DispersionDMX(Dispersion):
         for prefix_par in self.get_params_of_type('prefixParameter'):
             if prefix_par.startswith('DMX_'):
                 self.register_deriv_funcs(self.d_delay_d_DMX, prefix_par)
+                self.register_sparse_deriv_funcs(self.d_delay_d_DMX_sparse,
+                                                 prefix_par)
 
     def dmx_dm(self, toas):
         condition = {}
@@ -218,8 +221,29 @@ class DispersionDMX(Dispersion):
            dm[v] = getattr(self, k).quantity
         return dm
 
-    def d_delay_d_DMX(self, toas, param_name, acc_delay=None):
-        condition = {}
+    def prepare_derivs(self, toas, acc_delay=None):
+        """Compute the barycentric frequencies once for all the DMX columns.
+        """
+        self._deriv_bfreq = None
+        self._deriv_bfreq = self.dmx_bfreq(toas)
+
+    def release_derivs(self):
+        self._deriv_bfreq = None
+
+    def dmx_bfreq(self, toas):
+        """Return the frequencies used for the DMX derivatives."""
+        if self._deriv_bfreq is not None and \
+                len(self._deriv_bfreq) == len(toas):
+            return self._deriv_bfreq
+        try:
+            bfreq = self.barycentric_radio_freq(toas)
+        except AttributeError:
+            warn("Using topocentric frequency for dedispersion!")
+            bfreq = toas['freq']
+        return bfreq
+
+    def dmx_toa_index(self, toas, param_name):
+        """Return the index of the TOAs inside a DMX parameter's range."""
         if not hasattr(self, 'dmx_toas_selector'):
             self.dmx_toas_selector = TOASelect(is_range=True)
         param = getattr(self, param_name)
@@ -230,17 +254,21 @@ class DispersionDMX(Dispersion):
         r2 = getattr(self, DMXR2_mapping[dmx_index]).quantity
         condition = {param_name:(r1.mjd, r2.mjd)}
         select_idx = self.dmx_toas_selector.get_select_index(condition, toas['mjd_float'])
+        return select_idx[param_name]
 
-        try:
-            bfreq = self.barycentric_radio_freq(toas)
-        except AttributeError:
-            warn("Using topocentric frequency for dedispersion!")
-            bfreq = toas['freq']
+    def d_delay_d_DMX(self, toas, param_name, acc_delay=None):
+        idx = self.dmx_toa_index(toas, param_name)
+        bfreq = self.dmx_bfreq(toas)
         dmx = np.zeros(len(toas))
-        for k, v in select_idx.items():
-           dmx[v] = 1.0
+        dmx[idx] = 1.0
         return DMconst * dmx / bfreq**2.0
 
+    def d_delay_d_DMX_sparse(self, toas, param_name, acc_delay=None):
+        """Sparse d_delay_d_DMX, only for the TOAs inside the DMX range."""
+        idx = self.dmx_toa_index(toas, param_name)
+        bfreq = self.dmx_bfreq(toas)
+        return idx, DMconst / bfreq[idx]**2.0
+
     def print_par(self,):
         result = ''
         DMX_mapping = self.get_prefix_mapping_component('DMX_')
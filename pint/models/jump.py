@@ -31,6 +31,7 @@ class DelayJump(DelayComponent):
                 self.jumps.append(mask_par)
         for j in self.jumps:
             self.register_deriv_funcs(self.d_delay_d_jump, j)
+            self.register_sparse_deriv_funcs(self.d_delay_d_jump_sparse, j)
 
     def jump_delay(self, toas, acc_delay=None):
         """This method returns the jump delays for each toas section collected by
@@ -53,6 +54,12 @@ class DelayJump(DelayComponent):
         d_delay_d_j[mask] = -1.0
         return d_delay_d_j * u.second/jpar.units
 
+    def d_delay_d_jump_sparse(self, toas, jump_param, acc_delay=None):
+        """Sparse d_delay_d_jump, only for the TOAs the jump selects."""
+        jpar = getattr(self, jump_param)
+        idx = numpy.arange(len(toas))[jpar.select_toa_mask(toas)]
+        return idx, -numpy.ones(len(idx)) * u.second/jpar.units
+
     def print_par(self):
         result = ''
         for jump in self.jumps:
@@ -78,6 +85,7 @@ class PhaseJump(PhaseComponent):
                 self.jumps.append(mask_par)
         for j in self.jumps:
             self.register_deriv_funcs(self.d_phase_d_jump, j)
+            self.register_sparse_deriv_funcs(self.d_phase_d_jump_sparse, j)
 
     def jump_phase(self, toas, delay):
         """This method returns the jump phase for each toas section collected by
@@ -101,6 +109,14 @@ class PhaseJump(PhaseComponent):
         with u.set_enabled_equivalencies(dimensionless_cycles):
             return (d_phase_d_j * self.F0.units).to(u.cycle/u.second)
 
+    def d_phase_d_jump_sparse(self, toas, jump_param, delay):
+        """Sparse d_phase_d_jump, only for the TOAs the jump selects."""
+        jpar = getattr(self, jump_param)
+        idx = numpy.arange(len(toas))[jpar.select_toa_mask(toas)]
+        d_phase_d_j = numpy.repeat(self.F0.value, len(idx))
+        with u.set_enabled_equivalencies(dimensionless_cycles):
+            return idx, (d_phase_d_j * self.F0.units).to(u.cycle/u.second)
+
     def print_par(self):
         result = ''
         for jump in self.jumps:
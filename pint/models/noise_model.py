@@ -13,6 +13,7 @@ class NoiseComponent(Component):
         self.covariance_matrix_funcs = []
         self.scaled_sigma_funcs = []
         self.basis_funcs = []
+        self.ecorr_funcs = []
 
 class ScaleToaError(NoiseComponent):
     """This is a class to correct template fitting timing noise.
@@ -147,7 +148,7 @@ class EcorrNoise(NoiseComponent):
 
 
         self.covariance_matrix_funcs += [self.ecorr_cov_matrix, ]
-        self.basis_funcs += [self.ecorr_basis_weight_pair, ]
+        self.ecorr_funcs += [self.ecorr_epochs_weight_pair, ]
 
     def setup(self):
         super(EcorrNoise, self).setup()
@@ -172,6 +173,23 @@ class EcorrNoise(NoiseComponent):
             ecorrs.append(getattr(self, ecorr))
         return ecorrs
 
+    def ecorr_epochs_weight_pair(self, toas):
+        """Return the observing epochs and their ECORR weights.
+
+        The epochs are given as a list of TOA index arrays, one per epoch
+        with at least two TOAs. The weights are the square of the ECORR
+        values, in s^2.
+        """
+        t = (toas['tdbld'].quantity * u.day).to(u.s).value
+        epochs = []
+        weight = []
+        for ec in self.get_ecorrs():
+            idx = np.arange(len(t))[ec.select_toa_mask(toas)]
+            ec_epochs = [idx[e] for e in quantization_epochs(t[idx])]
+            epochs += ec_epochs
+            weight += [ec.quantity.to(u.s).value ** 2] * len(ec_epochs)
+        return (epochs, np.array(weight))
+
     def ecorr_basis_weight_pair(self, toas):
         """Return a quantization matrix and ECORR weights.
 
@@ -179,22 +197,10 @@ class EcorrNoise(NoiseComponent):
         The weights used are the square of the ECORR values.
 
         """
-        t = (toas['tdbld'].quantity * u.day).to(u.s).value
-        ecorrs = self.get_ecorrs()
-        Umats = []
-        for ec in ecorrs:
-            mask = ec.select_toa_mask(toas)
-            Umats.append(create_quantization_matrix(t[mask]))
-        nc = np.sum(U.shape[1] for U in Umats)
-        Umat = np.zeros((len(t), nc))
-        weight = np.zeros(nc)
-        nctot = 0
-        for ct, ec in enumerate(ecorrs):
-            mask = ec.select_toa_mask(toas)
-            nn = Umats[ct].shape[1]
-            Umat[mask, nctot:nn+nctot] = Umats[ct]
-            weight[nctot:nn+nctot] = ec.quantity.to(u.s).value ** 2
-            nctot += nn
+        epochs, weight = self.ecorr_epochs_weight_pair(toas)
+        Umat = np.zeros((len(toas), len(epochs)))
+        for ii, e in enumerate(epochs):
+            Umat[e, ii] = 1
         return (Umat, weight)
 
     def ecorr_cov_matrix(self, toas):
@@ -272,25 +278,30 @@ class PLRedNoise(NoiseComponent):
         return np.dot(Fmat * phi[None,:], Fmat.T)
 
 
-def create_quantization_matrix(toas, dt=1, nmin=2):
-    """Create quantization matrix mapping TOAs to observing epochs."""
-    isort = np.argsort(toas)
-
-    bucket_ref = [toas[isort[0]]]
-    bucket_ind = [[isort[0]]]
-
-    for i in isort[1:]:
-        if toas[i] - bucket_ref[-1] < dt:
-            bucket_ind[-1].append(i)
-        else:
-            bucket_ref.append(toas[i])
-            bucket_ind.append([i])
+def quantization_epochs(toas, dt=1, nmin=2):
+    """Group TOAs into observing epochs.
 
-    # find only epochs with more than 1 TOA
-    bucket_ind2 = [ind for ind in bucket_ind if len(ind) >= nmin]
+    An epoch starts at the earliest TOA not yet assigned and takes all the
+    TOAs less than dt later. Return a list of index arrays, one per epoch
+    with at least nmin TOAs.
+    """
+    isort = np.argsort(toas, kind='mergesort')
+    tsort = toas[isort]
+    epochs = []
+    lo = 0
+    while lo < len(tsort):
+        hi = np.searchsorted(tsort, tsort[lo] + dt, side='left')
+        hi = max(hi, lo + 1)
+        if hi - lo >= nmin:
+            epochs.append(isort[lo:hi])
+        lo = hi
+    return epochs
 
-    U = np.zeros((len(toas),len(bucket_ind2)),'d')
-    for i,l in enumerate(bucket_ind2):
+def create_quantization_matrix(toas, dt=1, nmin=2):
+    """Create quantization matrix mapping TOAs to observing epochs."""
+    epochs = quantization_epochs(toas, dt, nmin)
+    U = np.zeros((len(toas),len(epochs)),'d')
+    for i,l in enumerate(epochs):
         U[l,i] = 1
 
     return U
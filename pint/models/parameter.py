@@ -14,9 +14,14 @@ import astropy.constants as const
 from astropy.coordinates.angles import Angle
 import re
 import numbers
+import itertools
 from . import priors
 from ..toa_select import TOASelect
 
+# Source of parameter version numbers. Every change of a parameter value takes
+# a new number, so a version never repeats, not even across model copies.
+_version_counter = itertools.count(1)
+
 
 class Parameter(object):
     """A base PINT class describing a single timing model parameter.
@@ -171,6 +176,7 @@ class Parameter(object):
         """General wrapper method to set .quantity. For different type of
         parameters, the setter method is stored at .set_quantity attribute.
         """
+        self._version = next(_version_counter)
         if val is None:
             if hasattr(self, 'quantity') and self.quantity is not None:
                 raise ValueError('Setting an exist value to None is not'
@@ -180,6 +186,12 @@ class Parameter(object):
                 return
         self._quantity = self.set_quantity(val)
 
+    @property
+    def version(self):
+        """A number that changes whenever the parameter value is set.
+        """
+        return self._version
+
     def prior_pdf(self,value=None, logpdf=False):
         """Return the prior probability, evaluated at the current value of
         the parameter, or at a proposed value.
@@ -221,6 +233,7 @@ class Parameter(object):
                                  'parameter value.')
             else:
                 self.value = val
+        self._version = next(_version_counter)
         self._quantity = self.set_quantity(val)
 
     @property
@@ -993,6 +1006,10 @@ class prefixParameter(object):
     def value(self, val):
         self.param_comp.value = val
 
+    @property
+    def version(self):
+        return self.param_comp.version
+
     @property
     def uncertainty(self):
         return self.param_comp.uncertainty
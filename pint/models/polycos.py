@@ -3,6 +3,7 @@
 # information and the polynomial coefficients
 from __future__ import absolute_import, print_function, division
 import functools
+import multiprocessing
 from ..phase import Phase
 import numpy as np
 import pint.toa as toa
@@ -16,6 +17,128 @@ from astropy.io import registry
 MIN_PER_DAY = 60.0*24.0
 
 
+# Double-double arithmetic: a value is carried as the unevaluated sum of two
+# doubles (hi, lo), giving about 32 significant digits on any platform.
+def _two_sum(a, b):
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+def _split(a):
+    c = 134217729.0*a  # 2**27 + 1
+    hi = c - (c - a)
+    return hi, a - hi
+
+def _two_prod(a, b):
+    p = a*b
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, ((ah*bh - p) + ah*bl + al*bh) + al*bl
+
+def _dd_add(ah, al, bh, bl):
+    s, e = _two_sum(ah, bh)
+    e = e + (al + bl)
+    hi = s + e
+    return hi, e - (hi - s)
+
+def _dd_mul(ah, al, bh, bl):
+    p, e = _two_prod(ah, bh)
+    e = e + (ah*bl + al*bh)
+    hi = p + e
+    return hi, e - (hi - p)
+
+def _to_dd(x):
+    """Split (long double) values into double-double (hi, lo)."""
+    x = np.asarray(x, dtype=np.longdouble)
+    hi = x.astype(np.float64)
+    return hi, (x - hi).astype(np.float64)
+
+def _eval_polyco_phase(t, tmid, rphaseInt, rphaseFrac, f0, coeffs):
+    """Evaluate polyco phases in double-double precision.
+
+    All the arguments are arrays over the times t (in mjd), except coeffs,
+    which is a (len(t) x ncoeff) array, and may be broadcast from single
+    values.
+
+    phase = RPHASE + DT*60*F0 + COEFF(1) + DT*COEFF(2) + DT^2*COEFF(3) + ...
+    with DT = (T-TMID)*1440, the polynomial evaluated by Horner's scheme.
+    """
+    th, tl = _to_dd(t)
+    mh, ml = _to_dd(tmid)
+    dth, dtl = _dd_add(th, tl, -mh, -ml)
+    dth, dtl = _dd_mul(dth, dtl, MIN_PER_DAY, 0.0)
+    coeffs = np.asarray(coeffs, dtype=np.longdouble)
+    ch, cl = _to_dd(coeffs[..., -1])
+    for i in range(coeffs.shape[-1]-2, -1, -1):
+        ch, cl = _dd_mul(ch, cl, dth, dtl)
+        ch, cl = _dd_add(ch, cl, *_to_dd(coeffs[..., i]))
+    fh, fl = _to_dd(np.longdouble(f0)*60)
+    ph, pl = _dd_mul(dth, dtl, fh, fl)
+    ph, pl = _dd_add(ph, pl, ch, cl)
+    ph, pl = _dd_add(ph, pl, *_to_dd(rphaseFrac))
+    # The integer part of the reference phase is exact as a double
+    ip = np.asarray(rphaseInt, dtype=np.float64) + np.floor(ph + 0.5)
+    frac = (ph - np.floor(ph + 0.5)) + pl
+    return Phase(ip, frac)
+
+def _fit_polyco_segments(model, tStart, tStop, obs, obsFreq, ncoeff,
+                         numNodes):
+    """Fit the polyco coefficients of a set of segments.
+
+    The node times and midpoints of all the segments are prepared as one
+    set of TOAs and phased with a single model.phase() call. The segments
+    that share the same length (all but possibly the last one) share the
+    same node offsets, so their polynomials are fitted together by one
+    least-squares solve with one right-hand side per segment.
+
+    Parameters
+    ---------
+    tStart, tStop : numpy longdouble arrays
+        Start and stop of each segment in mjd
+
+    Return
+    ---------
+    (tmid, refPhaseInt, refPhaseFrac, coeffs), with the midpoints in mjd,
+    the model phases at the midpoints and the (nseg x ncoeff) coefficients.
+    """
+    nseg = len(tStart)
+    tmid = (tStart+tStop)/2.0
+    # Each segment has numNodes nodes followed by its midpoint
+    frac = np.linspace(0.0, 1.0, numNodes).astype(np.longdouble)
+    nodes = tStart[:,None] + (tStop-tStart)[:,None]*frac[None,:]
+    times = np.hstack((nodes, tmid[:,None])).ravel()
+    mjdInt = np.floor(times)
+    tt = toa.build_toa_table(mjdInt, times-mjdInt, 0.0, obsFreq, obs, None)
+    toas = toa.get_TOAs_table(tt)
+    ph = model.phase(toas.table)
+    # Put the phases back in the order of times
+    order = np.argsort(toas.table['index'])
+    phInt = ph.int.value[order].reshape(nseg, numNodes+1)
+    phFrac = ph.frac.value[order].reshape(nseg, numNodes+1)
+    refInt, refFrac = phInt[:,-1], phFrac[:,-1]
+    # Phase relative to the midpoint, without the F0 term
+    dt = (nodes-tmid[:,None])*MIN_PER_DAY
+    rdcPhase = ((phInt[:,:-1]-refInt[:,None]) +
+                (phFrac[:,:-1]-refFrac[:,None]) -
+                dt*np.longdouble(model.F0.value)*60.0).astype(float)
+    dtd = dt.astype(float)  # Truncate to double
+    coeffs = np.zeros((nseg, ncoeff))
+    spans = np.round((tStop-tStart).astype(float)*MIN_PER_DAY, 9)
+    for span in np.unique(spans):
+        segs = np.flatnonzero(spans == span)
+        A = np.vander(dtd[segs[0]], ncoeff, increasing=True)
+        # Scale the columns, as numpy.polyfit does
+        scale = np.sqrt((A*A).sum(axis=0))
+        c = np.linalg.lstsq(A/scale, rdcPhase[segs].T, rcond=-1)[0]
+        coeffs[segs] = (c/scale[:,None]).T
+    return tmid, refInt, refFrac, coeffs
+
+_pool_polyco_model = None
+
+def _fit_polyco_block(args):
+    return _fit_polyco_segments(_pool_polyco_model, *args)
+
+
 class polycoEntry:
     """
     Polyco Entry class:
@@ -65,18 +188,11 @@ class polycoEntry:
 
     def evalabsphase(self,t):
         '''Return the phase at time t, computed with this polyco entry'''
-        dt = (np.longdouble(t)-self.tmid.value)*np.longdouble(1440.0)
-        # Compute polynomial by factoring out the dt's
-        phase = Phase(self.coeffs[self.ncoeff-1]) # Compute phase using two long double
-        for i in range(self.ncoeff-2,-1,-1):
-            pI = Phase(dt*phase.int)
-            pF = Phase(dt*phase.frac)
-            c = Phase(self.coeffs[i])
-            phase = pI+pF+c
-
-        # Add DC term
-        phase += self.rphase +Phase(dt*60.0*self.f0)
-        return(phase)
+        t = np.atleast_1d(np.asarray(t, dtype=np.longdouble))
+        return _eval_polyco_phase(t, self.tmid.value,
+                                  np.ravel(self.rphase.int.value)[0],
+                                  np.ravel(self.rphase.frac.value)[0], self.f0,
+                                  self.coeffs[None,:])
 
     def evalphase(self,t):
         '''Return the phase at time t, computed with this polyco entry'''
@@ -338,6 +454,7 @@ class Polycos(object):
         self.fileFormat = None
         self.newFileName = None
         self.polycoTable = None
+        self._arraysTable = None
         self.polycoFormat = [{'format': 'tempo',
                             'read_method' : tempo_polyco_table_reader,
                             'write_method' : tempo_polyco_table_writer},]
@@ -415,7 +532,7 @@ class Polycos(object):
 
     def generate_polycos(self, model, mjdStart, mjdEnd, obs,
                          segLength, ncoeff, obsFreq, maxha = 12.0,
-                         method = "TEMPO", numNodes = 20):
+                         method = "TEMPO", numNodes = 20, nproc = 1):
         """
         Generate the polyco data.
 
@@ -453,6 +570,11 @@ class Polycos(object):
             Number of nodes for fitting. It cannot be less then the number of
             coefficents.
 
+        nproc : int optional. Default 1
+            Number of processes. The segments are split into nproc blocks
+            of consecutive segments, each prepared and fitted by a process
+            forked from this one.
+
         Return
         ---------
         A polyco table.
@@ -466,9 +588,6 @@ class Polycos(object):
         obsFreq = float(obsFreq)
         month = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug',
                  'Sep','Oct','Nov','Dec']
-        # Alocate memery
-        coeffs = np.longdouble(np.zeros(ncoeff))
-        entryList = []
         entryIntvl = np.arange(mjdStart.value,mjdEnd.value,
                                 segLength.to('day').value)
         if entryIntvl[-1] < mjdEnd.value:
@@ -481,43 +600,48 @@ class Polycos(object):
         # generate the ploynomial coefficents
         if method == "TEMPO":
             # Using tempo1 method to create polycos
-            for i in range(len(entryIntvl)-1):
-                tStart = entryIntvl[i]
-                tStop = entryIntvl[i+1]
-                nodes = np.linspace(tStart,tStop,numNodes)
-                tmid = ((tStart+tStop)/2.0)*u.day
-                toaMid = toa.get_TOAs_list([toa.TOA((np.modf(tmid.value)[1],
-                                    np.modf(tmid.value)[0]),obs = obs,
-                                    freq = obsFreq),])
-                refPhase = model.phase(toaMid.table)
-                mjdSpan = ((tStop-tStart)*u.day).to('min')
-                # Create node toas(Time sample using TOA class)
-                toaList = [toa.TOA((np.modf(toaNode)[1],
-                                    np.modf(toaNode)[0]),obs = obs,
-                                    freq = obsFreq) for toaNode in nodes]
-
-                toas = toa.get_TOAs_list(toaList)
-
-                ph = model.phase(toas.table)
-                dt = (nodes*u.day - tmid).to('min') # Use constant
-                rdcPhase = ph-refPhase
-                rdcPhase = rdcPhase.int-(dt.value*model.F0.value*60.0)*u.cycle+rdcPhase.frac
-                dtd = dt.value.astype(float)  # Truncate to double
-                rdcPhased = rdcPhase.astype(float)
-                coeffs = np.polyfit(dtd,rdcPhased,ncoeff-1)
-                coeffs = coeffs[::-1]
-                midTime = at.Time(int(tmid.value),np.modf(tmid.value)[0],
-                                  format = 'mjd',scale = 'utc')
-                date,hms = midTime.iso.split()
+            tStart = entryIntvl[:-1]
+            tStop = entryIntvl[1:]
+            nproc = min(nproc, len(tStart))
+            if nproc > 1:
+                global _pool_polyco_model
+                _pool_polyco_model = model
+                blocks = [(tStart[b], tStop[b], obs, obsFreq, ncoeff,
+                           numNodes) for b in
+                          np.array_split(np.arange(len(tStart)), nproc)]
+                try:
+                    ctx = multiprocessing.get_context('fork')
+                except AttributeError:
+                    # Python 2 always forks on POSIX systems
+                    ctx = multiprocessing
+                pool = ctx.Pool(nproc)
+                try:
+                    results = pool.map(_fit_polyco_block, blocks)
+                finally:
+                    pool.close()
+                    pool.join()
+                    _pool_polyco_model = None
+                tmid, refInt, refFrac, coeffs = \
+                    [np.concatenate(r) for r in zip(*results)]
+            else:
+                tmid, refInt, refFrac, coeffs = _fit_polyco_segments(
+                    model, tStart, tStop, obs, obsFreq, ncoeff, numNodes)
+            mjdSpan = tStop-tStart
+            midTimes = at.Time(np.floor(tmid).astype(float),
+                               (tmid-np.floor(tmid)).astype(float),
+                               format = 'mjd',scale = 'utc')
+            entryList = []
+            for i, iso in enumerate(midTimes.iso):
+                date,hms = iso.split()
                 yy,mm,dd = date.split('-')
                 date = dd+'-'+month[int(mm)-1]+'-'+yy[2:4]
                 hms = hms.replace(':',"")
-                entry = polycoEntry(tmid.value,mjdSpan.to('day').value,
-                                refPhase.int,refPhase.frac, model.F0.value, ncoeff,
-                                coeffs,obs)
-                entryList.append((model.PSR.value, date, hms, tmid.value,
-                                  model.DM.value,0.0,0.0,0.0,mjdSpan.to('day').value,
-                                  tStart,tStop,obs,obsFreq,entry))
+                entry = polycoEntry(tmid[i],mjdSpan[i],
+                                refInt[i:i+1]*u.cycle,refFrac[i:i+1]*u.cycle,
+                                model.F0.value, ncoeff, coeffs[i],obs)
+                entryList.append((model.PSR.value, date, hms, tmid[i],
+                                  model.DM.value,0.0,0.0,0.0,mjdSpan[i],
+                                  tStart[i],tStop[i],obs,obsFreq,entry))
 
             pTable = table.Table(rows = entryList, names = ('psr','date','utc',
                                   'tmid','dm','doppler','logrms','binary_phase',
@@ -571,11 +695,12 @@ class Polycos(object):
         else:
             self.polycoTable.write(format = format)
 
-    def find_entry(self,t):
-        """Find the right entry for the input time.
+    def _entry_arrays(self):
+        """Gather the polyco entries into arrays, with the coefficients as
+        a dense (n_entries x ncoeff) array zero-padded at high order.
+
+        The arrays are rebuilt whenever polycoTable is replaced.
         """
-        if not isinstance(t, (np.ndarray, list)):
-            t = np.array([t,])
         # Check if polyco table exist
         try:
             lenEntry = len(self.polycoTable)
@@ -587,10 +712,42 @@ class Polycos(object):
         except:
             errorMssg = "Insufficent polyco data. Please read or generate polyco data correctly."
             raise AttributeError(errorMssg)
+        if (self._arraysTable is self.polycoTable and
+                len(self.mjdMid) == lenEntry):
+            return
+        entries = self.polycoTable['entry']
+        self.mjdMid = np.array([e.tmid.value for e in entries],
+                               dtype=np.longdouble)
+        self.mjdSpan = np.array([e.mjdspan.value for e in entries],
+                                dtype=np.longdouble)
+        self.tStart = np.array([e.tstart for e in entries],
+                               dtype=np.longdouble)
+        self.tStop = np.array([e.tstop for e in entries],
+                              dtype=np.longdouble)
+        self.ncoeff = np.array([e.ncoeff for e in entries])
+        self.coeffs = np.zeros((lenEntry, self.ncoeff.max()),
+                               dtype=np.longdouble)
+        for i, e in enumerate(entries):
+            self.coeffs[i,:e.ncoeff] = e.coeffs[:e.ncoeff]
+        self.obs = np.array([e.obs for e in entries])
+        self._rphaseInt = np.array([np.ravel(e.rphase.int.value)[0]
+                                    for e in entries], dtype=np.longdouble)
+        self._rphaseFrac = np.array([np.ravel(e.rphase.frac.value)[0]
+                                     for e in entries], dtype=np.longdouble)
+        self._f0 = np.array([e.f0 for e in entries], dtype=np.longdouble)
+        self._arraysTable = self.polycoTable
+
+    def find_entry(self,t):
+        """Find the right entry for the input time.
+        """
+        if not isinstance(t, (np.ndarray, list)):
+            t = np.array([t,])
+        t = np.asarray(t)
+        self._entry_arrays()
 
-        startIndex = np.searchsorted(self.polycoTable['t_start'], t)
-        entryIndex = startIndex-1
-        overFlow = np.where(t > self.polycoTable['t_stop'][entryIndex])[0]
+        entryIndex = np.searchsorted(self.tStart, t, side='right')-1
+        overFlow = np.where((entryIndex < 0) |
+                            (t > self.tStop[np.maximum(entryIndex, 0)]))[0]
         if overFlow.size!=0:
             errorMssg = "Input time "
             for i in overFlow:
@@ -612,35 +769,28 @@ class Polycos(object):
         Parameters
         ---------
         t: numpy.ndarray or a single number.
-           An time array in MJD. Time sample should be in order
+           An time array in MJD, in any order.
 
         Returns
         ---------
         out: PINT Phase class
-             Polyco evaluated absolute phase for t.
+             Polyco evaluated absolute phase for t, in the order of t.
 
         phase = refPh + DT*60*F0 + COEFF(1) + COEFF(2)*DT + COEFF(3)*DT**2 + ...
+
+        All the times are evaluated at once, with Horner's scheme in
+        double-double precision.
         '''
         if not isinstance(t, (np.ndarray, list)):
             t = np.array([t,])
+        t = np.asarray(t, dtype=np.longdouble)
 
         entryIndex = self.find_entry(t)
-        phaseInt = np.array([])
-        phaseFrac= np.array([])
-        # Compute phase for time in each entry
-        for i in range(len(self.polycoTable)):
-            mask = np.where(entryIndex==i) # Build mask for time in each entry
-            t_in_entry = t[mask]
-            if len(t_in_entry) == 0:
-                continue
-            # Calculate the phase as an array
-            absp = self.polycoTable['entry'][i].evalabsphase(t_in_entry)
-            phaseInt = np.hstack((phaseInt,absp.int))
-            phaseFrac = np.hstack((phaseFrac,absp.frac))
-            # Maybe add sort function here, since the time has been masked.
-        absPhase = Phase(phaseInt,phaseFrac)
-
-        return absPhase
+        return _eval_polyco_phase(t, self.mjdMid[entryIndex],
+                                  self._rphaseInt[entryIndex],
+                                  self._rphaseFrac[entryIndex],
+                                  self._f0[entryIndex],
+                                  self.coeffs[entryIndex])
 
     def eval_spin_freq(self,t):
         """
@@ -649,7 +799,7 @@ class Polycos(object):
         Parameters
         ---------
         t: numpy.ndarray or a single number.
-           An time array in MJD. Time sample should be in order
+           An time array in MJD, in any order.
 
         Returns
         ---------
@@ -660,17 +810,15 @@ class Polycos(object):
         """
         if not isinstance(t, np.ndarray) and not isinstance(t,list):
             t = np.array([t,])
+        t = np.asarray(t, dtype=np.longdouble)
 
         entryIndex = self.find_entry(t)
-        poly_result = np.longdouble(np.zeros(len(t)))
-
-        dt = (np.longdouble(t) - self.polycoTable[entryIndex]['tmid']) * np.longdouble(1440.0)
-        s = np.longdouble(0.0)
-        for ii, (tt, eidx) in enumerate(zip(dt, entryIndex)):
-            coeffs = self.polycoTable['entry'][eidx].coeffs
-            coeffs = np.longdouble(range(len(coeffs))) * coeffs
-            coeffs = coeffs[::-1][:-1]
-            poly_result[ii] = np.polyval(coeffs, tt)
-        spinFreq = np.array([self.polycoTable['entry'][eidx].f0 + poly_result[ii] / np.longdouble(60.0) for ii,eidx in zip(range(len(t)),entryIndex)])
+        dt = (t - self.mjdMid[entryIndex]) * np.longdouble(1440.0)
+        coeffs = self.coeffs[entryIndex]
+        # Horner's scheme for the derivative of the polynomial
+        s = np.zeros(len(t), dtype=np.longdouble)
+        for i in range(coeffs.shape[1]-1, 0, -1):
+            s = s*dt + i*coeffs[:,i]
+        spinFreq = self._f0[entryIndex] + s / np.longdouble(60.0)
 
         return spinFreq
@@ -84,6 +84,7 @@ class PulsarBinary(DelayComponent):
 
         self.interal_params = []
         self.warn_default_params = ['ECC', 'OM']
+        self._hold_binary_state = False
         # Set up delay function
         self.delay_funcs_component += [self.binarymodel_delay,]
 
@@ -183,9 +184,18 @@ class PulsarBinary(DelayComponent):
 
     def d_binary_delay_d_xxxx(self, toas, param, acc_delay):
         """Return the bianry model delay derivtives"""
-        self.update_binary_object(toas, acc_delay)
+        if not self._hold_binary_state:
+            self.update_binary_object(toas, acc_delay)
         return self.binary_instance.d_binarydelay_d_par(param)
 
+    def prepare_derivs(self, toas, acc_delay=None):
+        """Update the binary object once for all the derivative columns."""
+        self.update_binary_object(toas, acc_delay)
+        self._hold_binary_state = True
+
+    def release_derivs(self):
+        self._hold_binary_state = False
+
     def print_par(self,):
         result = "BINARY {0}\n".format(self.binary_model_name)
         for p in self.params:
@@ -88,7 +88,7 @@ class Spindown(PhaseComponent):
         """
 
         if self.PEPOCH.value is None:
-            phsepoch_ld = time_to_longdouble(toas['tdb'][0] - delay[0])
+            phsepoch_ld = toas['tdbld'][0] - delay[0].to(u.day).value
         else:
             phsepoch_ld = time_to_longdouble(self.PEPOCH.quantity)
 
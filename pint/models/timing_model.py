@@ -2,11 +2,15 @@
 # Defines the basic timing model interface classes
 from __future__ import absolute_import, print_function, division
 import functools
+import weakref
+import multiprocessing
 from .parameter import Parameter, strParameter
 from ..phase import Phase
+from ..noise_covariance import WoodburyCovariance
 from astropy import log
 import astropy.time as time
 import numpy as np
+import scipy.sparse as sps
 import pint.utils as utils
 import astropy.units as u
 from astropy.table import Table
@@ -24,6 +28,38 @@ ignore_params = ['START', 'FINISH', 'SOLARN0', 'EPHEM', 'CLK', 'UNITS',
                  'NITS', 'IBOOT','BINARY']
 ignore_prefix = ['DMXF1_','DMXF2_','DMXEP_'] # DMXEP_ for now.
 
+# The column function of the design matrix block evaluated by the
+# _column_pool_map() worker processes
+_pool_column = None
+
+
+def _pool_column_eval(param):
+    return _pool_column(param)
+
+
+def _column_pool_map(column, params, nproc):
+    """Return [column(p) for p in params], evaluated by nproc processes
+    forked from this one, so that they share the model and TOAs.
+
+    Processes rather than threads are used because the unit equivalencies
+    enabled by the components (e.g. dimensionless_cycles) are global to a
+    process, so concurrent columns would convert with each other's.
+    """
+    global _pool_column
+    _pool_column = column
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except AttributeError:
+        # Python 2 always forks on POSIX systems
+        ctx = multiprocessing
+    pool = ctx.Pool(nproc)
+    try:
+        return pool.map(_pool_column_eval, params, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+        _pool_column = None
+
 
 class TimingModel(object):
     """
@@ -91,6 +127,7 @@ class TimingModel(object):
         self.add_param_from_top(strParameter(name="PSR",
             description="Source name",
             aliases=["PSRJ", "PSRB"]), '')
+        self._component_cache = None
 
         self.setup_components(components)
 
@@ -194,6 +231,14 @@ class TimingModel(object):
                 bfs += nc.basis_funcs
         return bfs
 
+    @property
+    def ecorr_funcs(self,):
+        efs = []
+        if 'NoiseComponent' in self.component_types:
+            for nc in self.NoiseComponent_list:
+                efs += nc.ecorr_funcs
+        return efs
+
     @property
     def phase_deriv_funcs(self):
         return self.get_deriv_funcs('PhaseComponent')
@@ -202,6 +247,14 @@ class TimingModel(object):
     def delay_deriv_funcs(self):
         return self.get_deriv_funcs('DelayComponent')
 
+    @property
+    def sparse_phase_deriv_funcs(self):
+        return self.get_deriv_funcs('PhaseComponent', 'sparse_deriv_funcs')
+
+    @property
+    def sparse_delay_deriv_funcs(self):
+        return self.get_deriv_funcs('DelayComponent', 'sparse_deriv_funcs')
+
     @property
     def d_phase_d_delay_funcs(self):
         Dphase_Ddelay = []
@@ -209,18 +262,41 @@ class TimingModel(object):
             Dphase_Ddelay += cp.phase_derivs_wrt_delay
         return Dphase_Ddelay
 
-    def get_deriv_funcs(self, component_type):
+    def get_deriv_funcs(self, component_type, registry='deriv_funcs'):
         componet_list_name = component_type + '_list'
         type_components = getattr(self, componet_list_name)
         deriv_funcs = {}
         for cp in type_components:
-            for k, v in list(cp.deriv_funcs.items()):
+            for k, v in list(getattr(cp, registry).items()):
                 if k in deriv_funcs:
-                    deriv_funcs[k] += v
+                    deriv_funcs[k] = deriv_funcs[k] + v
                 else:
                     deriv_funcs[k] = v
         return deriv_funcs
 
+    def sparse_deriv_params(self, params):
+        """Return the parameters whose phase derivative columns are sparse.
+
+        A parameter qualifies when every derivative function registered for
+        it has a sparse counterpart (see
+        `Component.register_sparse_deriv_funcs`).
+        """
+        phase_derivs = self.phase_deriv_funcs
+        delay_derivs = self.delay_deriv_funcs
+        sparse_phase = self.sparse_phase_deriv_funcs
+        sparse_delay = self.sparse_delay_deriv_funcs
+        result = []
+        for p in params:
+            if p in phase_derivs:
+                n, sp = len(phase_derivs[p]), sparse_phase.get(p, [])
+            elif p in delay_derivs:
+                n, sp = len(delay_derivs[p]), sparse_delay.get(p, [])
+            else:
+                continue
+            if len(sp) == n:
+                result.append(p)
+        return result
+
     def search_cmp_attr(self, name):
         """
         This is a function for searching an attribute from all the components.
@@ -446,6 +522,108 @@ class TimingModel(object):
                  (getattr(self, par).help_line(), cp)
         return s
 
+    def enable_cache(self):
+        """Cache the output of each delay and phase component.
+
+        A component is only recomputed when the TOA table changes or one of
+        the parameters it depends on is set: its own parameters and those of
+        the delay components in front of it (their delays feed it). The
+        phase components share one key, as they are cheap and read each
+        other's parameters (e.g. the phase jumps use F0).
+
+        A table is seen as changed when it is another object or when its
+        table.meta['version'] changes, which the TOAs methods that modify
+        the table in place do (see `TOAs.table_changed`). After editing
+        table columns by hand, call `TOAs.table_changed` or `clear_cache`.
+        The cache is off by default.
+        """
+        if self.__dict__.get('_component_cache') is None:
+            self._component_cache = {}
+
+    def disable_cache(self):
+        """Stop caching the component outputs."""
+        self._component_cache = None
+
+    def clear_cache(self):
+        """Drop the cached component outputs."""
+        if self.__dict__.get('_component_cache') is not None:
+            self._component_cache = {}
+
+    def _param_versions(self, component):
+        # The key and key values select the TOAs of a mask parameter
+        return tuple((par.version, getattr(par, 'key', None),
+                      tuple(getattr(par, 'key_value', ())))
+                     for par in (getattr(component, p)
+                                 for p in component.params))
+
+    def _delay_cache_keys(self):
+        """Cache keys of the delay components, each including the keys of the
+        components in front of it."""
+        keys = []
+        key = ()
+        for cp in self.DelayComponent_list:
+            key = (key, self._param_versions(cp))
+            keys.append(key)
+        return keys
+
+    def _cached(self, name, toas, key, func, *args):
+        """Return func(*args), reusing the cached result if the TOA table and
+        the key have not changed."""
+        cache = self.__dict__.get('_component_cache')
+        if cache is None:
+            return func(*args)
+        key = (toas.meta.get('version'), key)
+        hit = cache.get(name)
+        if hit is not None and hit[0]() is toas and hit[1] == key:
+            return hit[2]
+        result = func(*args)
+        cache[name] = (weakref.ref(toas), key, result)
+        return result
+
+    def _component_delay(self, component, toas, acc_delay):
+        """Return the delay of one delay component."""
+        result = np.zeros(len(toas)) * u.second
+        for ii, df in enumerate(component.delay_funcs_component):
+            result += df(toas, acc_delay if ii == 0 else acc_delay + result)
+        return result
+
+    def _component_phase(self, component, toas, delay):
+        """Return the phase of one phase component."""
+        result = None
+        for pf in component.phase_funcs_component:
+            ph = Phase(pf(toas, delay))
+            result = ph if result is None else result + ph
+        return result
+
+    def delay_components(self, toas, cutoff_component='', include_last=True):
+        """Delays of the individual delay components.
+
+        Return a list of (component name, delay) pairs, in the order the
+        delays are applied. See `delay` for the parameters.
+        """
+        if cutoff_component == '':
+            idx = len(self.DelayComponent_list)
+        else:
+            delay_names = [x.__class__.__name__ for x in self.DelayComponent_list]
+            if cutoff_component in delay_names:
+                idx = delay_names.index(cutoff_component)
+                if include_last:
+                    idx += 1
+            else:
+                raise KeyError("No delay component named '%s'." % cutoff_component)
+
+        caching = self.__dict__.get('_component_cache') is not None
+        keys = self._delay_cache_keys() if caching else None
+        delay = np.zeros(len(toas)) * u.second
+        result = []
+        for ii, cp in enumerate(self.DelayComponent_list[0:idx]):
+            name = cp.__class__.__name__
+            cd = self._cached(name, toas, keys[ii] if caching else None,
+                              self._component_delay, cp, toas, delay)
+            delay += cd
+            result.append((name, cd))
+        return result
+
     def delay(self, toas, cutoff_component='', include_last=True):
         """Total delay for the TOAs.
         Parameter
@@ -462,19 +640,9 @@ class TimingModel(object):
         TOA to get time of emission at the pulsar.
         """
         delay = np.zeros(len(toas)) * u.second
-        if cutoff_component == '':
-            idx = len(self.DelayComponent_list)
-        else:
-            delay_names = [x.__class__.__name__ for x in self.DelayComponent_list]
-            if cutoff_component in delay_names:
-                idx = delay_names.index(cutoff_component)
-                if include_last:
-                    idx += 1
-            else:
-                raise KeyError("No delay component named '%s'." % cutoff_component)
-
-        for df in self.delay_funcs[0:idx]:
-            delay += df(toas, delay)
+        for name, cd in self.delay_components(toas, cutoff_component,
+                                              include_last):
+            delay += cd
         return delay
 
     def phase(self, toas):
@@ -482,9 +650,18 @@ class TimingModel(object):
         # First compute the delays to "pulsar time"
         delay = self.delay(toas)
         phase = Phase(np.zeros(len(toas)) , np.zeros(len(toas)))
+        caching = self.__dict__.get('_component_cache') is not None
+        if caching:
+            key = (self._delay_cache_keys()[-1:],
+                   tuple(self._param_versions(cp)
+                         for cp in self.PhaseComponent_list))
         # Then compute the relevant pulse phases
-        for pf in self.phase_funcs:
-            phase += Phase(pf(toas, delay))
+        for cp in self.PhaseComponent_list:
+            ph = self._cached(cp.__class__.__name__, toas,
+                              key if caching else None,
+                              self._component_phase, cp, toas, delay)
+            if ph is not None:
+                phase += ph
         return phase
 
     def covariance_matrix(self, toas):
@@ -503,6 +680,38 @@ class TimingModel(object):
             result += nf(toas)
         return result
 
+    def noise_covariance(self, toas):
+        """Return the TOA covariance matrix of the noise models as a
+        `WoodburyCovariance`: the scaled TOA variances and the ECORR epoch
+        blocks plus the low-rank noise basis part. Unlike
+        `covariance_matrix` it never forms the Ntoa x Ntoa matrix.
+        """
+        cov = self.white_noise_covariance(toas)
+        return WoodburyCovariance(cov.Nvec, self.noise_model_designmatrix(toas),
+                                  self.noise_model_basis_weight(toas),
+                                  epochs=cov.epochs, epoch_weights=cov.J)
+
+    def white_noise_covariance(self, toas):
+        """Return the covariance of the scaled TOA uncertainties and the ECORR
+        epochs as a `WoodburyCovariance`, without the noise basis part.
+        """
+        Nvec = self.scaled_sigma(toas).to(u.s).value**2
+        epochs, weights = self.noise_model_ecorr_epochs(toas)
+        return WoodburyCovariance(Nvec, epochs=epochs, epoch_weights=weights)
+
+    def noise_model_ecorr_epochs(self, toas):
+        """Return the ECORR epochs, as TOA index arrays, and their weights.
+        """
+        epochs = []
+        weights = []
+        for ef in self.ecorr_funcs:
+            e, w = ef(toas)
+            epochs += e
+            weights.append(w)
+        if len(weights) == 0:
+            return [], np.zeros(0)
+        return epochs, np.concatenate(weights)
+
     def scaled_sigma(self, toas):
         """This a function to get the scaled TOA uncertainties noise models.
            If there is no noise model component provided, a vector with
@@ -601,8 +810,45 @@ class TimingModel(object):
         """
         pass
 
-    def d_phase_d_param(self, toas, delay, param):
+    def accumulated_delays(self, toas):
+        """Total delay and the delay accumulated in front of each component.
+
+        Return
+        ------
+        delay : astropy.quantity
+            The total delay, identical to ``self.delay(toas)``.
+        acc_delays : dict
+            The delay accumulated before each delay component, keyed by the
+            component class name. This is the ``acc_delay`` each component
+            would compute for itself.
+        """
+        delay = np.zeros(len(toas)) * u.second
+        acc_delays = {}
+        for name, cd in self.delay_components(toas):
+            acc_delays[name] = delay.copy()
+            delay += cd
+        return delay, acc_delays
+
+    def d_phase_d_delay(self, toas, delay):
+        """Return the derivative of phase with respect to the total delay.
+        """
+        result = np.longdouble(np.zeros(len(toas))) * u.cycle/u.second
+        for dpddf in self.d_phase_d_delay_funcs:
+            result += dpddf(toas, delay)
+        return result
+
+    def d_phase_d_param(self, toas, delay, param, d_phase_d_delay=None,
+                        acc_delays=None):
         """ Return the derivative of phase with respect to the parameter.
+
+        Parameter
+        ---------
+        d_phase_d_delay: astropy.quantity, optional
+            Precomputed derivative of phase with respect to the delay. It is
+            recomputed if not provided.
+        acc_delays: dict, optional
+            Precomputed accumulated delays from `accumulated_delays()`,
+            passed on to the delay derivative functions.
         """
         # TODO need to do correct chain rule stuff wrt delay derivs, etc
         # Is it safe to assume that any param affecting delay only affects
@@ -624,16 +870,58 @@ class TimingModel(object):
             #                       = (d_Phase1/d_delay + d_Phase2/d_delay) *
             #                         d_delay_d_param
 
-            d_delay_d_p = self.d_delay_d_param(toas, param)
-            dpdd_result = np.longdouble(np.zeros(len(toas))) * u.cycle/u.second
-            for dpddf in self.d_phase_d_delay_funcs:
-                dpdd_result += dpddf(toas, delay)
-            result = dpdd_result * d_delay_d_p
+            d_delay_d_p = self.d_delay_d_param(toas, param,
+                                               acc_delays=acc_delays)
+            if d_phase_d_delay is None:
+                d_phase_d_delay = self.d_phase_d_delay(toas, delay)
+            result = d_phase_d_delay * d_delay_d_p
         return result.to(result.unit, equivalencies=u.dimensionless_angles())
 
-    def d_delay_d_param(self, toas, param, acc_delay=None):
+    def d_phase_d_param_sparse(self, toas, delay, param, d_phase_d_delay=None,
+                               acc_delays=None):
+        """ Return the derivative of phase with respect to the parameter as
+        (index, value) pairs. The derivative is zero for the TOAs not listed
+        in index; an index may repeat, in which case the values add up.
+
+        Only the parameters listed by `sparse_deriv_params()` are supported.
+        """
+        par = getattr(self, param)
+        unit = u.cycle/par.units
+        index = []
+        values = []
+        sparse_phase = self.sparse_phase_deriv_funcs
+        if param in self.phase_deriv_funcs:
+            for df in sparse_phase[param]:
+                idx, v = df(toas, param, delay)
+                index.append(np.asarray(idx, dtype=int))
+                values.append(v.to(unit,
+                              equivalencies=u.dimensionless_angles()).value)
+        else:
+            if d_phase_d_delay is None:
+                d_phase_d_delay = self.d_phase_d_delay(toas, delay)
+            for df in self.sparse_delay_deriv_funcs[param]:
+                dacc = None
+                if acc_delays is not None:
+                    cp = getattr(df, '__self__', None)
+                    dacc = acc_delays.get(cp.__class__.__name__)
+                idx, v = df(toas, param, dacc)
+                idx = np.asarray(idx, dtype=int)
+                v = v.to(u.s/par.units, equivalencies=u.dimensionless_angles())
+                v = d_phase_d_delay[idx] * v
+                index.append(idx)
+                values.append(v.to(unit,
+                              equivalencies=u.dimensionless_angles()).value)
+        if len(index) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0) * unit
+        return np.concatenate(index), np.concatenate(values) * unit
+
+    def d_delay_d_param(self, toas, param, acc_delay=None, acc_delays=None):
         """
         Return the derivative of delay with respect to the parameter.
+
+        If ``acc_delays`` (see `accumulated_delays()`) is given, each
+        derivative function gets the delay accumulated in front of its own
+        component instead of ``acc_delay``.
         """
         par = getattr(self, param)
         result = np.longdouble(np.zeros(len(toas)) * u.s/par.units)
@@ -642,7 +930,11 @@ class TimingModel(object):
             raise AttributeError("Derivative function for '%s' is not provided"
                                  " or not registered. "%param)
         for df in delay_derivs[param]:
-            result += df(toas, param, acc_delay).to(result.unit, \
+            dacc = acc_delay
+            if acc_delays is not None:
+                cp = getattr(df, '__self__', None)
+                dacc = acc_delays.get(cp.__class__.__name__, acc_delay)
+            result += df(toas, param, dacc).to(result.unit, \
                         equivalencies=u.dimensionless_angles())
         return result
 
@@ -702,10 +994,31 @@ class TimingModel(object):
         return d_delay * (u.second/unit)
 
     def designmatrix(self, toas,acc_delay=None, scale_by_F0=True, \
-                     incfrozen=False, incoffset=True):
+                     incfrozen=False, incoffset=True, nproc=1,
+                     chunk_size=None, sparse=False):
         """
         Return the design matrix: the matrix with columns of d_phase_d_param/F0
         or d_toa_d_param
+
+        The total delay, the delay accumulated in front of each component,
+        d_phase/d_delay and the component derivative states (e.g. the binary
+        orbit) are computed once per call and shared by all the columns.
+        Columns that are nonzero only on a subset of the TOAs (e.g. DMX and
+        JUMP) are evaluated on that subset alone.
+
+        Parameter
+        ---------
+        nproc: int, optional
+            Number of processes, forked from this one, used to evaluate
+            the columns. Default is 1, evaluating the columns serially.
+        chunk_size: int, optional
+            Fill the matrix in blocks of this many TOAs, so the temporary
+            derivative arrays stay bounded for large data sets. Default is all
+            the TOAs at once.
+        sparse: bool, optional
+            If True and the model has sparse columns, return the matrix as a
+            scipy.sparse CSC matrix, so the mostly-zero DMX and JUMP columns
+            are never stored densely. Otherwise a dense array is returned.
         """
         params = ['Offset',] if incoffset else []
         params += [par for par in self.params if incfrozen or
@@ -714,39 +1027,105 @@ class TimingModel(object):
         F0 = self.F0.quantity        # 1/sec
         ntoas = len(toas)
         nparams = len(params)
-        delay = self.delay(toas)
         units = []
-
-        # Apply all delays ?
-        #tt = toas['tdbld']
-        #for df in self.delay_funcs:
-        #    tt -= df(toas)
-
-        M = np.zeros((ntoas, nparams))
+        scales = np.ones(nparams)
         for ii, param in enumerate(params):
             if param == 'Offset':
-                M[:,ii] = 1.0
                 units.append(u.s/u.s)
             else:
-                # NOTE Here we have negative sign here. Since in pulsar timing
-                # the residuals are calculated as (Phase - int(Phase)), which is different
-                # from the conventional definition of least square definition (Data - model)
-                # We decide to add minus sign here in the design matrix, so the fitter
-                # keeps the conventional way.
-                q = - self.d_phase_d_param(toas, delay,param)
-                M[:,ii] = q
-                units.append(u.Unit("")/ getattr(self, param).units)
-
-        if scale_by_F0:
-            mask = []
-            for ii, un in enumerate(units):
-                if params[ii] == 'Offset':
+                un = u.Unit("")/ getattr(self, param).units
+                if scale_by_F0:
+                    un = un * u.second
+                    scales[ii] = 1.0 / F0.value
+                units.append(un)
+        sparse_params = self.sparse_deriv_params(params)
+        sparse = sparse and len(sparse_params) > 0
+
+        delay, acc_delays = self.accumulated_delays(toas)
+        dpdd = self.d_phase_d_delay(toas, delay)
+
+        if chunk_size is None or chunk_size >= ntoas:
+            chunk_size = max(ntoas, 1)
+        if sparse:
+            rows = [np.zeros(0, dtype=int)]
+            cols = [np.zeros(0, dtype=int)]
+            data = [np.zeros(0)]
+        else:
+            M = np.zeros((ntoas, nparams))
+        for lo in range(0, ntoas, chunk_size):
+            hi = min(lo + chunk_size, ntoas)
+            if hi - lo == ntoas:
+                ctoas = toas
+                cdelay, cdpdd, cacc = delay, dpdd, acc_delays
+            else:
+                # The table is sorted by observatory, so regrouping
+                # (which older astropy does not do when slicing) keeps
+                # the row order
+                ctoas = toas[lo:hi].group_by('obs')
+                cdelay, cdpdd = delay[lo:hi], dpdd[lo:hi]
+                cacc = dict((k, v[lo:hi]) for k, v in acc_delays.items())
+            block = self._designmatrix_block(ctoas, params, sparse_params,
+                                             cdelay, cdpdd, cacc, nproc)
+            for ii, c in enumerate(block):
+                if isinstance(c, tuple):
+                    idx, v = c[0] + lo, c[1] * scales[ii]
+                elif sparse:
+                    idx, v = np.arange(lo, hi), c * scales[ii]
+                else:
+                    M[lo:hi, ii] = c * scales[ii]
                     continue
-                units[ii] = un * u.second
-                mask.append(ii)
-            M[:, mask] /= F0.value
+                if sparse:
+                    rows.append(idx)
+                    cols.append(np.repeat(ii, len(idx)))
+                    data.append(v)
+                else:
+                    np.add.at(M[:, ii], idx, v)
+
+        if sparse:
+            # Repeated (row, column) entries are summed by the conversion.
+            M = sps.coo_matrix((np.concatenate(data),
+                                (np.concatenate(rows), np.concatenate(cols))),
+                               shape=(ntoas, nparams)).tocsc()
         return M, params, units, scale_by_F0
 
+    def _designmatrix_block(self, toas, params, sparse_params, delay, dpdd,
+                            acc_delays, nproc=1):
+        """Evaluate the unscaled design matrix columns for a block of TOAs.
+
+        Return a list with one entry per parameter, either a dense column or
+        an (index, value) pair for the parameters in sparse_params.
+        """
+        def column(param):
+            if param == 'Offset':
+                return np.ones(len(toas))
+            # NOTE Here we have negative sign here. Since in pulsar timing
+            # the residuals are calculated as (Phase - int(Phase)), which is
+            # different from the conventional definition of least square
+            # definition (Data - model). We decide to add minus sign here in
+            # the design matrix, so the fitter keeps the conventional way.
+            if param in sparse_params:
+                idx, q = self.d_phase_d_param_sparse(toas, delay, param,
+                                                     d_phase_d_delay=dpdd,
+                                                     acc_delays=acc_delays)
+                return idx, -q.value
+            q = - self.d_phase_d_param(toas, delay, param,
+                                       d_phase_d_delay=dpdd,
+                                       acc_delays=acc_delays)
+            return q.value
+
+        comps = list(self.components.values())
+        for cp in comps:
+            cp.prepare_derivs(toas, acc_delays.get(cp.__class__.__name__))
+        try:
+            if nproc > 1 and len(params) > 1:
+                cols = _column_pool_map(column, params, nproc)
+            else:
+                cols = [column(p) for p in params]
+        finally:
+            for cp in comps:
+                cp.release_derivs()
+        return cols
+
     def read_parfile(self, filename):
         """Read values from the specified parfile into the model parameters."""
         checked_param = []
@@ -859,11 +1238,25 @@ class Component(object):
         self._parent = None
         self.category = ''
         self.deriv_funcs = {}
+        self.sparse_deriv_funcs = {}
         self.component_special_params = []
         
     def setup(self,):
         pass
 
+    def prepare_derivs(self, toas, acc_delay=None):
+        """Set up the state shared by this component's derivative functions.
+
+        Called by `TimingModel.designmatrix` before the columns are evaluated,
+        so a component can compute the intermediates all of its derivatives
+        need once. The state is kept until `release_derivs` is called.
+        """
+        pass
+
+    def release_derivs(self,):
+        """Drop the state set up by `prepare_derivs`."""
+        pass
+
     def __getattr__(self, name):
         try:
             return super(Component, self).__getattribute__(name)
@@ -992,6 +1385,27 @@ class Component(object):
         else:
             self.deriv_funcs[pn] += [func,]
 
+    def register_sparse_deriv_funcs(self, func, param):
+        """
+        Register a sparse version of a derivative function. It takes the same
+        arguments as the dense one and returns an (index, value) pair, giving
+        the derivative only for the TOAs where it can be nonzero.
+        Parameter
+        ---------
+        func: method
+            The method calculates the sparse derivative
+        param: str
+            Name of parameter the derivative respect to
+        """
+        pn = self.match_param_aliases(param)
+        if pn == '':
+            raise ValueError("Parameter '%s' in not in the model." % param)
+
+        if pn not in list(self.sparse_deriv_funcs.keys()):
+            self.sparse_deriv_funcs[pn] = [func,]
+        else:
+            self.sparse_deriv_funcs[pn] += [func,]
+
     def is_in_parfile(self,para_dict):
         """ Check if this subclass included in parfile.
             Parameters
@@ -0,0 +1,196 @@
+"""Low-rank plus block-diagonal TOA covariance matrices.
+
+The TOA covariance of the noise models has the form
+
+    C = N + T diag(phi) T^T
+
+where T is the Ntoa x k noise basis (Fourier red noise) with weights phi,
+and N is the white noise: the scaled TOA variances D plus the ECORR blocks,
+
+    N = diag(D) + sum_e J_e u_e u_e^T
+
+with u_e the indicator vector of the TOAs in observing epoch e. Each ECORR
+block is a rank-one update, so by Sherman-Morrison
+
+    N^-1 = D^-1 - sum_e c_e D^-1 u_e u_e^T D^-1,  c_e = J_e / (1 + J_e s_e)
+    log|N| = log|D| + sum_e log(1 + J_e s_e),     s_e = u_e^T D^-1 u_e
+
+which costs O(Ntoa), and with the Woodbury identity
+
+    C^-1 = N^-1 - N^-1 T Sigma^-1 T^T N^-1,  Sigma = diag(1/phi) + T^T N^-1 T
+    log|C| = log|N| + log|diag(phi)| + log|Sigma|
+
+solves, log determinants and quadratic forms only need the k x k matrix
+Sigma, so no Ntoa x Ntoa matrix is ever formed.
+"""
+from __future__ import absolute_import, print_function, division
+import numpy as np
+import scipy.linalg as sl
+import scipy.sparse as sps
+
+
+class WoodburyCovariance(object):
+    """Covariance matrix C = diag(Nvec) + ECORR blocks + T diag(phi) T^T.
+
+    Parameters
+    ----------
+    Nvec : numpy.ndarray
+        The diagonal white noise variances, length Ntoa.
+    T : numpy.ndarray, optional
+        The Ntoa x k noise basis. None for no low-rank part.
+    phi : numpy.ndarray, optional
+        The k basis weights (variances).
+    epochs : list of numpy.ndarray, optional
+        The TOA indices of each ECORR epoch. Epochs sharing TOAs are moved
+        to the low-rank part.
+    epoch_weights : numpy.ndarray, optional
+        The ECORR variance of each epoch.
+    """
+    def __init__(self, Nvec, T=None, phi=None, epochs=None,
+                 epoch_weights=None):
+        self.Nvec = np.asarray(Nvec, dtype=float)
+        n = len(self.Nvec)
+        if T is None or phi is None or len(phi) == 0:
+            T, phi = np.zeros((n, 0)), np.zeros(0)
+        epochs = [] if epochs is None else list(epochs)
+        J = np.zeros(0) if epoch_weights is None else \
+            np.asarray(epoch_weights, dtype=float)
+        eidx = np.concatenate([np.zeros(0, dtype=int)] +
+                              [np.asarray(e, dtype=int) for e in epochs])
+        if len(np.unique(eidx)) != len(eidx):
+            # Overlapping blocks are not a block diagonal; treat them as
+            # ordinary basis vectors instead.
+            U = np.zeros((n, len(epochs)))
+            for ii, e in enumerate(epochs):
+                U[e, ii] = 1.0
+            T, phi = np.hstack((T, U)), np.concatenate((phi, J))
+            epochs, J = [], np.zeros(0)
+        self.T = T if T.shape[1] > 0 else None
+        self.phi = np.asarray(phi, dtype=float) if self.T is not None \
+            else None
+        self.epochs = epochs
+        self.J = J
+        self._setup_epochs()
+        self._Sigma_cf = None
+
+    def _setup_epochs(self):
+        n = len(self.Nvec)
+        ne = len(self.epochs)
+        sizes = np.array([len(e) for e in self.epochs], dtype=int)
+        rows = np.repeat(np.arange(ne), sizes)
+        cols = np.concatenate([np.zeros(0, dtype=int)] +
+                              [np.asarray(e, dtype=int) for e in self.epochs])
+        # Epoch membership as an ne x Ntoa sparse indicator matrix.
+        self._E = sps.csr_matrix((np.ones(len(cols)), (rows, cols)),
+                                 shape=(ne, n))
+        s = self._E.dot(1.0 / self.Nvec)
+        self._c = self.J / (1.0 + self.J * s)
+        self._logdet_epochs = np.sum(np.log1p(self.J * s))
+
+    def __len__(self):
+        return len(self.Nvec)
+
+    @property
+    def rank(self):
+        """The rank of the low-rank part."""
+        return 0 if self.T is None else self.T.shape[1]
+
+    def _Dsolve(self, b):
+        if sps.issparse(b):
+            return sps.diags(1.0 / self.Nvec).dot(b)
+        if b.ndim == 1:
+            return b / self.Nvec
+        return b / self.Nvec[:, None]
+
+    def _Nsolve(self, b):
+        """Return N^-1 b for a dense b."""
+        Dib = self._Dsolve(b)
+        if len(self.epochs) == 0:
+            return Dib
+        Eb = self._E.dot(Dib)
+        if Eb.ndim == 1:
+            return Dib - self._Dsolve(self._E.T.dot(self._c * Eb))
+        return Dib - self._Dsolve(self._E.T.dot(self._c[:, None] * Eb))
+
+    def _Nquad(self, x, y):
+        """Return x^T N^-1 y, for dense or sparse x and y."""
+        Diy = self._Dsolve(y)
+        if sps.issparse(Diy) and not sps.issparse(x):
+            result = Diy.T.dot(x).T
+        else:
+            result = x.T.dot(Diy)
+        if sps.issparse(result):
+            result = result.toarray()
+        if len(self.epochs) > 0:
+            Ex = self._E.dot(self._Dsolve(x))
+            Ey = self._E.dot(Diy)
+            if sps.issparse(Ex):
+                Ex = Ex.toarray()
+            if sps.issparse(Ey):
+                Ey = Ey.toarray()
+            if Ey.ndim == 1:
+                result = result - Ex.T.dot(self._c * Ey)
+            else:
+                result = result - Ex.T.dot(self._c[:, None] * Ey)
+        return result
+
+    def _Sigma_factor(self):
+        if self._Sigma_cf is None:
+            Sigma = self._Nquad(self.T, self.T)
+            Sigma[np.diag_indices_from(Sigma)] += 1.0 / self.phi
+            self._Sigma_cf = sl.cho_factor(Sigma)
+        return self._Sigma_cf
+
+    def solve(self, b):
+        """Return C^-1 b, for a vector or an Ntoa x m matrix b."""
+        b = np.asarray(b, dtype=float)
+        Nib = self._Nsolve(b)
+        if self.T is None:
+            return Nib
+        TtNib = np.dot(self.T.T, Nib)
+        return Nib - self._Nsolve(np.dot(self.T,
+                                         sl.cho_solve(self._Sigma_factor(),
+                                                      TtNib)))
+
+    def quad_form(self, x, y=None):
+        """Return x^T C^-1 y (x^T C^-1 x if y is not given).
+
+        x and y can be vectors or Ntoa x m matrices, dense or scipy.sparse.
+        """
+        if not sps.issparse(x):
+            x = np.asarray(x, dtype=float)
+        if y is None:
+            y = x
+        elif not sps.issparse(y):
+            y = np.asarray(y, dtype=float)
+        result = self._Nquad(x, y)
+        if self.T is not None:
+            TtNix = self._Nquad(self.T, x)
+            TtNiy = self._Nquad(self.T, y)
+            result = result - np.dot(TtNix.T,
+                                     sl.cho_solve(self._Sigma_factor(), TtNiy))
+        return result
+
+    def logdet(self):
+        """Return log|C|."""
+        result = np.sum(np.log(self.Nvec)) + self._logdet_epochs
+        if self.T is not None:
+            cf = self._Sigma_factor()
+            result += np.sum(np.log(self.phi))
+            result += 2.0 * np.sum(np.log(np.diag(cf[0])))
+        return result
+
+    def lnlikelihood(self, r):
+        """Return the Gaussian log likelihood of the residuals r."""
+        r = np.asarray(r, dtype=float)
+        return -0.5 * (self.quad_form(r) + self.logdet() +
+                       len(r) * np.log(2.0 * np.pi))
+
+    def toarray(self):
+        """Return the dense Ntoa x Ntoa matrix. Only for small data sets."""
+        result = np.diag(self.Nvec)
+        for e, J in zip(self.epochs, self.J):
+            result[np.ix_(e, e)] += J
+        if self.T is not None:
+            result += np.dot(self.T * self.phi[None, :], self.T.T)
+        return result
@@ -3,6 +3,9 @@
 # Routines for reading various formats of clock file.
 from __future__ import absolute_import, print_function, division
 import os
+import json
+import struct
+import hashlib
 import numpy
 import astropy.units as u
 from astropy.time import Time
@@ -11,6 +14,10 @@ from astropy.utils.exceptions import AstropyWarning
 from astropy._erfa import ErfaWarning
 import warnings
 from six import add_metaclass
+from ..toa_cache import file_hash
+
+CLOCK_CACHE_MAGIC = b'PINTCLKC'
+CLOCK_CACHE_VERSION = 1
 
 
 class ClockFileMeta(type):
@@ -128,6 +135,18 @@ class TempoClockFile(ClockFile):
                 raise
         self._clock = clk * u.us
 
+    @staticmethod
+    def included_files(filename):
+        """Return the list of filename and all the clock files it INCLUDEs,
+        recursively (included files are in the same dir as this one)."""
+        files = [filename]
+        clkdir = os.path.dirname(os.path.abspath(filename))
+        for l in open(filename).readlines():
+            if l.startswith('INCLUDE'):
+                files.extend(TempoClockFile.included_files(
+                        os.path.join(clkdir, l.split()[1])))
+        return files
+
     @staticmethod
     def load_tempo1_clock_file(filename,site=None):
         """
@@ -198,3 +217,133 @@ class TempoClockFile(ClockFile):
             clkcorrs.append(clkcorr2 - clkcorr1)
 
         return mjds, clkcorrs
+
+
+def _interp_limits(x, xp, fp):
+    """Return the left and right limits at x of numpy.interp(x, xp, fp).
+    They differ where xp repeats a knot to make a step."""
+    left = numpy.interp(x, xp, fp)
+    right = left.copy()
+    il = numpy.searchsorted(xp, x, side='left')
+    ir = numpy.searchsorted(xp, x, side='right') - 1
+    hit = (il < len(xp)) & (ir >= 0)
+    hit[hit] &= xp[il[hit]] == x[hit]
+    left[hit] = fp[il[hit]]
+    right[hit] = fp[ir[hit]]
+    return left, right
+
+
+def clock_chain_key(files, offset=0.0):
+    """Return the key of the clock chain built from the given files (all
+    the files the clock corrections are read from, including INCLUDEs) and
+    constant offset (us).  This is a hash of the contents of the files, of
+    the offset and of the cache format version."""
+    h = hashlib.sha1()
+    h.update(('version %d\n' % CLOCK_CACHE_VERSION).encode())
+    for f in files:
+        h.update(('%s %s\n' % (f, file_hash(f))).encode())
+    h.update(('offset %r\n' % offset).encode())
+    return h.hexdigest()
+
+
+class ClockChain(object):
+    """A sequence of clock corrections (e.g. site, GPS and BIPM) merged into
+    one piecewise linear interpolant.
+
+    The sum of the linearly interpolated corrections of several ClockFiles
+    is itself linear between the union of their knots, so the merged
+    ClockChain gives the same values as evaluating the files in sequence,
+    including their steps and the constant extrapolation beyond their ends.
+    It is evaluated directly from MJD arrays, and can be written to and
+    read from a small binary cache file so that the clock files need not be
+    parsed again:
+
+        >>> chain = ClockChain.merge([site_clock, gps_clock])
+        >>> chain.write('site.clkc', key)
+        >>> chain = ClockChain.read('site.clkc', key)
+        >>> corr = chain.evaluate(t.mjd)
+    """
+
+    def __init__(self, mjd, clock, ranges):
+        self.mjd = numpy.asarray(mjd, dtype=numpy.float64)
+        self.clock = numpy.asarray(clock, dtype=numpy.float64)
+        # (filename, first mjd, last mjd) of each merged file
+        self.ranges = [tuple(r) for r in ranges]
+
+    @classmethod
+    def merge(cls, clocks, offset=0.0):
+        """Merge a list of ClockFiles, plus a constant offset (us)."""
+        knots = []
+        ranges = []
+        for c in clocks:
+            mjd = c.time.mjd
+            order = numpy.argsort(mjd, kind='mergesort')
+            knots.append((mjd[order], c.clock.to(u.us).value[order]))
+            ranges.append((c.filename, mjd[order][0], mjd[order][-1]))
+        x = numpy.unique(numpy.concatenate([k[0] for k in knots]))
+        left = numpy.zeros_like(x) + offset
+        right = left.copy()
+        for xp, fp in knots:
+            l, r = _interp_limits(x, xp, fp)
+            left += l
+            right += r
+        # Steps are kept as a repeated knot, with the left value first
+        step = left != right
+        mjd = numpy.concatenate((x, x[step]))
+        clock = numpy.concatenate((right, left[step]))
+        order = numpy.lexsort((numpy.concatenate((numpy.ones(len(x)),
+                                                  numpy.zeros(step.sum()))),
+                               mjd))
+        return cls(mjd[order], clock[order], ranges)
+
+    def evaluate(self, mjd, limits='warn'):
+        """Evaluate the clock corrections at the MJDs mjd (a float array).
+        As in ClockFile.evaluate(), values outside the range of any of the
+        merged files are extrapolated as constants, with a warning if
+        limits=='warn' or an exception if limits=='error'."""
+        mjd = numpy.asarray(mjd, dtype=numpy.float64)
+        for filename, start, end in self.ranges:
+            if numpy.any(mjd<start) or numpy.any(mjd>end):
+                msg = "Data points out of range in clock file '%s'" % filename
+                if limits=='warn':
+                    log.warn(msg)
+                elif limits=='error':
+                    raise RuntimeError(msg)
+        return numpy.interp(mjd, self.mjd, self.clock)*u.us
+
+    def write(self, filename, key):
+        """Write the chain to a binary cache file with the given key (see
+        clock_chain_key()).  The file is replaced atomically."""
+        header = json.dumps({'key': key, 'n': len(self.mjd),
+                             'ranges': self.ranges}).encode()
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmpname, 'wb') as f:
+            f.write(CLOCK_CACHE_MAGIC)
+            f.write(struct.pack('<IQ', CLOCK_CACHE_VERSION, len(header)))
+            f.write(header)
+            f.write(self.mjd.astype('<f8').tobytes())
+            f.write(self.clock.astype('<f8').tobytes())
+        os.rename(tmpname, filename)
+
+    @classmethod
+    def read(cls, filename, key):
+        """Read a chain from a binary cache file.  Returns None if the file
+        does not exist, is not a cache of the current version or does not
+        have the given key."""
+        try:
+            with open(filename, 'rb') as f:
+                if f.read(len(CLOCK_CACHE_MAGIC)) != CLOCK_CACHE_MAGIC:
+                    return None
+                version, hlen = struct.unpack('<IQ', f.read(12))
+                if version != CLOCK_CACHE_VERSION:
+                    return None
+                header = json.loads(f.read(hlen).decode())
+                if header['key'] != key:
+                    return None
+                n = header['n']
+                data = numpy.frombuffer(f.read(16*n), dtype='<f8')
+        except (IOError, OSError, ValueError, KeyError, struct.error):
+            return None
+        if len(data) != 2*n:
+            return None
+        return cls(data[:n], data[n:], header['ranges'])
@@ -3,20 +3,13 @@ from __future__ import absolute_import, print_function, division
 
 # Special "site" location for Fermi satelite
 
-from . import Observatory
-from .special_locations import SpecialLocation
+from .satellite_obs import SatelliteObs
 import astropy.units as u
-from astropy.coordinates import GCRS, ITRS, EarthLocation, CartesianRepresentation
-from ..utils import PosVel
 from ..fits_utils import read_fits_event_mjds
-from ..solar_system_ephemerides import objPosVel_wrt_SSB
 import numpy as np
-from astropy.time import Time
 from astropy.table import Table
 import astropy.io.fits as pyfits
-from astropy.extern import six
 from astropy import log
-from scipy.interpolate import InterpolatedUnivariateSpline
 
 def load_FT2(ft2_filename):
     '''Load data from a Fermi FT2 file
@@ -77,11 +70,14 @@ def load_FT2(ft2_filename):
             meta = {'name':'FT2'} )
     return FT2_table
 
-class FermiObs(SpecialLocation):
+class FermiObs(SatelliteObs):
     """Observatory-derived class for the Fermi FT1 data.
 
     Note that this must be instantiated once to be put into the Observatory registry.
 
+    The FT2 file only has positions, so the velocities are the derivative
+    of the interpolated orbit (see SatelliteObs).
+
     Parameters
     ----------
 
@@ -98,72 +94,6 @@ class FermiObs(SpecialLocation):
 
     def __init__(self, name, ft2name, tt2tdb_mode = 'spacecraft'):
         self.FT2 = load_FT2(ft2name)
-        # Now build the interpolator here:
-        self.X = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['X'])
-        self.Y = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['Y'])
-        self.Z = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['Z'])
-        self.Vx = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['Vx'])
-        self.Vy = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['Vy'])
-        self.Vz = InterpolatedUnivariateSpline(self.FT2['MJD_TT'],self.FT2['Vz'])
-        self.tt2tdb_mode = tt2tdb_mode
-        # Print this warning once, mainly for @paulray
-        if self.tt2tdb_mode.lower().startswith('none'):
-            log.warning('Using location=None for TT to TDB conversion')
-        elif self.tt2tdb_mode.lower().startswith('geo'):
-            log.warning('Using location geocenter for TT to TDB conversion')
-        super(FermiObs, self).__init__(name=name)
-
-    @property
-    def timescale(self):
-        return 'tt'
-
-    def earth_location_itrf(self, time=None):
-        '''Return Fermi spacecraft location in ITRF coordinates'''
-
-        if self.tt2tdb_mode.lower().startswith('none'):
-            #log.warning('Using location=None for TT to TDB conversion')
-            return None
-        elif self.tt2tdb_mode.lower().startswith('geo'):
-            #log.warning('Using location geocenter for TT to TDB conversion')
-            return EarthLocation.from_geocentric(0.0*u.m,0.0*u.m,0.0*u.m)
-        elif self.tt2tdb_mode.lower().startswith('spacecraft'):
-            # First, interpolate Earth-Centered Inertial (ECI) geocentric
-            # location from orbit file.
-            # These are inertial coordinates aligned with ICRS, called GCRS
-            # <http://docs.astropy.org/en/stable/api/astropy.coordinates.GCRS.html>
-            pos_gcrs =  GCRS(CartesianRepresentation(self.X(time.tt.mjd)*u.m,
-                                                     self.Y(time.tt.mjd)*u.m,
-                                                     self.Z(time.tt.mjd)*u.m),
-                             obstime=time)
-
-            # Now transform ECI (GCRS) to ECEF (ITRS)
-            # By default, this uses the WGS84 ellipsoid
-            pos_ITRS = pos_gcrs.transform_to(ITRS(obstime=time))
-
-            # Return geocentric ITRS coordinates as an EarthLocation object
-            return pos_ITRS.earth_location
-        else:
-            log.error('Unknown tt2tdb_mode %s, using None', self.tt2tdb_mode)
-            return None
-
-    @property
-    def tempo_code(self):
-        return None
-
-    def posvel(self, t, ephem):
-        '''Return position and velocity vectors of Fermi, wrt SSB.
-
-        These positions and velocites are in inertial coordinates
-        (i.e. aligned with ICRS)
-
-        t is an astropy.Time or array of astropy.Times
-        '''
-        # Compute vector from SSB to Earth
-        geo_posvel = objPosVel_wrt_SSB('earth', t, ephem)
-        # Now add vector from Earth to Fermi
-        fermi_pos_geo = np.array([self.X(t.tt.mjd), self.Y(t.tt.mjd), self.Z(t.tt.mjd)])*self.FT2['X'].unit
-        log.debug("fermi_pos_geo {0}".format(fermi_pos_geo[:,0]))
-        fermi_vel_geo = np.array([self.Vx(t.tt.mjd), self.Vy(t.tt.mjd), self.Vz(t.tt.mjd)])*self.FT2['Vx'].unit
-        fermi_posvel = PosVel( fermi_pos_geo, fermi_vel_geo, origin='earth', obj='Fermi')
-        # Vector add to geo_posvel to get full posvel vector.
-        return geo_posvel + fermi_posvel
+        super(FermiObs, self).__init__(name, self.FT2,
+                                       tt2tdb_mode=tt2tdb_mode,
+                                       use_velocities=False)
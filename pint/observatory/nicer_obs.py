@@ -3,20 +3,13 @@ from __future__ import absolute_import, print_function, division
 
 # Special "site" location for NICER experiment
 
-from . import Observatory
-from .special_locations import SpecialLocation
+from .satellite_obs import SatelliteObs
 import astropy.units as u
-from astropy.coordinates import GCRS, ITRS, EarthLocation, CartesianRepresentation
-from ..utils import PosVel
 from ..fits_utils import read_fits_event_mjds
-from ..solar_system_ephemerides import objPosVel_wrt_SSB
 import numpy as np
-from astropy.time import Time
 from astropy.table import Table, vstack
 import astropy.io.fits as pyfits
-from astropy.extern import six
 from astropy import log
-from scipy.interpolate import InterpolatedUnivariateSpline
 
 def load_FPorbit(orbit_filename):
     '''Load data from an (RXTE or NICER) FPorbit file
@@ -71,7 +64,7 @@ def load_FPorbit(orbit_filename):
         FPorbit_table = FPorbit_table[idx]
     return FPorbit_table
 
-class NICERObs(SpecialLocation):
+class NICERObs(SatelliteObs):
     """Observatory-derived class for the NICER photon data.
 
     Note that this must be instantiated once to be put into the Observatory registry.
@@ -82,17 +75,20 @@ class NICERObs(SpecialLocation):
     name: str
         Observatory name
     FPorbname: str
-        File name to read spacecraft position information from
+        File name to read spacecraft position information from, or
+        @filename to read a list of orbit file names
     tt2tdb_mode: str
         Selection for mode to use for TT to TDB conversion.
         'none' = Give no position to astropy.Time()
         'geo' = Give geocenter position to astropy.Time()
         'spacecraft' = Give spacecraft ITRF position to astropy.Time()
+    maxextrap: float
+        The longest (in minutes) it is acceptable to extrapolate the S/C
+        position
 """
 
-    def __init__(self, name, FPorbname, tt2tdb_mode = 'spacecraft'):
-
-
+    def __init__(self, name, FPorbname, tt2tdb_mode = 'spacecraft',
+                 maxextrap=2):
         if FPorbname.startswith('@'):
             # Read multiple orbit files names
             FPlist = []
@@ -104,76 +100,6 @@ class NICERObs(SpecialLocation):
             self.FPorb.sort('MJD_TT')
         else:
             self.FPorb = load_FPorbit(FPorbname)
-        # Now build the interpolator here:
-        self.X = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['X'])
-        self.Y = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['Y'])
-        self.Z = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['Z'])
-        self.Vx = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['Vx'])
-        self.Vy = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['Vy'])
-        self.Vz = InterpolatedUnivariateSpline(self.FPorb['MJD_TT'],self.FPorb['Vz'])
-        self.tt2tdb_mode = tt2tdb_mode
-        # Print this warning once, mainly for @paulray
-        if self.tt2tdb_mode.lower().startswith('none'):
-            log.warning('Using location=None for TT to TDB conversion')
-        elif self.tt2tdb_mode.lower().startswith('geo'):
-            log.warning('Using location geocenter for TT to TDB conversion')
-        super(NICERObs, self).__init__(name=name)
-
-    @property
-    def timescale(self):
-        return 'tt'
-
-    def earth_location_itrf(self, time=None):
-        '''Return NICER spacecraft location in ITRF coordinates'''
-
-        if self.tt2tdb_mode.lower().startswith('none'):
-            return None
-        elif self.tt2tdb_mode.lower().startswith('geo'):
-            return EarthLocation.from_geocentric(0.0*u.m,0.0*u.m,0.0*u.m)
-        elif self.tt2tdb_mode.lower().startswith('spacecraft'):
-            # First, interpolate ECI geocentric location from orbit file.
-            # These are inertial coorinates aligned with ICRF
-            pos_gcrs =  GCRS(CartesianRepresentation(self.X(time.tt.mjd)*u.m,
-                                                     self.Y(time.tt.mjd)*u.m,
-                                                     self.Z(time.tt.mjd)*u.m),
-                             obstime=time)
-
-            # Now transform ECI (GCRS) to ECEF (ITRS)
-            # By default, this uses the WGS84 ellipsoid
-            pos_ITRS = pos_gcrs.transform_to(ITRS(obstime=time))
-
-            # Return geocentric ITRS coordinates as an EarthLocation object
-            return pos_ITRS.earth_location
-        else:
-            log.error('Unknown tt2tdb_mode %s, using None', self.tt2tdb_mode)
-            return None
-
-    @property
-    def tempo_code(self):
-        return None
-
-    def posvel(self, t, ephem, maxextrap=2):
-        '''Return position and velocity vectors of NICER.
-
-        t is an astropy.Time or array of astropy.Times
-        maxextrap is the longest (in minutes) it is acceptable to
-            extrapolate the S/C position
-        '''
-        # this is a simple edge check mainly to prevent use of the wrong
-        # orbit file or a single orbit file with a merged event file; if
-        # needed, can check to make sure there is a spline anchor point
-        # sufficiently close to all event times
-        tmin = np.min(self.FPorb['MJD_TT'])
-        tmax = np.max(self.FPorb['MJD_TT'])
-        if (tmin-np.min(t.tt.mjd) > float(maxextrap)/(60*24) or
-            np.max(t.tt.mjd)-tmax > float(maxextrap)/(60*24)):
-            log.error('Extrapolating NICER position by more than %d minutes!'%maxextrap)
-            raise ValueError("Bad extrapolation of S/C file.")
-        # Compute vector from SSB to Earth
-        geo_posvel = objPosVel_wrt_SSB('earth', t, ephem)
-        # Now add vector from Earth to NICER
-        nicer_pos_geo = np.array([self.X(t.tt.mjd), self.Y(t.tt.mjd), self.Z(t.tt.mjd)])*self.FPorb['X'].unit
-        nicer_vel_geo = np.array([self.Vx(t.tt.mjd), self.Vy(t.tt.mjd), self.Vz(t.tt.mjd)])*self.FPorb['Vx'].unit
-        nicer_posvel = PosVel( nicer_pos_geo, nicer_vel_geo, origin='earth', obj='nicer')
-        # Vector add to geo_posvel to get full posvel vector.
-        return geo_posvel + nicer_posvel
+        super(NICERObs, self).__init__(name, self.FPorb,
+                                       tt2tdb_mode=tt2tdb_mode,
+                                       maxextrap=maxextrap)
@@ -139,6 +139,12 @@ class Observatory(object):
         # TOA metadata which may be necessary in some cases.
         raise NotImplementedError
 
+    def clock_files(self):
+        """Returns the list of full paths of the files that the clock
+        corrections of this observatory are read from (with the current
+        include_gps/include_bipm settings)."""
+        return []
+
     def get_TDBs(self, t,  method='astropy', ephem=None, options=None):
         """This is a high level function for converting TOAs to TDB time scale.
             Different method can be applied to obtain the result. Current supported
@@ -0,0 +1,173 @@
+# satellite_obs.py
+from __future__ import absolute_import, print_function, division
+
+# Common base for the spacecraft "sites" (Fermi, NICER, RXTE)
+
+from .special_locations import SpecialLocation
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+from ..utils import PosVel
+from ..solar_system_ephemerides import objPosVel_wrt_SSB
+from .. import erfautils
+from ..erfautils import TerrestrialRotation
+import numpy as np
+from astropy import log
+from scipy.interpolate import CubicSpline, PPoly
+
+
+class SpacecraftOrbit(object):
+    """Piecewise cubic ephemeris of a spacecraft in geocentric inertial
+    (GCRS) coordinates.
+
+    Position and velocity are kept as one piecewise polynomial with six
+    components, so both are evaluated in a single vectorized call. If the
+    orbit file has velocities, each interval is the cubic Hermite
+    polynomial matching the positions and velocities at both ends;
+    otherwise the positions are interpolated by a cubic spline and the
+    velocities are its derivative.
+
+    Parameters
+    ----------
+    mjd_tt : array
+        Times of the orbit samples, MJD(TT), increasing.
+    pos : N x 3 array
+        Positions in m.
+    vel : N x 3 array, optional
+        Velocities in m/s.
+    """
+    def __init__(self, mjd_tt, pos, vel=None):
+        mjd_tt = np.asarray(mjd_tt, dtype=np.float64)
+        pos = np.asarray(pos, dtype=np.float64)
+        # Drop repeated samples (e.g. from concatenated orbit files)
+        mjd_tt, idx = np.unique(mjd_tt, return_index=True)
+        pos = pos[idx]
+        self.mjd0 = mjd_tt[0]
+        self.tmin = mjd_tt[0]
+        self.tmax = mjd_tt[-1]
+        # Use seconds since the first sample as the polynomial variable
+        x = (mjd_tt - self.mjd0) * erfautils.SECS_PER_DAY
+        if vel is None:
+            spl = CubicSpline(x, pos, axis=0)
+            cpos = spl.c
+            cvel = np.concatenate((np.zeros((1,) + cpos.shape[1:]),
+                                   spl.derivative().c))
+        else:
+            vel = np.asarray(vel, dtype=np.float64)[idx]
+            h = np.diff(x)[:, None]
+            p0, p1 = pos[:-1], pos[1:]
+            v0, v1 = vel[:-1], vel[1:]
+            a2 = (3.0 * (p1 - p0) / h - 2.0 * v0 - v1) / h
+            a3 = (2.0 * (p0 - p1) / h + v0 + v1) / h**2
+            cpos = np.array([a3, a2, v0, p0])
+            cvel = np.array([np.zeros_like(a3), 3.0 * a3, 2.0 * a2, v0])
+        self.ppoly = PPoly(np.concatenate((cpos, cvel), axis=2), x)
+
+    def posvel(self, mjd_tt):
+        """Return the (3 x N) positions (m) and velocities (m/s) at the
+        given MJD(TT)s."""
+        x = (np.asarray(mjd_tt, dtype=np.float64) - self.mjd0) \
+            * erfautils.SECS_PER_DAY
+        pv = self.ppoly(x)
+        return pv[..., :3].T, pv[..., 3:].T
+
+
+class SatelliteObs(SpecialLocation):
+    """Observatory-derived base class for spacecraft, whose geocentric
+    orbit is given by an orbit table.
+
+    Parameters
+    ----------
+
+    name: str
+        Observatory name
+    orbit_table: astropy Table
+        Table with columns MJD_TT, X, Y, Z and optionally Vx, Vy, Vz, with
+        positions in ECI (GCRS) coordinates
+    tt2tdb_mode: str
+        Selection for mode to use for TT to TDB conversion.
+        'none' = Give no position to astropy.Time()
+        'geo' = Give geocenter position to astropy.Time()
+        'spacecraft' = Give spacecraft ITRF position to astropy.Time()
+    use_velocities: bool
+        Use the Vx, Vy, Vz columns of the table, rather than the derivative
+        of the position spline.
+    maxextrap: float or None
+        The longest (in minutes) it is acceptable to extrapolate the
+        spacecraft position in posvel(); None for no check.
+    """
+
+    def __init__(self, name, orbit_table, tt2tdb_mode='spacecraft',
+                 use_velocities=True, maxextrap=None):
+        pos = np.array([orbit_table[c].to(u.m).value
+                        for c in ('X', 'Y', 'Z')]).T
+        vel = None
+        if use_velocities:
+            vel = np.array([orbit_table[c].to(u.m/u.s).value
+                            for c in ('Vx', 'Vy', 'Vz')]).T
+        self.orbit = SpacecraftOrbit(
+            u.Quantity(orbit_table['MJD_TT'], u.d).value, pos, vel)
+        self.rotation = TerrestrialRotation()
+        self.maxextrap = maxextrap
+        self.tt2tdb_mode = tt2tdb_mode
+        # Print this warning once, mainly for @paulray
+        if self.tt2tdb_mode.lower().startswith('none'):
+            log.warning('Using location=None for TT to TDB conversion')
+        elif self.tt2tdb_mode.lower().startswith('geo'):
+            log.warning('Using location geocenter for TT to TDB conversion')
+        super(SatelliteObs, self).__init__(name=name)
+
+    @property
+    def timescale(self):
+        return 'tt'
+
+    @property
+    def tempo_code(self):
+        return None
+
+    def earth_location_itrf(self, time=None):
+        '''Return the spacecraft location in ITRF coordinates'''
+
+        if self.tt2tdb_mode.lower().startswith('none'):
+            return None
+        elif self.tt2tdb_mode.lower().startswith('geo'):
+            return EarthLocation.from_geocentric(0.0*u.m,0.0*u.m,0.0*u.m)
+        elif self.tt2tdb_mode.lower().startswith('spacecraft'):
+            # Interpolate the ECI (GCRS) geocentric location from the orbit
+            # and rotate it to ECEF (ITRS)
+            pos_gcrs, vel_gcrs = self.orbit.posvel(time.tt.mjd)
+            x, y, z = self.rotation.gcrs_to_itrs(time, pos_gcrs)
+            if time.isscalar:
+                x, y, z = x[0], y[0], z[0]
+            # Return geocentric ITRS coordinates as an EarthLocation object
+            return EarthLocation.from_geocentric(x, y, z, unit=u.m)
+        else:
+            log.error('Unknown tt2tdb_mode %s, using None', self.tt2tdb_mode)
+            return None
+
+    def posvel(self, t, ephem):
+        '''Return position and velocity vectors of the spacecraft, wrt SSB.
+
+        These positions and velocites are in inertial coordinates
+        (i.e. aligned with ICRS)
+
+        t is an astropy.Time or array of astropy.Times
+        '''
+        mjd_tt = t.tt.mjd
+        if self.maxextrap is not None:
+            # this is a simple edge check mainly to prevent use of the
+            # wrong orbit file or a single orbit file with a merged event
+            # file
+            maxextrap = float(self.maxextrap)/(60*24)
+            if (self.orbit.tmin-np.min(mjd_tt) > maxextrap or
+                np.max(mjd_tt)-self.orbit.tmax > maxextrap):
+                log.error('Extrapolating {0} position by more than {1} '
+                          'minutes!'.format(self.name, self.maxextrap))
+                raise ValueError("Bad extrapolation of S/C file.")
+        # Compute vector from SSB to Earth
+        geo_posvel = objPosVel_wrt_SSB('earth', t, ephem)
+        # Now add vector from Earth to the spacecraft
+        pos, vel = self.orbit.posvel(mjd_tt)
+        sc_posvel = PosVel(pos*u.m, vel*u.m/u.s, origin='earth',
+                           obj=self.name)
+        # Vector add to geo_posvel to get full posvel vector.
+        return geo_posvel + sc_posvel
@@ -2,7 +2,8 @@
 # Code for dealing with "standard" ground-based observatories.
 from __future__ import absolute_import, print_function, division
 from . import Observatory
-from .clock_file import ClockFile
+from .clock_file import ClockFile, TempoClockFile, ClockChain, \
+    clock_chain_key
 import os
 import numpy
 import astropy.units as u
@@ -12,7 +13,7 @@ from astropy.coordinates import EarthLocation
 from astropy.time import Time
 from ..utils import PosVel, has_astropy_unit
 from ..solar_system_ephemerides import objPosVel_wrt_SSB, get_tdb_tt_ephem_geocenter
-from ..config import datapath
+from ..config import datapath, cachepath
 from ..erfautils import gcrs_posvel_from_itrf, SECS_PER_DAY
 from pint import JD_MJD
 
@@ -107,6 +108,10 @@ class TopoObs(Observatory):
         self.bipm_version = bipm_version
         self._bipm_clock = None
 
+        # Merged clock corrections, by (include_gps, include_bipm,
+        # bipm_version)
+        self._clock_chains = {}
+
         self.tempo_code = tempo_code
         if aliases is None: aliases = []
         for code in (tempo_code, itoa_code):
@@ -160,25 +165,34 @@ class TopoObs(Observatory):
     def earth_location_itrf(self, time=None):
         return self._loc_itrf
 
-    def clock_corrections(self, t):
-        # Read clock file if necessary
-        # TODO provide some method for re-reading the clock file?
+    def clock_files(self):
+        files = []
+        if self.clock_fmt == 'tempo' and os.path.isfile(self.clock_fullpath):
+            files += TempoClockFile.included_files(self.clock_fullpath)
+        else:
+            files.append(self.clock_fullpath)
+        if self.include_gps:
+            files.append(self.gps_fullpath)
+        if self.include_bipm:
+            files.append(self.bipm_fullpath)
+        return files
+
+    def _load_clocks(self):
+        """Read the clock files of the current clock correction chain.
+        Returns the list of ClockFiles and the constant offset (us)."""
         if self._clock is None:
             log.info('Observatory {0}, loading clock file {1}'.format(self.name, self.clock_fullpath))
             self._clock = ClockFile.read(self.clock_fullpath,
                     format=self.clock_fmt, obscode=self.tempo_code)
-        log.info('Evaluating observatory clock corrections.')
-        corr = self._clock.evaluate(t)
+        clocks = [self._clock]
+        offset = 0.0
         if self.include_gps:
-            log.info('Applying GPS to UTC clock correction (~few nanoseconds)')
             if self._gps_clock is None:
                 log.info('Observatory {0}, loading GPS clock file {1}'.format(self.name, self.gps_fullpath))
                 self._gps_clock = ClockFile.read(self.gps_fullpath,
                         format='tempo2')
-            corr += self._gps_clock.evaluate(t)
+            clocks.append(self._gps_clock)
         if self.include_bipm:
-            log.info('Applying TT(TAI) to TT(BIPM) clock correction (~27 us)')
-            tt2tai = 32.184 * 1e6 * u.us
             if self._bipm_clock is None:
                 try:
                     log.info('Observatory {0}, loading BIPM clock file {1}'.format(self.name, self.bipm_fullpath))
@@ -186,8 +200,51 @@ class TopoObs(Observatory):
                                                       format='tempo2')
                 except:
                     raise ValueError("Can not find TT BIPM file '%s'. " % self.bipm_version)
-            corr += self._bipm_clock.evaluate(t) - tt2tai
-        return corr
+            clocks.append(self._bipm_clock)
+            # TT(TAI) - TAI
+            offset = -32.184 * 1e6
+        return clocks, offset
+
+    def clock_chain(self):
+        """Returns the ClockChain merging all the clock corrections of this
+        observatory (site, and GPS and BIPM as set by include_gps,
+        include_bipm and bipm_version).
+
+        The chain is kept in a binary file in the PINT cache dir, one per
+        site and set of options.  The file header holds the hashes of all
+        the clock files, so the clock files are only parsed again (and the
+        file replaced) when one of them changes.
+        """
+        opts = (self.include_gps, self.include_bipm, self.bipm_version)
+        chain = self._clock_chains.get(opts)
+        if chain is not None:
+            return chain
+        key = clock_chain_key(self.clock_files(),
+                              -32.184e6 if self.include_bipm else 0.0)
+        name = [self.name]
+        if self.include_gps:
+            name.append('gps')
+        if self.include_bipm:
+            name.append(self.bipm_version.lower())
+        cachefile = cachepath('clock_{0}.clkc'.format('_'.join(name)))
+        if cachefile is not None:
+            chain = ClockChain.read(cachefile, key)
+        if chain is None:
+            clocks, offset = self._load_clocks()
+            chain = ClockChain.merge(clocks, offset)
+            if cachefile is not None:
+                try:
+                    chain.write(cachefile, key)
+                except (IOError, OSError):
+                    log.warn('Can not write clock cache file {0}'.format(cachefile))
+        else:
+            log.info('Observatory {0}, read clock corrections from {1}'.format(self.name, cachefile))
+        self._clock_chains[opts] = chain
+        return chain
+
+    def clock_corrections(self, t):
+        log.info('Evaluating observatory clock corrections (include_gps = {0}, include_bipm = {1}).'.format(self.include_gps, self.include_bipm))
+        return self.clock_chain().evaluate(t.mjd)
 
     def _get_TDB_ephem(self, t, ephem):
         """This is a function that reads the ephem TDB-TT column. This column is
@@ -0,0 +1,157 @@
+"""Fast approximate pulse phases for small changes of a timing model.
+
+Sampling a timing model against photon data (e.g. with emcee) evaluates the
+full delay and phase chain for every photon at every step, although the
+walkers only move a few sigma away from the starting model. Within such a
+region the phases are very nearly a linear function of the fitted
+parameters, so they can be predicted from the phases and the design matrix
+of the reference model with a matrix-vector product.
+"""
+from __future__ import absolute_import, print_function, division
+import numpy as np
+from astropy import log
+
+__all__ = ['PhaseSurrogate']
+
+
+class PhaseSurrogate(object):
+    """Taylor expansion of the pulse phases around a reference model.
+
+    The phases of the TOAs are predicted as
+
+        phase(p) = phase(p0) + D (p - p0) + 1/2 (p - p0)^T H (p - p0)
+
+    where D is the matrix of the phase derivatives d_phase/d_param of the
+    reference model and H, used for order=2, holds the second derivatives,
+    estimated by finite differences of the design matrix. Both are
+    evaluated once, at construction.
+
+    The expansion is trusted only close to the reference values: a
+    parameter vector is in the trust region if no parameter moved by more
+    than trust_radius times its scale. Callers evaluate the exact model
+    outside of it.
+
+    Parameters
+    ----------
+    model : TimingModel
+        The reference model; it is left unchanged.
+    toas : TOAs
+        The TOAs to predict phases for.
+    params : list of str
+        Names of the model parameters that vary.
+    scales : array, optional
+        Typical step of each parameter (e.g. its uncertainty), used for the
+        trust region and for the finite differences. Default is the
+        parameter uncertainties of the model.
+    trust_radius : float
+        Size of the trust region, in units of scales.
+    order : int
+        1 for the linear expansion, 2 to add the second-order terms. The
+        second derivatives take len(params) extra design matrix evaluations
+        and len(params) * (len(params) + 1) / 2 columns of storage.
+    """
+    def __init__(self, model, toas, params, scales=None, trust_radius=3.0,
+                 order=1):
+        if order not in (1, 2):
+            raise ValueError("order must be 1 or 2, not %s" % order)
+        self.params = list(params)
+        self.order = order
+        self.trust_radius = float(trust_radius)
+        self.p0 = np.array([getattr(model, p).value for p in self.params],
+                           dtype=np.longdouble)
+        if scales is None:
+            scales = [getattr(model, p).uncertainty_value
+                      for p in self.params]
+        self.scales = np.asarray(scales, dtype=np.float64)
+        if np.any(~(self.scales > 0)):
+            raise ValueError("The parameter scales must be positive")
+        self.nexact = 0
+        self.nsurrogate = 0
+
+        frac = model.phase(toas.table).frac
+        self.frac0 = np.asarray(getattr(frac, 'value', frac),
+                                dtype=np.float64)
+        self.D = self._derivatives(model, toas)
+        self.H = None
+        if order == 2:
+            self.H = self._second_derivatives(model, toas)
+
+    def _derivatives(self, model, toas):
+        """Return the (ntoas x nparams) phase derivatives of model."""
+        saved = {}
+        for p in model.params:
+            par = getattr(model, p)
+            saved[p] = par.frozen
+            par.frozen = p not in self.params
+        try:
+            M, names, units, scaled = model.designmatrix(
+                toas.table, scale_by_F0=False, incoffset=False)
+        finally:
+            for p, frozen in saved.items():
+                getattr(model, p).frozen = frozen
+        # The design matrix columns are -d_phase/d_param, in model order
+        idx = [names.index(p) for p in self.params]
+        return -np.asarray(M)[:, idx]
+
+    def _second_derivatives(self, model, toas):
+        """Return the phase second derivatives of model, as the (ntoas x
+        nparams * (nparams + 1) / 2) upper triangle of H."""
+        n = len(self.params)
+        dD = []
+        try:
+            for j, p in enumerate(self.params):
+                getattr(model, p).value = self.p0[j] + self.scales[j]
+                dD.append((self._derivatives(model, toas) - self.D)
+                          / self.scales[j])
+                getattr(model, p).value = self.p0[j]
+        finally:
+            for j, p in enumerate(self.params):
+                getattr(model, p).value = self.p0[j]
+        iu, ju = np.triu_indices(n)
+        # Symmetrize the finite differences; the off-diagonal terms appear
+        # twice in the quadratic form
+        H = np.empty((self.D.shape[0], len(iu)))
+        for k, (i, j) in enumerate(zip(iu, ju)):
+            if i == j:
+                H[:, k] = dD[j][:, i]
+            else:
+                H[:, k] = dD[j][:, i] + dD[i][:, j]
+        self._iu, self._ju = iu, ju
+        return H
+
+    def step(self, values):
+        """Return the step from the reference values, as float64."""
+        return np.asarray(np.asarray(values, dtype=np.longdouble) - self.p0,
+                          dtype=np.float64)
+
+    def in_trust_region(self, values):
+        """Whether the expansion may be used for the parameter values."""
+        return np.all(np.abs(self.step(values) / self.scales)
+                      <= self.trust_radius)
+
+    def phases(self, values):
+        """Return the predicted pulse phases, in [0, 1), for the parameter
+        values (in the order of params)."""
+        dp = self.step(values)
+        dphase = np.dot(self.D, dp)
+        if self.H is not None:
+            dphase += 0.5 * np.dot(self.H, dp[self._iu] * dp[self._ju])
+        self.nsurrogate += 1
+        return np.mod(self.frac0 + dphase, 1.0)
+
+    def model_phases(self, model, toas):
+        """Return the phases of the TOAs in [0, 1) for the current
+        parameters of model, from the expansion inside the trust region or
+        from the exact model outside of it."""
+        values = [getattr(model, p).value for p in self.params]
+        if self.in_trust_region(values):
+            return self.phases(values)
+        self.nexact += 1
+        frac = model.phase(toas.table).frac
+        frac = np.asarray(getattr(frac, 'value', frac), dtype=np.float64)
+        return np.mod(frac, 1.0)
+
+    def report(self):
+        """Log how often the expansion was used."""
+        log.info("Phase surrogate: %d approximate, %d exact evaluations"
+                 % (self.nsurrogate, self.nexact))
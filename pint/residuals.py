@@ -61,10 +61,17 @@ class resids(object):
         return F0 * u.Hz
 
     def calc_chi2(self):
-        """Return the weighted chi-squared for the model and toas."""
+        """Return the weighted chi-squared for the model and toas.
+
+        If the model has noise components, the residuals are weighted by
+        the full noise covariance (see `TimingModel.noise_covariance`).
+        """
         # Residual units are in seconds. Error units are in microseconds.
         if (self.toas.get_errors()==0.0).any():
             return np.inf
+        elif 'NoiseComponent' in self.model.component_types:
+            cov = self.model.noise_covariance(self.toas.table)
+            return cov.quad_form(self.time_resids.to(u.s).value)
         else:
             # The self.time_resids is in the unit of "s", the error "us".
             # This is more correct way, but it is the slowest.
@@ -76,6 +83,13 @@ class resids(object):
             # This the fastest way, but highly depend on the assumption of time_resids and
             # error units.
             return ((self.time_resids / self.toas.get_errors().to(u.s))**2.0).sum()
+
+    def lnlikelihood(self):
+        """Return the Gaussian log likelihood of the residuals under the
+        model's noise covariance."""
+        cov = self.model.noise_covariance(self.toas.table)
+        return cov.lnlikelihood(self.time_resids.to(u.s).value)
+
     def get_dof(self):
         """Return number of degrees of freedom for the model."""
         dof = self.toas.ntoas
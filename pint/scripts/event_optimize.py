@@ -9,12 +9,14 @@ import pint.plot_utils as plot_utils
 from pint.eventstats import hmw, hm
 from pint.models.priors import Prior, UniformUnboundedRV, UniformBoundedRV, GaussianBoundedRV
 from pint.observatory.fermi_obs import FermiObs
+from pint.phase_surrogate import PhaseSurrogate
 from scipy.stats import norm, uniform
 import matplotlib.pyplot as plt
 import astropy.table
 import astropy.units as u
 import scipy.optimize as op
 import sys, os, copy, fftfit
+import multiprocessing
 from astropy.coordinates import SkyCoord
 from astropy import log
 import argparse
@@ -26,6 +28,10 @@ import argparse
 # Should probably figure a way to make these not global variables
 maxpost = -9e99
 numcalls = 0
+# The fitter used by the posterior pool worker processes, and whether this
+# process is one of them (see posterior_pool)
+_pool_ftr = None
+_in_worker = False
 
 class custom_timing(pint.models.spindown.Spindown,
                     pint.models.astrometry.AstrometryEcliptic):
@@ -215,11 +221,27 @@ class emcee_fitter(Fitter):
         self.fitkeys, self.fitvals, self.fiterrs = \
             get_fit_keyvals(self.model, phs, phserr)
         self.n_fit_params = len(self.fitvals)
+        self.surrogate = None
+
+    def use_surrogate(self, order=1, trust_radius=3.0):
+        """
+        Predict the event phases from a Taylor expansion of the phases
+        around the current model (see pint.phase_surrogate), and only
+        evaluate the full model for parameters outside of the trust region
+        """
+        self.surrogate = PhaseSurrogate(self.model, self.toas,
+                                        self.fitkeys[:-1],
+                                        scales=self.fiterrs[:-1],
+                                        trust_radius=trust_radius,
+                                        order=order)
 
     def get_event_phases(self):
         """
         Return pulse phases based on the current model
         """
+        if self.surrogate is not None:
+            return self.surrogate.model_phases(self.model,
+                                               self.toas) * u.cycle
         phss = self.model.phase(self.toas.table)[1]
         # ensure all postive
         return np.where(phss < 0.0*u.cycle, phss + 1.0*u.cycle, phss)
@@ -244,7 +266,7 @@ class emcee_fitter(Fitter):
         self.set_params(dict(zip(self.fitkeys[:-1], theta[:-1])))
 
         numcalls += 1
-        if numcalls % (nwalkers * nsteps / 100) == 0:
+        if not _in_worker and numcalls % (nwalkers * nsteps / 100) == 0:
             print("~%d%% complete" % (numcalls / (nwalkers * nsteps / 100)))
 
         # Evaluate the prior FIRST, then don't even both computing
@@ -258,7 +280,7 @@ class emcee_fitter(Fitter):
         lnlikelihood = profile_likelihood(theta[-1], self.xtemp,
                                           phases, self.template, self.weights)
         lnpost = lnprior + lnlikelihood
-        if lnpost > maxpost:
+        if lnpost > maxpost and not _in_worker:
             print("New max: ", lnpost)
             for name, val in zip(ftr.fitkeys, theta):
                 print("  %8s: %25.15g" % (name, val))
@@ -339,6 +361,36 @@ class emcee_fitter(Fitter):
             plt.savefig(ftr.model.PSR.value+"_htest_v_wgtcut_unweighted.png")
         plt.close()
 
+def _init_pool_worker():
+    global _in_worker
+    _in_worker = True
+
+def _pool_lnposterior(theta):
+    """The log posterior of the fitter of a posterior_pool() worker."""
+    return _pool_ftr.lnposterior(theta)
+
+def posterior_pool(ftr, nproc):
+    """Return a pool of nproc worker processes for evaluating the posterior
+    of the emcee_fitter ftr, with _pool_lnposterior as the function to map.
+
+    The workers are forked from this process once, so each of them shares
+    the TOAs (with their TDBs and posvels), the weights, the template and
+    the model state of ftr copy-on-write, without pickling them. Only the
+    parameter vectors of the walkers and the posterior values are sent
+    between processes, so walker batches are evaluated in parallel.
+    """
+    global _pool_ftr
+    _pool_ftr = ftr
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except AttributeError:
+        # Python 2 always forks on POSIX systems
+        ctx = multiprocessing
+    except ValueError:
+        log.error('Parallel posterior evaluation needs the fork start method')
+        raise
+    return ctx.Pool(nproc, initializer=_init_pool_worker)
+
 def main(argv=None):
 
     parser = argparse.ArgumentParser(description="PINT tool for MCMC optimization of timing models using event data.")
@@ -374,6 +426,12 @@ def main(argv=None):
     parser.add_argument("--priorerrfact",help="Multiple par file errors by this factor when setting gaussian prior widths",type=float,default=10.0)
     parser.add_argument("--usepickle",help="Read events from pickle file, if available?",
         default=False,action="store_true")
+    parser.add_argument("--nproc",help="Number of processes evaluating the walkers in parallel (def 1)",
+        type=int, default=1)
+    parser.add_argument("--surrogate",help="Order (1 or 2) of the phase expansion around the starting model used for the MCMC steps, or 0 to always evaluate the full model (def 0)",
+        type=int, default=0, choices=[0, 1, 2])
+    parser.add_argument("--trustradius",help="Evaluate the full model for steps further than this many par file errors from the starting model, with --surrogate (def 3.0)",
+        type=float, default=3.0)
 
     global nwalkers, nsteps, ftr
 
@@ -408,10 +466,9 @@ def main(argv=None):
     modelin = pint.models.get_model(parfile)
 
     # The custom_timing version below is to manually construct the TimingModel
-    # class, which allows it to be pickled. This is needed for parallelizing
-    # the emcee call over a number of threads.  So far, it isn't quite working
-    # so it is disabled.  The code above constructs the TimingModel class
-    # dynamically, as usual.
+    # class, which allows it to be pickled.  This is not needed for the
+    # parallel emcee call (see posterior_pool), which forks the worker
+    # processes instead of sending them the model.
     #modelin = custom_timing(parfile)
 
     # Remove the dispersion delay as it is unnecessary
@@ -494,6 +551,8 @@ def main(argv=None):
 
     # Now define the requirements for emcee
     ftr = emcee_fitter(ts, modelin, gtemplate, weights, phs, args.phserr)
+    # Only the components whose parameters a step changes are recomputed
+    ftr.model.enable_cache()
 
     # Use this if you want to see the effect of setting minWeight
     if args.testWeights:
@@ -575,20 +634,37 @@ def main(argv=None):
     # This way, one walker should always be in a good position
     pos[0] = ftr.fitvals
 
+    if args.surrogate > 0:
+        # Expand the phases around the center of the walkers
+        center = ftr.fitvals if like_start > like_optmin else newfitvals
+        ftr.set_params(dict(zip(ftr.fitkeys[:-1], center[:-1])))
+        ftr.use_surrogate(order=args.surrogate,
+                          trust_radius=args.trustradius)
+
     import emcee
-    # Following are for parallel processing tests...
-    if 0:
-        def unwrapped_lnpost(theta, ftr=ftr):
-            return ftr.lnposterior(theta)
-
-        import pathos.multiprocessing as mp
-        pool = mp.ProcessPool(nodes=8)
-        sampler = emcee.EnsembleSampler(nwalkers, ndim, unwrapped_lnpost,
-                                        pool=pool, args=[ftr])
+    if args.nproc > 1:
+        pool = posterior_pool(ftr, args.nproc)
+        sampler = emcee.EnsembleSampler(nwalkers, ndim, _pool_lnposterior,
+                                        pool=pool)
+        # The workers do not report progress, do it here instead
+        for ii, result in enumerate(sampler.sample(pos, iterations=nsteps)):
+            if (ii + 1) % max(nsteps // 100, 1) == 0:
+                print("~%d%% complete" % (100 * (ii + 1) // nsteps))
+        pool.close()
+        pool.join()
+        # The maximum posterior found by the workers
+        ibest = np.unravel_index(np.argmax(sampler.lnprobability),
+                                 sampler.lnprobability.shape)
+        ftr.maxpost_fitvals = sampler.chain[ibest]
+        print("Max posterior: ", sampler.lnprobability[ibest])
     else:
         sampler = emcee.EnsembleSampler(nwalkers, ndim, ftr.lnposterior)
-    # The number is the number of points in the chain
-    sampler.run_mcmc(pos, nsteps)
+        # The number is the number of points in the chain
+        sampler.run_mcmc(pos, nsteps)
+        if ftr.surrogate is not None:
+            ftr.surrogate.report()
+    # Use the exact phases for the results
+    ftr.surrogate = None
 
     def chains_to_dict(names, sampler):
         chains = [sampler.chain[:,:,ii].T for ii in range(len(names))]
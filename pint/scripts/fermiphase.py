@@ -6,7 +6,7 @@ import pint.toa as toa
 import pint.models
 import pint.residuals
 import astropy.units as u
-from pint.fermi_toas import load_Fermi_TOAs
+from pint.fermi_toas import get_Fermi_TOAs
 from pint.plot_utils import phaseogram
 from pint.observatory.fermi_obs import FermiObs
 import argparse
@@ -60,37 +60,25 @@ def main(argv=None):
         if line.startswith('TZRFRQ'):
             tzrfrq = np.float(line.split()[1])*u.MHz
 
-    if tzrmjd is None:
-        tzrmjd = tl[0].mjd
-
-    tztoa = toa.TOA(tzrmjd,obs=tzrsite,freq=tzrfrq)
-    tz = toa.get_TOAs_list([tztoa],include_bipm=False,include_gps=True,
-        ephem=args.ephem, planets=True)
-
     if args.ft2 is not None:
         # Instantiate FermiObs once so it gets added to the observatory registry
         FermiObs(name='Fermi',ft2name=args.ft2)
 
-    # Read event file and return list of TOA objects
-    tl  = load_Fermi_TOAs(args.eventfile, weightcolumn=args.weightcol,
-                          targetcoord=tc)
+    # Read event file into a TOAs object, discarding events outside of
+    # the MJD range, and compute TDBs and posvels
+    # For Fermi, we are not including GPS or TT(BIPM) corrections
+    maxmjd = np.inf if args.maxMJD is None else float(args.maxMJD)
+    ts = get_Fermi_TOAs(args.eventfile, weightcolumn=args.weightcol,
+                        targetcoord=tc, maxmjd=maxmjd, include_gps=False,
+                        include_bipm=False, planets=args.planets,
+                        ephem=args.ephem)
 
-    # Discard events outside of MJD range
-    if args.maxMJD is not None:
-        tlnew = []
-        print("pre len : ",len(tl))
-        maxT = Time(float(args.maxMJD),format='mjd')
-        print("maxT : ",maxT)
-        for tt in tl:
-            if tt.mjd < maxT:
-                tlnew.append(tt)
-        tl=tlnew
-        print("post len : ",len(tlnew))
+    if tzrmjd is None:
+        tzrmjd = ts.table['mjd'][0]
 
-    # Now convert to TOAs object and compute TDBs and posvels
-    # For Fermi, we are not including GPS or TT(BIPM) corrections
-    ts = toa.get_TOAs_list(tl,include_gps=False,include_bipm=False,planets=args.planets,ephem=args.ephem)
-    ts.filename = args.eventfile
+    tztoa = toa.TOA(tzrmjd,obs=tzrsite,freq=tzrfrq)
+    tz = toa.get_TOAs_list([tztoa],include_bipm=False,include_gps=True,
+        ephem=args.ephem, planets=True)
 
     print(ts.get_summary())
     mjds = ts.get_mjds()
@@ -102,7 +90,7 @@ def main(argv=None):
     # ensure all postive
     phases = np.where(phss < 0.0 * u.cycle, phss + 1.0 * u.cycle, phss)
     mjds = ts.get_mjds()
-    weights = np.array([w['weight'] for w in ts.table['flags']])
+    weights = np.asarray(ts.table['weight'])
     h = float(hmw(phases,weights))
     print("Htest : {0:.2f} ({1:.2f} sigma)".format(h,h2sig(h)))
     if args.plot:
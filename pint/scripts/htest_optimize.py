@@ -7,6 +7,7 @@ import numpy as np
 import pint.toa as toa
 import pint.models
 from pint.fitter import Fitter
+from pint.phase_surrogate import PhaseSurrogate
 import pint.fermi_toas as fermi
 from pint.eventstats import hmw, hm, sf_hm
 import matplotlib.pyplot as plt
@@ -16,7 +17,9 @@ import astropy.units as u
 import psr_utils as pu
 import scipy.optimize as op
 import sys, os, copy, fftfit
+import multiprocessing
 from astropy.coordinates import SkyCoord
+from astropy import log
 
 
 # Params you might want to edit
@@ -35,10 +38,25 @@ errfact = 10.0 # multiplier for gaussian priors based TEMPO errors
 do_opt_first = True
 # Raise the calculated weights to this power
 wgtexp = 0.5
+# Order (1 or 2) of the expansion of the phases around the starting model
+# used for the MCMC steps, or 0 to always evaluate the full model
+surrogate_order = 0
+# Evaluate the full model for steps further than this many TEMPO errors
+# from the starting model when using the expansion
+trust_radius = 3.0
+# Grid search instead of the MCMC: a dict of parameter name to
+# (min offset, max offset, number of points), with the offsets added to the
+# par file value, e.g. {'F0': (-1e-8, 1e-8, 201), 'F1': (-1e-16, 1e-16, 51)}
+grid_search = {}
+grid_nproc = 4 # worker processes for the grid search
+grid_topk = 20 # number of best grid points to keep
+grid_chunksize = 100 # grid points per task (and per checkpoint update)
 
 # initialization values
 maxpost = -9e99
 numcalls = 0
+# The grid search of the grid_pool worker processes (see grid_pool)
+_pool_grid = None
 
 
 class emcee_fitter(Fitter):
@@ -50,11 +68,25 @@ class emcee_fitter(Fitter):
         self.weights = weights
         self.fitkeys, self.fitvals, self.fiterrs = self.get_lnprior_vals()
         self.n_fit_params = len(self.fitvals)
+        self.surrogate = None
+
+    def use_surrogate(self, order=1, trust_radius=3.0):
+        """
+        Predict the event phases from a Taylor expansion of the phases
+        around the current model (see pint.phase_surrogate), and only
+        evaluate the full model for parameters outside of the trust region
+        """
+        self.surrogate = PhaseSurrogate(self.model, self.toas, self.fitkeys,
+                                        scales=self.fiterrs / errfact,
+                                        trust_radius=trust_radius,
+                                        order=order)
 
     def get_event_phases(self):
         """
         Return pulse phases based on the current model
         """
+        if self.surrogate is not None:
+            return self.surrogate.model_phases(self.model, self.toas)
         phss = self.model.phase(self.toas.table)[1]
         # ensure all postive
         return np.where(phss < 0.0, phss + 1.0, phss)
@@ -206,6 +238,132 @@ class emcee_fitter(Fitter):
             plt.savefig(ftr.model.PSR.value+"_htest_v_wgtcut_unweighted.png")
         plt.close()
 
+def _htest(phases, weights):
+    if weights is None:
+        return hm(phases)
+    return hmw(phases, weights)
+
+def _merge_topk(index, h, new_index, new_h, k):
+    """Merge candidate grid points and keep the k with the largest H."""
+    index = np.concatenate((index, new_index))
+    h = np.concatenate((h, new_h))
+    best = np.argsort(h, kind='mergesort')[::-1][:k]
+    return index[best], h[best]
+
+class GridSearch(object):
+    """Weighted H-test evaluated over a regular grid of parameter offsets.
+
+    The grid is the product of the axes, one per parameter, and is split
+    into chunks of consecutive flat grid indices. The chunks are spread
+    over forked worker processes, which share the barycentered photons of
+    the fitter; the model caches the delays, so only the phases are
+    recomputed when the grid only has spin parameters. The top-k grid
+    points are saved to the checkpoint file after every chunk, and a search
+    restarted with the same grid and center skips the chunks already done.
+    """
+    def __init__(self, ftr, grid, topk=20, chunksize=100, checkpoint=None):
+        self.ftr = ftr
+        self.names = list(grid.keys())
+        self.center = [getattr(ftr.model, p).value for p in self.names]
+        self.axes = [np.linspace(*grid[p]) for p in self.names]
+        self.shape = tuple(len(a) for a in self.axes)
+        self.npts = int(np.prod(self.shape))
+        self.topk = topk
+        self.chunksize = chunksize
+        self.nchunks = (self.npts + chunksize - 1) // chunksize
+        self.checkpoint = checkpoint
+        self.done = np.zeros(self.nchunks, dtype=bool)
+        self.best_index = np.zeros(0, dtype=np.int64)
+        self.best_h = np.zeros(0)
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            self.load()
+
+    def values(self, index):
+        """Return the parameter values at the flat grid index."""
+        idx = np.unravel_index(index, self.shape)
+        return [c + a[i] for c, a, i in zip(self.center, self.axes, idx)]
+
+    def evaluate(self, ichunk):
+        """Return the chunk number and the top-k grid points of a chunk."""
+        lo = ichunk * self.chunksize
+        index = np.arange(lo, min(lo + self.chunksize, self.npts))
+        h = np.empty(len(index))
+        for ii, ind in enumerate(index):
+            self.ftr.set_params(dict(zip(self.names, self.values(ind))))
+            h[ii] = _htest(self.ftr.get_event_phases(), self.ftr.weights)
+        index, h = _merge_topk(index[:0], h[:0], index, h, self.topk)
+        return ichunk, index, h
+
+    def load(self):
+        cp = np.load(self.checkpoint)
+        if (list(cp['names']) != self.names or
+            not all(np.array_equal(cp['axis_%d' % ii], a)
+                    for ii, a in enumerate(self.axes)) or
+            'center' not in cp.files or
+            not np.array_equal(cp['center'],
+                               np.array(self.center, dtype=np.longdouble)) or
+            int(cp['chunksize']) != self.chunksize):
+            raise ValueError("Checkpoint %s is for a different grid"
+                             % self.checkpoint)
+        self.done = cp['done']
+        self.best_index = cp['best_index']
+        self.best_h = cp['best_h']
+        log.info("Resuming grid search, %d of %d chunks done"
+                 % (self.done.sum(), self.nchunks))
+
+    def save(self):
+        tmpfile = self.checkpoint + '.tmp'
+        with open(tmpfile, 'wb') as f:
+            axes = dict(('axis_%d' % ii, a) for ii, a in enumerate(self.axes))
+            np.savez(f, names=np.array(self.names),
+                     center=np.array(self.center, dtype=np.longdouble),
+                     chunksize=self.chunksize, done=self.done,
+                     best_index=self.best_index, best_h=self.best_h, **axes)
+        os.rename(tmpfile, self.checkpoint)
+
+    def run(self, nproc=1):
+        """Evaluate the remaining chunks; return the top-k parameter
+        values (one list per grid point) and H values."""
+        todo = np.flatnonzero(~self.done)
+        pool = None
+        if nproc > 1 and len(todo) > 1:
+            pool = grid_pool(self, nproc)
+            results = pool.imap_unordered(_grid_evaluate, todo)
+        else:
+            results = map(self.evaluate, todo)
+        try:
+            for ii, (ichunk, index, h) in enumerate(results):
+                self.best_index, self.best_h = _merge_topk(
+                    self.best_index, self.best_h, index, h, self.topk)
+                self.done[ichunk] = True
+                if self.checkpoint is not None:
+                    self.save()
+                if (ii + 1) % max(len(todo) // 100, 1) == 0:
+                    print("~%d%% complete, best H = %.2f" %
+                          (100 * self.done.sum() // self.nchunks,
+                           self.best_h[0]))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            self.ftr.set_params(dict(zip(self.names, self.center)))
+        return [self.values(i) for i in self.best_index], self.best_h
+
+def _grid_evaluate(ichunk):
+    return _pool_grid.evaluate(ichunk)
+
+def grid_pool(grid, nproc):
+    """Return a pool of nproc processes forked from this one, so each
+    shares the photons and model of the GridSearch grid."""
+    global _pool_grid
+    _pool_grid = grid
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except AttributeError:
+        # Python 2 always forks on POSIX systems
+        ctx = multiprocessing
+    return ctx.Pool(nproc)
+
 def main(argv=None):
 
     if len(argv)==3:
@@ -272,6 +430,8 @@ def main(argv=None):
 
     # Now define the requirements for emcee
     ftr = emcee_fitter(ts, modelin, weights)
+    # Only the components whose parameters a step changes are recomputed
+    ftr.model.enable_cache()
 
     # Use this if you want to see the effect of setting minWeight
     if minWeight == 0.0:
@@ -296,6 +456,24 @@ def main(argv=None):
         f.write("%.5f  %12.5f\n" % (x, v))
     f.close()
 
+    if grid_search:
+        search = GridSearch(ftr, grid_search, topk=grid_topk,
+                            chunksize=grid_chunksize,
+                            checkpoint=ftr.model.PSR.value+"_grid.npz")
+        values, hs = search.run(nproc=grid_nproc)
+        f = open(ftr.model.PSR.value+"_grid.txt", 'w')
+        f.write("# %12s " % "H" +
+                " ".join("%25s" % n for n in search.names) + "\n")
+        for vals, h in zip(values, hs):
+            line = "%14.4f " % h + " ".join("%25.17g" % v for v in vals)
+            print(line)
+            f.write(line + "\n")
+        f.close()
+        ftr.set_params(dict(zip(search.names, values[0])))
+        ftr.phaseogram(file=ftr.model.PSR.value+"_grid.png")
+        plt.close()
+        sys.exit()
+
     # Try normal optimization first to see how it goes
     if do_opt_first:
         result = op.minimize(ftr.minimize_func, np.zeros_like(ftr.fitvals))
@@ -342,11 +520,21 @@ def main(argv=None):
     # This way, one walker should always be in a good position
     pos[0] = ftr.fitvals
 
+    if surrogate_order > 0:
+        # Expand the phases around the center of the walkers
+        center = ftr.fitvals if like_start > like_optmin else newfitvals
+        ftr.set_params(dict(zip(ftr.fitkeys, center)))
+        ftr.use_surrogate(order=surrogate_order, trust_radius=trust_radius)
+
     import emcee
     #sampler = emcee.EnsembleSampler(nwalkers, ndim, ftr.lnposterior, threads=10)
     sampler = emcee.EnsembleSampler(nwalkers, ndim, ftr.lnposterior)
     # The number is the number of points in the chain
     sampler.run_mcmc(pos, nsteps)
+    if ftr.surrogate is not None:
+        ftr.surrogate.report()
+        # Use the exact phases for the results
+        ftr.surrogate = None
 
     def chains_to_dict(names, sampler):
         chains = [sampler.chain[:,:,ii].T for ii in range(len(names))]
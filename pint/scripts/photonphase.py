@@ -6,19 +6,236 @@ import pint.toa as toa
 import pint.models
 import pint.residuals
 import astropy.units as u
-from pint.event_toas import load_NICER_TOAs
-from pint.event_toas import load_RXTE_TOAs
-from pint.event_toas import load_XMM_TOAs
-from pint.event_toas import load_NuSTAR_TOAs
+from pint.event_toas import get_event_TOAs
 from pint.plot_utils import phaseogram_binned
 from pint.observatory.nicer_obs import NICERObs
 from pint.observatory.rxte_obs import RXTEObs
 from astropy.time import Time, TimeDelta
-from pint.eventstats import hmw, hm, h2sig
+from pint.eventstats import hmw, hm, h2sig, em_four
 from astropy.coordinates import SkyCoord
 from astropy import log
 import astropy.io.fits as pyfits
 import uuid
+import multiprocessing
+
+# State of the worker processes of the chunked mode (see _init_chunk_worker)
+_worker = {}
+
+def _setup_mission(hdr, orbfile=None):
+    """Return the event_toas mission name for an event file header.
+
+    The spacecraft observatory is registered first if an orbit file is
+    given. Returns None if the file is not recognized.
+    """
+    if hdr['TELESCOP'] == 'NICER':
+        # Instantiate NICERObs once so it gets added to the observatory registry
+        if orbfile is not None:
+            log.info('Setting up NICER observatory')
+            NICERObs(name='NICER',FPorbname=orbfile,tt2tdb_mode='spacecraft')
+        return 'nicer'
+    elif hdr['TELESCOP'] == 'XTE':
+        # Instantiate RXTEObs once so it gets added to the observatory registry
+        if orbfile is not None:
+            # Determine what observatory type is.
+            log.info('Setting up RXTE observatory')
+            RXTEObs(name='RXTE',FPorbname=orbfile,tt2tdb_mode='spacecraft')
+        return 'rxte'
+    elif hdr['TELESCOP'].startswith('XMM'):
+        # Not loading orbit file here, since that is not yet supported.
+        return 'xmm'
+    elif hdr['TELESCOP'].startswith('NuSTAR'):
+        # Not loading orbit file here, since that is not yet supported.
+        return 'nustar'
+    return None
+
+def _get_tz_toas(parfile, default_mjd, ephem, planets):
+    """Return the TOAs of the TZR parameters read from parfile, with
+    default_mjd as the TZRMJD if the par file has none."""
+    # Read TZR parameters from parfile separately
+    tzrmjd = None
+    tzrsite = '@'
+    tzrfrq = np.inf*u.MHz
+    for line in open(parfile):
+        if line.startswith('TZRMJD'):
+            tzrmjd = np.longdouble(line.split()[1])
+        if line.startswith('TZRSITE'):
+            tzrsite = line.split()[1]
+        if line.startswith('TZRFRQ'):
+            tzrfrq = np.float(line.split()[1])*u.MHz
+
+    if tzrmjd is None:
+        tzrmjd = default_mjd
+
+    tztoa = toa.TOA(tzrmjd,obs=tzrsite,freq=tzrfrq)
+    return toa.get_TOAs_list([tztoa],include_bipm=False,include_gps=False,
+        ephem=ephem, planets=planets)
+
+def _init_chunk_worker(parfile, hdr, orbfile, tz, ephem, planets):
+    """Set up a process for _process_chunk()."""
+    # With a single process, the main process has already set up the
+    # observatory and the model
+    if 'model' not in _worker:
+        _setup_mission(hdr, orbfile)
+        _worker['model'] = pint.models.get_model(parfile)
+    _worker['tzphase'] = _worker['model'].phase(tz.table)
+    _worker['ephem'] = ephem
+    _worker['planets'] = planets
+
+def _process_chunk(args):
+    """Compute the phases of rows start:stop of an event file.
+
+    Returns the pulse phases, absolute phases and barycentric times in
+    file order, and the trigonometric moment sums of the phases for the
+    H-test.
+    """
+    eventfile, mission, start, stop, nharm = args
+    ts = get_event_TOAs(eventfile, mission, rows=slice(start, stop),
+                        ephem=_worker['ephem'], planets=_worker['planets'])
+    iphss,phss = _worker['model'].phase(ts.table) - _worker['tzphase']
+    # ensure all postive
+    negmask = phss < 0.0 * u.cycle
+    phases = np.asarray(np.where(negmask, phss + 1.0 * u.cycle, phss))
+    absphases = (iphss - negmask*u.cycle).value
+    tdbs = np.asarray(ts.table['tdbld'], dtype=np.float64)
+    # The table is grouped by observatory; put the rows back in file order
+    index = np.asarray(ts.table['index'])
+    out = np.empty((3, len(index)))
+    out[0, index] = phases
+    out[1, index] = absphases
+    out[2, index] = tdbs
+    aks, bks = em_four(out[0], m=nharm)
+    return out[0], out[1].astype(np.int64), out[2], aks*len(index), \
+        bks*len(index)
+
+class _EventStreamWriter(object):
+    """Write a copy of a FITS event file with added or replaced columns in
+    the event HDU, one chunk of rows at a time.
+
+    The event rows are copied as raw bytes from the (memory mapped) input
+    file, and the new column values appended to them, so only one chunk
+    is held in memory.
+    """
+    _dtypes = {'D': '>f8', 'K': '>i8'}
+
+    def __init__(self, hdulist, filename, columns):
+        hdu = hdulist[1]
+        if hdu.header.get('PCOUNT', 0) != 0:
+            raise ValueError('Cannot stream event tables with a heap.')
+        self.hdulist = hdulist
+        self.filename = filename
+        self.data = hdu.data
+        self.rowlen = hdu.header['NAXIS1']
+        self.replace = [c for c, f in columns if c in hdu.columns.names]
+        self.add = [(c, f) for c, f in columns
+                    if c not in hdu.columns.names]
+        hdr = hdu.header.copy()
+        for key in ('CHECKSUM', 'DATASUM'):
+            if key in hdr:
+                del hdr[key]
+        for c, f in self.add:
+            log.info('Adding new %s column.' % c)
+            n = hdr['TFIELDS'] + 1
+            hdr['TTYPE%d' % n] = c
+            hdr['TFORM%d' % n] = f
+            hdr['TFIELDS'] = n
+            hdr['NAXIS1'] += np.dtype(self._dtypes[f]).itemsize
+        for c in self.replace:
+            log.info('Found existing %s column, overwriting...' % c)
+        self.dtype = np.dtype([('raw', 'V%d' % self.rowlen)] +
+                              [(c, self._dtypes[f]) for c, f in self.add])
+        pyfits.HDUList([hdulist[0]]).writeto(filename, overwrite=True)
+        self.stream = pyfits.StreamingHDU(filename, hdr)
+
+    def write(self, start, values):
+        """Write the rows from start on, with the new column values given
+        by the dict values."""
+        n = len(values[list(values.keys())[0]])
+        raw = np.array(self.data[start:start+n].view(np.ndarray))
+        for c in self.replace:
+            raw[c] = values[c]
+        out = np.empty(n, dtype=self.dtype)
+        out['raw'] = raw.view(np.dtype(('V', self.rowlen)))
+        for c, f in self.add:
+            out[c] = values[c]
+        self.stream.write(out.view(np.uint8))
+
+    def close(self):
+        self.stream.close()
+        # Copy the HDUs after the event list (e.g. GTIs)
+        for hdu in self.hdulist[2:]:
+            pyfits.append(self.filename, hdu.data, hdu.header)
+
+def _chunked_photonphase(args, mission, hdr, modelin, use_planets):
+    """Compute the phases of an event file in chunks of rows, with bounded
+    memory, optionally writing them to the output file as they are done."""
+    hdulist = pyfits.open(args.eventfile, memmap=True)
+    nrows = len(hdulist[1].data)
+    if nrows == 0:
+        log.error("No TOAs, exiting!")
+        sys.exit(0)
+    first = get_event_TOAs(args.eventfile, mission, rows=slice(0, 1),
+                           ephem=args.ephem, planets=use_planets)
+    tz = _get_tz_toas(args.parfile, first.table['mjd'][0], args.ephem,
+                      use_planets)
+    nharm = 20
+    tasks = [(args.eventfile, mission, start,
+              min(start + args.chunksize, nrows), nharm)
+             for start in range(0, nrows, args.chunksize)]
+    initargs = (args.parfile, hdr, args.orbfile, tz, args.ephem, use_planets)
+
+    writer = None
+    outname = args.outfile
+    if args.addphase:
+        columns = [('PULSE_PHASE', 'D')]
+        if args.absphase:
+            columns.append(('ABS_PHASE', 'K'))
+        if args.barytime:
+            columns.append(('BARY_TIME', 'D'))
+        if outname is None:
+            outname = '{0}.{1}.tmp'.format(args.eventfile, uuid.uuid4().hex)
+        writer = _EventStreamWriter(hdulist, outname, columns)
+
+    if args.nproc > 1:
+        pool = multiprocessing.Pool(args.nproc, _init_chunk_worker, initargs)
+        results = pool.imap(_process_chunk, tasks)
+    else:
+        pool = None
+        _worker['model'] = modelin
+        _init_chunk_worker(*initargs)
+        results = (_process_chunk(t) for t in tasks)
+
+    csum = np.zeros(nharm)
+    ssum = np.zeros(nharm)
+    for task, result in zip(tasks, results):
+        phases, absphases, tdbs, aks, bks = result
+        csum += aks
+        ssum += bks
+        log.info('Processed events {0} to {1} of {2}'.format(task[2], task[3],
+                                                             nrows))
+        if writer is not None:
+            writer.write(task[2], {'PULSE_PHASE': phases,
+                                   'ABS_PHASE': absphases,
+                                   'BARY_TIME': tdbs})
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    # H-test from the accumulated trigonometric moments
+    z2 = (2./nrows)*np.cumsum(csum**2 + ssum**2)
+    h = float((z2 - 4*np.arange(0, nharm)).max())
+    print("Htest : {0:.2f} ({1:.2f} sigma)".format(h,h2sig(h)))
+
+    if writer is not None:
+        writer.close()
+        hdulist.close()
+        if args.outfile is None:
+            # Overwrite the existing file
+            log.info('Overwriting existing FITS file '+args.eventfile)
+            os.rename(outname, args.eventfile)
+        else:
+            log.info('Wrote output FITS file '+args.outfile)
+    else:
+        hdulist.close()
 
 def main(argv=None):
     import argparse
@@ -34,6 +251,8 @@ def main(argv=None):
     parser.add_argument("--outfile",help="Output FITS file name (default=same as eventfile)", default=None)
     parser.add_argument("--ephem",help="Planetary ephemeris to use (default=DE421)", default="DE421")
     parser.add_argument("--plot",help="Show phaseogram plot.", action='store_true', default=False)
+    parser.add_argument("--chunksize",help="Process the events in chunks of this many rows, with bounded memory (default is to load all events at once)", type=int, default=None)
+    parser.add_argument("--nproc",help="Number of worker processes for chunks (default=1)", type=int, default=1)
 #    parser.add_argument("--fix",help="Apply 1.0 second offset for NICER", action='store_true', default=False)
     args = parser.parse_args(argv)
 
@@ -45,87 +264,51 @@ def main(argv=None):
     if args.plotfile is not None:
         args.plot = True
 
+    # Read in model
+    modelin = pint.models.get_model(args.parfile)
+    use_planets=False
+    if 'PLANET_SHAPIRO' in modelin.params:
+        if modelin.PLANET_SHAPIRO.value:
+            use_planets=True
+
     # Read event file header to figure out what instrument is is from
     hdr = pyfits.getheader(args.eventfile,ext=1)
 
     log.info('Event file TELESCOPE = {0}, INSTRUMENT = {1}'.format(hdr['TELESCOP'],
         hdr['INSTRUME']))
-    if hdr['TELESCOP'] == 'NICER':
-        # Instantiate NICERObs once so it gets added to the observatory registry
-        if args.orbfile is not None:
-            log.info('Setting up NICER observatory')
-            NICERObs(name='NICER',FPorbname=args.orbfile,tt2tdb_mode='spacecraft')
-        # Read event file and return list of TOA objects
-        try:
-            tl  = load_NICER_TOAs(args.eventfile)
-        except KeyError:
-            log.error("Observatory not recognized.  This probably means you need to provide an orbit file or barycenter the event file.")
-            sys.exit(1)
-    elif hdr['TELESCOP'] == 'XTE':
-        # Instantiate RXTEObs once so it gets added to the observatory registry
-        if args.orbfile is not None:
-            # Determine what observatory type is.
-            log.info('Setting up RXTE observatory')
-            RXTEObs(name='RXTE',FPorbname=args.orbfile,tt2tdb_mode='spacecraft')
-        # Read event file and return list of TOA objects
-        tl  = load_RXTE_TOAs(args.eventfile)
-    elif hdr['TELESCOP'].startswith('XMM'):
-        # Not loading orbit file here, since that is not yet supported.
-        tl  = load_XMM_TOAs(args.eventfile)
-    elif hdr['TELESCOP'].startswith('NuSTAR'):
-        # Not loading orbit file here, since that is not yet supported.
-        tl  = load_NuSTAR_TOAs(args.eventfile)
-    else:
+    mission = _setup_mission(hdr, args.orbfile)
+    if mission is None:
         log.error("FITS file not recognized, TELESCOPE = {0}, INSTRUMENT = {1}".format(
             hdr['TELESCOP'], hdr['INSTRUME']))
         sys.exit(1)
 
-    # Now convert to TOAs object and compute TDBs and posvels
-    if len(tl) == 0:
-        log.error("No TOAs, exiting!")
-        sys.exit(0)
+    if args.chunksize is not None:
+        if args.maxMJD is not None:
+            log.error("--maxMJD cannot be used with --chunksize")
+            sys.exit(1)
+        if args.plot:
+            log.warning("No phaseogram plot with --chunksize")
+        _chunked_photonphase(args, mission, hdr, modelin, use_planets)
+        return
 
-    # Read in model
-    modelin = pint.models.get_model(args.parfile)
-    use_planets=False
-    if 'PLANET_SHAPIRO' in modelin.params:
-        if modelin.PLANET_SHAPIRO.value:
-            use_planets=True
+    # Read event file into a TOAs object, computing TDBs and posvels,
+    # discarding events outside of MJD range
+    maxmjd = np.inf if args.maxMJD is None else float(args.maxMJD)
+    try:
+        ts = get_event_TOAs(args.eventfile, mission, maxmjd=maxmjd,
+                            ephem=args.ephem, include_bipm=False,
+                            include_gps=False, planets=use_planets)
+    except KeyError:
+        log.error("Observatory not recognized.  This probably means you need to provide an orbit file or barycenter the event file.")
+        sys.exit(1)
 
-    # Read TZR parameters from parfile separately
-    tzrmjd = None
-    tzrsite = '@'
-    tzrfrq = np.inf*u.MHz
-    for line in open(args.parfile):
-        if line.startswith('TZRMJD'):
-            tzrmjd = np.longdouble(line.split()[1])
-        if line.startswith('TZRSITE'):
-            tzrsite = line.split()[1]
-        if line.startswith('TZRFRQ'):
-            tzrfrq = np.float(line.split()[1])*u.MHz
+    if ts.ntoas == 0:
+        log.error("No TOAs, exiting!")
+        sys.exit(0)
 
-    if tzrmjd is None:
-        tzrmjd = tl[0].mjd
+    tz = _get_tz_toas(args.parfile, ts.table['mjd'][0], args.ephem,
+                      use_planets)
 
-    tztoa = toa.TOA(tzrmjd,obs=tzrsite,freq=tzrfrq)
-    tz = toa.get_TOAs_list([tztoa],include_bipm=False,include_gps=False,
-        ephem=args.ephem, planets=use_planets)
-
-    # Discard events outside of MJD range
-    if args.maxMJD is not None:
-        tlnew = []
-        print("pre len : ",len(tl))
-        maxT = Time(float(args.maxMJD),format='mjd')
-        print("maxT : ",maxT)
-        for tt in tl:
-            if tt.mjd < maxT:
-                tlnew.append(tt)
-        tl=tlnew
-        print("post len : ",len(tlnew))
-
-    ts = toa.get_TOAs_list(tl, ephem=args.ephem, include_bipm=False,
-        include_gps=False, planets=use_planets)
-    ts.filename = args.eventfile
 #    if args.fix:
 #        ts.adjust_TOAs(TimeDelta(np.ones(len(ts.table))*-1.0*u.s,scale='tt'))
 
@@ -158,7 +341,7 @@ def main(argv=None):
         if args.absphase:
             data_to_add['ABS_PHASE'] = [iphss-negmask*u.cycle,'K']
         if args.barytime:
-            tdbs = np.asarray([t.mjd for t in ts.table['tdb']])
+            tdbs = np.asarray(ts.table['tdbld'], dtype=np.float64)
             data_to_add['BARY_TIME'] = [tdbs,'D']
         for key in data_to_add.keys():
             if key in hdulist[1].columns.names:
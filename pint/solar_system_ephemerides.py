@@ -33,63 +33,199 @@ jpl_obj_code = {'ssb': 0,
                 'neptune': 8,
                 'pluto': 9}
 
+# The chain of (center, target) SPK segments that gives each body relative
+# to the solar system barycenter.
+jpl_obj_chain = {'sun': [(0, 10)],
+                 'mercury': [(0, 1), (1, 199)],
+                 'venus': [(0, 2), (2, 299)],
+                 'earth-moon-barycenter': [(0, 3)],
+                 'earth': [(0, 3), (3, 399)],
+                 'moon': [(0, 3), (3, 301)],
+                 'mars': [(0, 4)],
+                 'jupiter': [(0, 5)],
+                 'saturn': [(0, 6)],
+                 'uranus': [(0, 7)],
+                 'neptune': [(0, 8)],
+                 'pluto': [(0, 9)]}
+
+# Ephemerides that astropy knows how to download by name.
+astropy_kernel_http = 'https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/planets/'
+astropy_ephems = ('de430', 'de432s')
+
+# Process-wide registry of opened SPK kernels, keyed on (ephem, path), where
+# path is the local directory or link the kernel was requested from ('' for
+# the default search).  Each .bsp file is opened (and memory-mapped by
+# jplephem) only once per process.
+_kernel_registry = {}
+
+# A local directory pinned with set_kernel_dir().  If set, kernels that are
+# not given an explicit path are only looked for here, and the network is
+# never accessed.
+_kernel_dir = None
+
+
+def set_kernel_dir(path):
+    """Pin the directory that ephemeris kernels are loaded from.
+
+    After this call, ephemerides requested without an explicit path are
+    read only from '<path>/<ephem>.bsp' and no download is ever attempted.
+    Pass None to go back to the default search (links, then PINT data dir).
+    """
+    global _kernel_dir
+    _kernel_dir = path
+
+
+def clear_kernel_registry():
+    """Close and forget all the kernels opened so far."""
+    for kernel in _kernel_registry.values():
+        try:
+            kernel.close()
+        except Exception:
+            pass
+    _kernel_registry.clear()
+
+
+def _use_kernel(kernel, value):
+    """Make kernel the current astropy solar system ephemeris too, so that
+    astropy routines (and anything else looking at it) see the same one.
+    This is only an attribute assignment, the kernel is not reopened."""
+    kernel.origin = value
+    coor.solar_system_ephemeris._kernel = kernel
+    coor.solar_system_ephemeris._value = value
+
 
 def _load_kernel_link(ephem, link=''):
-    load_kernel = False # a flag for checking if the kernel has been loaded
+    """Find the kernel for ephem online (or in the astropy download cache)
+    and open it.  Returns (kernel, url), or (None, None) if it could not be
+    found."""
     # search_list = [link,jpl_kernel_http, jpl_kernel_ftp]
     # NOTE the JPL ftp site is disabled. Instead, we duplicated the JPL ftp
-    # site on nanograv server. 
+    # site on nanograv server.
     search_list = [link, nanograv_http ,jpl_kernel_http]
     if link != '':
         search_list.append('')
     for l in search_list:
         if l == '':
-            ephem_link = ephem # Astropy default ephem does not like .bsp in the end.
+            # Astropy default ephem location
+            if ephem not in astropy_ephems:
+                continue
+            ephem_link = astropy_kernel_http + "%s.bsp" % ephem
         else:
-            ephem_link = l+"%s.bsp" % ephem
-        if load_kernel:
-            break
+            ephem_link = l.strip() + "%s.bsp" % ephem
         try:
-            log.info('Trying to set astropy ephemeris to {0}'.format(ephem_link))
-            coor.solar_system_ephemeris.set(ephem_link)
-            load_kernel = True
-        except Exception as ex:
-            #log.info('Exception! {0} {1} {2}'.format(type(ex), ex.args, ex))
-            try:
-                log.info('Trying to download and set astropy ephemeris to {0}'.format(ephem_link))
-                aut.data.download_file(ephem_link, timeout=60, cache=True)
-                coor.solar_system_ephemeris.set(ephem_link)
-                load_kernel = True
-            except Exception as ex2:
-                #log.info('Exception2! {0} {1} {2}'.format(type(ex2), ex2.args, ex2))
-                load_kernel = False
-    return load_kernel
-
-
-def _load_kernel_local(ephem, path=''):
-    load_kernel = False # a flag for checking if the kernel has been loaded
+            log.info('Trying to download ephemeris {0}'.format(ephem_link))
+            # This returns the cached copy, if any, without using the network
+            fname = aut.data.download_file(ephem_link, timeout=60, cache=True)
+            return SPK.open(fname), ephem_link
+        except Exception:
+            continue
+    return None, None
+
+
+def _load_kernel_local(ephem, path='', use_datapath=True):
+    """Open the kernel for ephem from a local path, or else (if use_datapath)
+    from the PINT data directory.  Returns (kernel, path), or (None, None)
+    if it could not be found."""
     if path.endswith("%s.bsp" % ephem):
         custom_path = path
     else:
         custom_path = os.path.join(path, "%s.bsp" % ephem)
-    search_list = [custom_path, datapath("%s.bsp" % ephem)]
+    search_list = [custom_path]
+    if use_datapath:
+        search_list.append(datapath("%s.bsp" % ephem))
     for p in search_list:
-        if load_kernel:
-            break
-        try:# Bipass the astropy kernel loading system.
-            coor.solar_system_ephemeris._kernel = SPK.open(p)
-            coor.solar_system_ephemeris._value = p
-            coor.solar_system_ephemeris._kernel.origin = coor.solar_system_ephemeris._value
-            load_kernel = True
-        except:
-            load_kernel = False
-    return load_kernel
+        if p is None or not os.path.isfile(p):
+            continue
+        try:
+            return SPK.open(p), p
+        except Exception:
+            continue
+    return None, None
+
+
+def load_kernel(ephem, path=None, link=None):
+    """Return the jplephem SPK kernel for ephem, opening it at most once.
+
+    Kernels are kept in a process-wide registry keyed by ephemeris name and
+    the path (or link) they were requested from, so repeated calls do not
+    reopen the file or touch the network.
+
+    Parameters
+    ----------
+    ephem: str
+        Ephemeris name, e.g. 'de421'.
+    path: str, optional
+        Local directory (or full file name) of the kernel.  If not given,
+        the directory pinned with set_kernel_dir() is used if any.
+    link: str, optional
+        URL of the directory to download the kernel from.
+
+    Note
+    ----
+    If both path and link are provided. Path will be first to try.
+    """
+    ephem = ephem.lower()
+    pinned = path is None and _kernel_dir is not None
+    if path is None:
+        path = _kernel_dir
+    if path is not None:
+        key = (ephem, path)
+    else:
+        key = (ephem, link if link is not None else '')
+    if key in _kernel_registry:
+        kernel = _kernel_registry[key]
+        _use_kernel(kernel, kernel.origin)
+        return kernel
+
+    if path is None:
+        # Try link first, then local data file.
+        kernel, value = _load_kernel_link(ephem,
+                                          link='' if link is None else link)
+        if kernel is None:
+            kernel, value = _load_kernel_local(ephem, path='')
+        if kernel is None:
+            raise ValueError("Can not load the ephemeris file '%s.bsp'. " % ephem)
+    else:
+        kernel, value = _load_kernel_local(ephem, path=path,
+                                           use_datapath=not pinned)
+        if kernel is None:
+            raise ValueError("Can not load the ephemeris file '%s.bsp' from the"
+                             " local directory %s." % (ephem, path))
+    log.info('Loaded ephemeris {0}'.format(value))
+    _kernel_registry[key] = kernel
+    _use_kernel(kernel, value)
+    return kernel
+
+
+def _get_jd12(t, scale='tdb'):
+    """Return the two-double JD of the Time t in the given scale."""
+    if t.scale != scale:
+        t = getattr(t, scale)
+    return t.jd1, t.jd2
+
+
+def _segment_posvel(kernel, chain, jd1, jd2, cache=None):
+    """Sum the position (km) and velocity (km/day) over a chain of SPK
+    segments.  cache, if given, is a dict used to share segment
+    evaluations between bodies."""
+    pos = 0.0
+    vel = 0.0
+    for pair in chain:
+        if cache is not None and pair in cache:
+            p, v = cache[pair]
+        else:
+            p, v = kernel[pair].compute_and_differentiate(jd1, jd2)
+            if cache is not None:
+                cache[pair] = (p, v)
+        pos = pos + p
+        vel = vel + v
+    return pos, vel
 
 
 def objPosVel_wrt_SSB(objname, t, ephem, path=None, link=None):
     """This function computes a solar system object position and velocity respect
-    to solar system barycenter using astropy coordinates get_body_barycentric()
-    method.
+    to solar system barycenter, by evaluating the Chebyshev segments of the
+    JPL kernel directly.
 
     The coordinate frame is that of the underlying solar system ephemeris, which
     has been the ICRF (J2000) since the DE4XX series.
@@ -97,8 +233,8 @@ def objPosVel_wrt_SSB(objname, t, ephem, path=None, link=None):
     Parameters
     ----------
     objname: str
-        Solar system object name. Current support solar system bodies are listed in
-        astropy.coordinates.solar_system_ephemeris.bodies attribution.
+        Solar system object name. Current support solar system bodies are
+        the keys of jpl_obj_chain.
     t: Astropy.time.Time object
         Observation time in Astropy.time.Time object format.
     ephem: str
@@ -116,30 +252,36 @@ def objPosVel_wrt_SSB(objname, t, ephem, path=None, link=None):
     ----
     If both path and link are provided. Path will be first to try.
     """
-    ephem = ephem.lower()
-    objname = objname.lower()
-    # Use astropy to compute postion.
-    # If a local path is provided, the local search will be considered first.
-    # If the path is not provided, try link first, then local data file.
-    if path is None:
-        if link is None:
-            link_str = ''
-        else:
-            link_str = link
-        is_load = _load_kernel_link(ephem, link=link_str)
-        if not is_load: # Link does not Try to load from data path.
-            path_str = ''
-            is_load = _load_kernel_local(ephem, path=path_str)
-        if not is_load:
-            raise ValueError("Can not load the ephemeris file '%s.bsp'. " % ephem)
-    else:
-        path_str = path
-        is_load = _load_kernel_local(ephem, path=path_str)
-        if not is_load:
-            raise ValueError("Can not load the ephemeris file '%s.bsp' from the"
-                             " local directory %s." % (ephem, path_str))
-    pos, vel = coor.get_body_barycentric_posvel(objname, t)
-    return PosVel(pos.xyz, vel.xyz.to(u.km/u.second), origin='ssb', obj=objname)
+    return objsPosVel_wrt_SSB([objname], t, ephem, path=path,
+                              link=link)[objname.lower()]
+
+
+def objsPosVel_wrt_SSB(objnames, t, ephem, path=None, link=None):
+    """Compute the positions and velocities of several solar system objects
+    with respect to the solar system barycenter in one pass.
+
+    The kernel is looked up once, the TDB two-double JD is computed once and
+    segments shared between bodies (e.g. the Earth-Moon barycenter) are only
+    evaluated once.  See objPosVel_wrt_SSB() for the parameters.
+
+    Returns
+    -------
+    dict of PosVel objects keyed by (lower case) object name
+    """
+    kernel = load_kernel(ephem, path=path, link=link)
+    jd1, jd2 = _get_jd12(t, 'tdb')
+    cache = {}
+    result = {}
+    for objname in objnames:
+        objname = objname.lower()
+        try:
+            chain = jpl_obj_chain[objname]
+        except KeyError:
+            raise ValueError("Unknown solar system object '%s'." % objname)
+        pos, vel = _segment_posvel(kernel, chain, jd1, jd2, cache)
+        result[objname] = PosVel(pos * u.km, vel / SECS_PER_DAY * u.km/u.second,
+                                 origin='ssb', obj=objname)
+    return result
 
 def objPosVel(obj1, obj2, t, ephem):
     """Compute the position and velocity for solar system obj2 referenced at obj1.
@@ -189,27 +331,7 @@ def get_tdb_tt_ephem_geocenter(tt, ephem, path=None, link=None):
        paper:
        https://ipnpr.jpl.nasa.gov/progress_report/42-196/196C.pdf page 6.
     """
-    # Load kernel
-    ephem = ephem.lower()
-
-    if path is None:
-        if link is None:
-            link_str = ''
-        else:
-            link_str = link
-        is_load = _load_kernel_link(ephem, link=link_str)
-        if not is_load: # Link does not Try to load from data path.
-            path_str = ''
-            is_load = _load_kernel_local(ephem, path=path_str)
-        if not is_load:
-            raise ValueError("Can not load the ephemeris file '%s.bsp'. " % ephem)
-    else:
-        path_str = path
-        is_load = _load_kernel_local(ephem, path=path_str)
-        if not is_load:
-            raise ValueError("Can not load the ephemeris file '%s.bsp' from the"
-                             " local directory %s." % (ephem, path_str))
-    kernel = coor.solar_system_ephemeris._kernel
+    kernel = load_kernel(ephem, path=path, link=link)
     try:
         # JPL ID defines this column.
         seg = kernel[1000000000, 1000000001]
@@ -18,7 +18,7 @@ from __future__ import absolute_import, print_function, division
 import numpy as np
 from copy import deepcopy
 import scipy
-from scipy.optimize import fmin,fmin_tnc,leastsq
+from scipy.optimize import fmin,fmin_tnc,leastsq,fminbound
 from pint.eventstats import z2mw,hm,hmw
 
 SECSPERDAY = 86400.
@@ -41,8 +41,84 @@ def weighted_light_curve(nbins,phases,weights,normed=False,phase_shift=0):
     norm = w1.sum()/nbins if normed else 1.
     return bins,w1/norm,errors/norm
 
+def fft_phase_shifts(template,phases,weights=None,segments=None,nbins=512,
+                     refine=True,use_cache=True):
+    """ Measure the phase shift of the template for each of a set of
+        segments of photons (e.g. time intervals for TOA extraction).
+
+        The photons of all segments are binned together, and the binned
+        light curves are cross-correlated with the template through its
+        Fourier coefficients, which scans all nbins phase lags of all
+        segments at once.  The best lag of each segment is then refined
+        within +/- one bin by maximizing the unbinned (weighted)
+        likelihood, whose curvature gives the error.
+
+        The shift delta is such that the photons follow template(phi-delta),
+        i.e. the shift fit_position would apply to the template.
+
+        Arguments:
+        template -- an instance of LCTemplate
+        phases   -- photon phases
+
+        Keyword arguments:
+        weights   [None] optional photon weights
+        segments  [None] integer segment index of each photon (0..nseg-1);
+                         by default all photons form a single segment
+        nbins     [512]  phase bins for the cross-correlation
+        refine    [True] refine with the unbinned likelihood; otherwise
+                         return the best lag and an error of one bin
+        use_cache [True] evaluate the template from its interpolated
+                         cache (see LCTemplate.set_cache) when refining
+
+        Returns:
+        shifts, errors -- arrays with one entry per segment, in [-0.5,0.5);
+                          NaN for segments without photons
+    """
+    phases = np.mod(np.asarray(phases,dtype=float),1)
+    if segments is None:
+        segments = np.zeros(len(phases),dtype=int)
+    segments = np.asarray(segments,dtype=int)
+    nseg = segments.max()+1 if len(segments) > 0 else 0
+    w = None if weights is None else np.asarray(weights,dtype=float)
+
+    # binned light curves of all segments, nseg x nbins
+    ibin = np.minimum((phases*nbins).astype(int),nbins-1)
+    hists = np.bincount(segments*nbins+ibin,weights=w,
+                        minlength=nseg*nbins).reshape(nseg,nbins)
+    # cross-correlation with the template sampled at the bin centers:
+    # cc[m] = sum_j hist[j]*template((j-m+0.5)/nbins)
+    tg = template((np.arange(nbins)+0.5)/nbins)
+    cc = np.fft.irfft(np.fft.rfft(hists,axis=1)*
+                      np.conj(np.fft.rfft(tg))[None,:],n=nbins,axis=1)
+    shifts = np.argmax(cc,axis=1)*(1./nbins)
+    errors = np.ones(nseg)*(1./nbins)
+    empty = hists.sum(axis=1) == 0
+    shifts[empty] = np.nan
+    errors[empty] = np.nan
+
+    if refine:
+        isort = np.argsort(segments,kind='mergesort')
+        bounds = np.searchsorted(segments[isort],np.arange(nseg+1))
+        for iseg in np.flatnonzero(~empty):
+            idx = isort[bounds[iseg]:bounds[iseg+1]]
+            ph = phases[idx]
+            wi = None if w is None else w[idx]
+            def logl(delta):
+                t = template(np.mod(ph-delta,1),use_cache=use_cache)
+                if wi is None:
+                    return -np.log(t).sum()
+                return -np.log(1+wi*(t-1)).sum()
+            d0 = shifts[iseg]
+            d1 = fminbound(logl,d0-1./nbins,d0+1./nbins,xtol=1e-3/nbins)
+            delta = 0.25/nbins
+            d2 = (logl(d1+delta)-2*logl(d1)+logl(d1-delta))/delta**2
+            shifts[iseg] = d1
+            errors[iseg] = d2**-0.5 if d2 > 0 else np.nan
+    shifts = np.mod(shifts+0.5,1)-0.5
+    return shifts,errors
+
 def LCFitter(template,phases,weights=None,log10_ens=None,times=1,
-             binned_bins=100,binned_ebins=8,phase_shift=0):
+             binned_bins=100,binned_ebins=8,phase_shift=0,use_cache=False):
     """ Factory class for light curve fitters.  Based on whether weights
         or energies are supplied in addition to photon phases, the
         appropriate fitter class is returned.
@@ -57,9 +133,11 @@ def LCFitter(template,phases,weights=None,log10_ens=None,times=1,
         binned_bins  [100]  phase bins to use in binned likelihood
         binned_ebins [8]    energy bins to use in binned likelihood
         phase_shift  [0]    set this if a phase shift has been applied
+        use_cache    [False] evaluate the unbinned likelihood with the
+                            interpolated template (see LCTemplate.set_cache)
     """
     kwargs = dict(times=np.asarray(times),binned_bins=binned_bins,
-                  phase_shift=phase_shift)
+                  phase_shift=phase_shift,use_cache=use_cache)
     if weights is None:
         kwargs['weights'] = None
         return UnweightedLCFitter(template,phases,**kwargs)
@@ -71,6 +149,7 @@ class UnweightedLCFitter(object):
     def __init__(self,template,phases,**kwargs):
         self.template = template
         self.phases = np.asarray(phases)
+        self.use_cache = False
         self.__dict__.update(kwargs)
         self._hist_setup()
         # default is unbinned likelihood
@@ -106,7 +185,7 @@ class UnweightedLCFitter(object):
         #if (not t.shift_mode) and np.any(p<0):
         if ((t.norm()>1) or (not params_ok)):
             return 2e20
-        rvals = -np.log(t(self.phases)).sum()
+        rvals = -np.log(t(self.phases,use_cache=self.use_cache)).sum()
         if np.isnan(rvals): return 2e20 # NB need to do better accounting of norm
         return rvals
 
@@ -125,7 +204,9 @@ class UnweightedLCFitter(object):
     def unbinned_gradient(self,p,*args):
         t = self.template
         t.set_parameters(p);
-        return -(t.gradient(self.phases)/t(self.phases)).sum(axis=1)
+        c = self.use_cache
+        return -(t.gradient(self.phases,use_cache=c)/
+                 t(self.phases,use_cache=c)).sum(axis=1)
 
     def binned_gradient(self,p,*args):
         t = self.template
@@ -245,10 +326,22 @@ class UnweightedLCFitter(object):
         print('Improved log likelihood by %.2f'%(self.ll-ll0))
         return True
 
-    def fit_position(self, unbinned=True):
-        """ Fit overall template position.  Return shift and its error."""
-        self._set_unbinned(unbinned)
+    def fit_position(self, unbinned=True, method='scan', nbins=512):
+        """ Fit overall template position.  Return shift and its error.
+
+        With method='fft', find the shift by cross-correlating the binned
+        photons with the template, refined with the unbinned likelihood
+        (see fft_phase_shifts), instead of a scan of the likelihood."""
         ph0 = self.template.get_location()
+        if method == 'fft':
+            shift,err = fft_phase_shifts(self.template,self.phases,
+                    weights=getattr(self,'weights',None),nbins=nbins,
+                    use_cache=self.use_cache)
+            self.template.set_overall_phase((ph0+shift[0])%1)
+            return shift[0],err[0]
+        elif method != 'scan':
+            raise ValueError('Unknown method %s'%method)
+        self._set_unbinned(unbinned)
         def logl(phase):
             self.template.set_overall_phase(phase)
             return self.loglikelihood(self.template.get_parameters())
@@ -575,7 +668,7 @@ class WeightedLCFitter(UnweightedLCFitter):
         if ((t.norm()>1) or (not params_ok)):
         #if (t.norm()>1) or (not t.shift_mode and np.any(p<0)):
             return 2e20
-        return -np.log(1+self.weights*(t(self.phases)-1)).sum()
+        return -np.log(1+self.weights*(t(self.phases,use_cache=self.use_cache)-1)).sum()
         #return -np.log(1+self.weights*(self.template(self.phases,suppress_bg=True)-1)).sum()
 
     def binned_loglikelihood(self,p,*args):
@@ -595,8 +688,9 @@ class WeightedLCFitter(UnweightedLCFitter):
         t.set_parameters(p)
         if t.norm()>1:
             return np.ones_like(p)*2e20
-        numer = self.weights*t.gradient(self.phases)
-        denom = 1+self.weights*(t(self.phases)-1)
+        c = self.use_cache
+        numer = self.weights*t.gradient(self.phases,use_cache=c)
+        denom = 1+self.weights*(t(self.phases,use_cache=c)-1)
         return -(numer/denom).sum(axis=1)
 
     def binned_gradient(self,p,*args):
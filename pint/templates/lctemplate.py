@@ -10,6 +10,7 @@ from __future__ import absolute_import, print_function, division
 
 import numpy as np
 from copy import deepcopy
+from scipy.interpolate import CubicSpline
 from .lcnorm import NormAngles
 from .lcprimitives import *
 from astropy import log
@@ -32,8 +33,10 @@ class LCTemplate(object):
         self.norms = norms if isinstance(norms,NormAngles) else \
                      NormAngles(norms)
         self._sanity_checks()
-        self._cache = None
-        self._cache_out_of_date = True
+        self._cache_ncache = 1000
+        self._cache_interpolation = 'linear'
+        self._cache_ebin = 0.05
+        self._clear_cache()
 
     def _sanity_checks(self):
         if len(self.primitives) != len(self.norms):
@@ -50,7 +53,10 @@ class LCTemplate(object):
     def __len__(self): return len(self.primitives)
     def copy(self):
         prims = [deepcopy(x) for x in self.primitives]
-        return self.__class__(prims,self.norms.copy())
+        t = self.__class__(prims,self.norms.copy())
+        t.set_cache(self._cache_ncache,self._cache_interpolation,
+                    self._cache_ebin)
+        return t
 
     def set_parameters(self,p,free=True):
         start = 0
@@ -60,7 +66,7 @@ class LCTemplate(object):
             params_ok = prim.set_parameters(p[start:start+n],free=free) and params_ok
             start += n
         self.norms.set_parameters(p[start:],free)
-        self._cache_out_of_date = True
+        self._clear_cache()
         return params_ok
 
     def set_errors(self,errs):
@@ -105,7 +111,7 @@ class LCTemplate(object):
 
     def set_overall_phase(self,ph):
         """Put the peak of the first component at phase ph."""
-        self._cache_out_of_date = True
+        self._clear_cache()
         if self.shift_mode:
             self.primitives[0].p[0] = ph
             return
@@ -158,27 +164,107 @@ class LCTemplate(object):
 
     def __call__(self,phases,log10_ens=3,suppress_bg=False,use_cache=False):
         """ Evaluate template at the provided phases and (if provided)
-            energies.  If "suppress_bg" is set, ignore the DC component."""
+            energies.  If "suppress_bg" is set, ignore the DC component.
+            If "use_cache" is set, interpolate the template from a table
+            (see set_cache)."""
         if use_cache:
-            if self._cache_out_of_date:
-                self.set_cache()
-            indices = np.array(phases * len(self._cache),dtype=int)
-            try:
-                return self._cache[indices]
-            except Exception:
-                print('%d phases were NaN!'%(np.sum(np.isnan(phases))))
-                indices[np.isnan(phases)] = 0
-                return self._cache[indices]
+            return self._cached('value',suppress_bg,phases,log10_ens)
         rvals,norms,norm = self._get_scales(phases,log10_ens)
         for n,prim in zip(norms,self.primitives):
             rvals += n*prim(phases,log10_ens)
         if suppress_bg: return rvals/norm
         return (1.-norm) + rvals
 
-    def set_cache(self,ncache=1000):
-        t = self(np.linspace(0,1,ncache+1))
-        self._cache = 0.5*(t[1:]+t[:-1]) 
-        self._cache_out_of_date = False
+    def set_cache(self,ncache=1000,interpolation='linear',ebin=0.05):
+        """ Configure the cache used by __call__ and gradient when called
+            with use_cache=True.
+
+            The template (or its gradient) is tabulated at ncache+1 phases
+            and interpolated, either linearly or with a periodic cubic
+            spline (interpolation='cubic').  Energy-dependent templates
+            get one table per energy bin of width ebin in log10(E/MeV).
+            Tables are computed when first needed, and discarded whenever
+            the template parameters change."""
+        if interpolation not in ('linear','cubic'):
+            raise ValueError('Unknown interpolation %s'%interpolation)
+        self._cache_ncache = int(ncache)
+        self._cache_interpolation = interpolation
+        self._cache_ebin = ebin
+        self._clear_cache()
+
+    def _clear_cache(self):
+        self._cache = dict()
+        self._cache_state = None
+
+    def _check_cache(self):
+        """ Discard the cached tables if any parameter (or free flag) has
+            changed since they were computed, e.g. by setting a primitive
+            parameter directly."""
+        state = np.concatenate([np.asarray(x,dtype=float) for prim in
+            self.primitives for x in (prim.p,prim.free)] +
+            [np.asarray(self.norms.p,dtype=float),
+             np.asarray(self.norms.free,dtype=float)])
+        if ((self._cache_state is None) or
+                (len(state) != len(self._cache_state)) or
+                np.any(state != self._cache_state)):
+            self._cache = dict()
+            self._cache_state = state
+
+    def _cache_table(self,kind,flag,ekey,log10_en):
+        """ Return the piecewise polynomial coefficients (highest power
+            first) of the tabulated template or gradient."""
+        key = (kind,flag,ekey)
+        if key not in self._cache:
+            n = self._cache_ncache
+            x = np.linspace(0,1,n+1)
+            if kind == 'value':
+                t = self(x,log10_en,suppress_bg=flag)
+            else:
+                t = self.gradient(x,log10_en,free=flag).T
+            t = np.array(t,dtype=float)
+            t[-1] = t[0]
+            if self._cache_interpolation == 'cubic':
+                c = CubicSpline(x,t,axis=0,bc_type='periodic').c
+            else:
+                c = np.asarray([(t[1:]-t[:-1])*n,t[:-1]])
+            self._cache[key] = c
+        return self._cache[key]
+
+    def _interpolate(self,c,phases):
+        n = c.shape[1]
+        x = np.mod(phases,1)
+        # NaN phases give NaN values
+        i = np.clip(np.nan_to_num(x*n).astype(int),0,n-1)
+        dx = x - i*(1./n)
+        dx = dx.reshape(dx.shape + (1,)*(c.ndim-2))
+        rvals = c[0][i]
+        for ck in c[1:]:
+            rvals = rvals*dx + ck[i]
+        return rvals
+
+    def _cached(self,kind,flag,phases,log10_ens):
+        """ Interpolate the template or gradient (per phase) from the
+            cache, using the table of the energy bin of each photon."""
+        self._check_cache()
+        phases = np.asarray(phases)
+        if (log10_ens is None) or (not self.is_energy_dependent()):
+            return self._interpolate(
+                self._cache_table(kind,flag,None,3),phases)
+        ebin = self._cache_ebin
+        ekeys = np.round(np.asarray(log10_ens)/ebin).astype(int)
+        if ekeys.ndim == 0:
+            k = int(ekeys)
+            return self._interpolate(
+                self._cache_table(kind,flag,k,k*ebin),phases)
+        rvals = None
+        for k in np.unique(ekeys):
+            m = ekeys == k
+            v = self._interpolate(
+                self._cache_table(kind,flag,k,k*ebin),phases[m])
+            if rvals is None:
+                rvals = np.empty(phases.shape + v.shape[1:])
+            rvals[m] = v
+        return rvals
 
     def single_component(self,index,phases,log10_ens=3):
         """ Evaluate a single component of template."""
@@ -193,7 +279,12 @@ class LCTemplate(object):
             return rvals + n.sum(axis=0)
         return rvals
 
-    def gradient(self,phases,log10_ens=3,free=True):
+    def gradient(self,phases,log10_ens=3,free=True,use_cache=False):
+        """ Return the derivatives of the template with respect to the
+            parameters, with shape (nparams,nphases).  If "use_cache" is
+            set, interpolate them from a table (see set_cache)."""
+        if use_cache:
+            return self._cached('gradient',free,phases,log10_ens).T
         r = np.empty([len(self.get_parameters(free=free)),len(phases)])
         c = 0
         norms = self.norms()
@@ -464,7 +555,7 @@ class LCTemplate(object):
 
     def align_peak(self,phi=0,dphi=0.001):
         """ Adjust such that template peak arrives within dphi of phi."""
-        self._cache_out_of_date = True
+        self._clear_cache()
         nbin = int(1./dphi)+1
         # This shifts the first primitive to peak at phase 0.0
         # Could instead use tallest primitive or some other feature
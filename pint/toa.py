@@ -1,9 +1,10 @@
 from __future__ import absolute_import, print_function, division
-import re, sys, os, numpy, gzip, copy
+import re, sys, os, numpy, gzip, copy, itertools
+import multiprocessing
 from . import utils
 from .observatory import Observatory, get_observatory
-from .observatory.topo_obs import TopoObs
 from . import erfautils
+from . import toa_cache
 import astropy.time as time
 from . import pulsar_mjd
 from astropy.extern.six.moves import cPickle as pickle
@@ -11,10 +12,10 @@ import astropy.table as table
 import astropy.units as u
 from astropy.coordinates import EarthLocation
 try:
-    from astropy.erfa import DAYSEC as SECS_PER_DAY
+    from astropy.erfa import DAYSEC as SECS_PER_DAY, DJM0
 except ImportError:
-    from astropy._erfa import DAYSEC as SECS_PER_DAY
-from .solar_system_ephemerides import objPosVel_wrt_SSB
+    from astropy._erfa import DAYSEC as SECS_PER_DAY, DJM0
+from .solar_system_ephemerides import objsPosVel_wrt_SSB
 from pint import ls, J2000, J2000ld
 from .config import datapath
 from astropy import log
@@ -28,6 +29,9 @@ iers_a_file = None
 iers_a = None
 JD_MJD = 2400000.5
 
+# Source of the table.meta['version'] numbers, see TOAs.table_changed()
+_table_version_counter = itertools.count(1)
+
 def get_TOAs(timfile, ephem="DE421", include_bipm=True, bipm_version='BIPM2015',
              include_gps=True, planets=False, usepickle=False,
              tdb_method="astropy"):
@@ -35,33 +39,39 @@ def get_TOAs(timfile, ephem="DE421", include_bipm=True, bipm_version='BIPM2015',
 
     Loads TOAs from a '.tim' file, applies clock corrections, computes
     key values (like TDB), computes the observatory position and velocity
-    vectors, and pickles the file for later use (if requested).
+    vectors, and caches the result for later use (if requested).
+
+    With usepickle=True, the prepared TOAs are stored in (timfile).pintcache,
+    a columnar binary file (see pint.toa_cache), which is only reused if the
+    tim file, all of its INCLUDEs, the clock files and the options given
+    here are unchanged.
 
     Includes options to specify solar system ephemeris [default DE421],
     gps clock corrections [default=True], and BIPM clock corrections
     [default=True].
     """
-    updatepickle = False
     if usepickle:
-        picklefile = _check_pickle(timfile)
-        if picklefile:
-            timfile = picklefile
-        else:
-            # Pickle either did not exist or is out of date
-            updatepickle = True
+        cachefile = timfile + ".pintcache"
+        key = toa_cache.cache_key(timfile, ephem=ephem.lower(),
+                                  include_bipm=include_bipm,
+                                  bipm_version=bipm_version,
+                                  include_gps=include_gps, planets=planets,
+                                  tdb_method=tdb_method)
+        if toa_cache.check_cache(cachefile, key):
+            return TOAs(cachefile)
     t = TOAs(timfile)
-    if not any(['clkcorr' in f for f in t.table['flags']]):
+    if 'clkcorr' not in t.table.colnames:
         t.apply_clock_corrections(include_gps=include_gps,
                                   include_bipm=include_bipm,
                                   bipm_version=bipm_version)
-    if 'tdb' not in t.table.colnames:
+    if 'tdbld' not in t.table.colnames:
         t.compute_TDBs(method=tdb_method, ephem=ephem)
     if 'ssb_obs_pos' not in t.table.colnames:
         t.compute_posvels(ephem, planets)
-    # Update pickle if needed:
-    if usepickle and updatepickle:
-        log.info("Pickling TOAs.")
-        t.pickle()
+    # Update the cache if needed:
+    if usepickle:
+        log.info("Writing TOA cache {0}.".format(cachefile))
+        t.write_cache(cachefile, key)
     return t
 
 def _check_pickle(toafilename, picklefilename=None):
@@ -109,11 +119,35 @@ def get_TOAs_list(toa_list,ephem="DE421", include_bipm=True,
     [default=True].
     """
     t = TOAs(toalist = toa_list)
-    if not any(['clkcorr' in f for f in t.table['flags']]):
+    if 'clkcorr' not in t.table.colnames:
+        t.apply_clock_corrections(include_gps=include_gps,
+                                  include_bipm=include_bipm,
+                                  bipm_version=bipm_version)
+    if 'tdbld' not in t.table.colnames:
+        t.compute_TDBs(method=tdb_method, ephem=ephem)
+    if 'ssb_obs_pos' not in t.table.colnames:
+        t.compute_posvels(ephem, planets)
+    return t
+
+def get_TOAs_table(toa_table, ephem="DE421", include_bipm=True,
+                   bipm_version='BIPM2015', include_gps=True, planets=False,
+                   tdb_method="astropy", filename=None):
+    """Load TOAs from a TOA table, as made by build_toa_table().
+
+    Compute the TDB time and observatory positions and velocity
+    vectors, on whole columns at a time.
+
+    Includes options to specify solar system ephemeris [default DE421],
+    gps clock corrections [default=True], and BIPM clock corrections
+    [default=True].
+    """
+    t = TOAs(toatable=toa_table)
+    t.filename = filename
+    if 'clkcorr' not in t.table.colnames:
         t.apply_clock_corrections(include_gps=include_gps,
                                   include_bipm=include_bipm,
                                   bipm_version=bipm_version)
-    if 'tdb' not in t.table.colnames:
+    if 'tdbld' not in t.table.colnames:
         t.compute_TDBs(method=tdb_method, ephem=ephem)
     if 'ssb_obs_pos' not in t.table.colnames:
         t.compute_posvels(ephem, planets)
@@ -300,6 +334,202 @@ def format_toa_line(toatime, toaerr, freq, obs, dm=0.0*u.pc/u.cm**3, name='unk',
     return out
 
 
+def build_toa_table(mjd_int, mjd_frac, error, freq, obs, flags,
+                    filename=None, scale=None, columns=None):
+    """Build a TOA table directly from column arrays.
+
+    This produces the same table as TOAs(toalist=[TOA(...), ...]) but
+    without constructing any per-TOA objects: one array-valued Time (and
+    one earth_location_itrf() call) is made per observatory, and the
+    result is then split into the per-row Time column.
+
+    Parameters
+    ----------
+    mjd_int, mjd_frac : array-like
+        Two parts of the TOA MJD whose sum is the full precision MJD,
+        in the native timescale of the observatory.
+    error : array-like or float
+        TOA uncertainties in microseconds.
+    freq : array-like or float
+        Observing frequencies in MHz (zero means infinite frequency).
+    obs : array-like of str, or str
+        Observatory names or aliases.
+    flags : list of dict, or None
+        The flags for each TOA. None gives every TOA an empty dict.
+    filename : str, optional
+        Stored in the table metadata.
+    scale : str, optional
+        Time scale of the MJDs, overriding the observatory timescale (as
+        the scale argument of TOA()).
+    columns : dict, optional
+        Extra per-TOA columns (e.g. photon energies or weights), mapping
+        the column name to an array or Quantity of length Ntoa.
+
+    Returns
+    -------
+    astropy.table.Table grouped by observatory.
+    """
+    mjd_int = numpy.asarray(mjd_int, dtype=numpy.float64)
+    mjd_frac = numpy.asarray(mjd_frac, dtype=numpy.float64)
+    ntoas = len(mjd_int)
+    error = numpy.zeros(ntoas) + numpy.asarray(error, dtype=numpy.float64)
+    freq = numpy.zeros(ntoas) + numpy.asarray(freq, dtype=numpy.float64)
+    freq[freq == 0.0] = numpy.inf
+    if numpy.isscalar(obs):
+        obs = [obs] * ntoas
+    # Resolve aliases to the standard observatory names
+    obs_names = {}
+    for o in set(obs):
+        obs_names[o] = get_observatory(o).name
+    obs = numpy.array([obs_names[o] for o in obs])
+    mjds = numpy.empty(ntoas, dtype=object)
+    mjd_float = numpy.zeros(ntoas, dtype=numpy.float64)
+    jd1 = numpy.zeros(ntoas, dtype=numpy.float64)
+    jd2 = numpy.zeros(ntoas, dtype=numpy.float64)
+    xyz = numpy.full((ntoas, 3), numpy.nan)
+    for name in numpy.unique(obs):
+        idx = numpy.where(obs == name)[0]
+        site = get_observatory(name)
+        tscale = site.timescale if scale is None else scale
+        # Note that when scale is UTC, must use pulsar_mjd format!
+        if tscale.lower() == 'utc':
+            fmt = 'pulsar_mjd'
+        else:
+            fmt = 'mjd'
+        t = time.Time(mjd_int[idx], mjd_frac[idx], scale=tscale,
+                      format=fmt, precision=9)
+        loc = site.earth_location_itrf(time=t)
+        t = time.Time(t, location=loc, precision=9)
+        mjd_float[idx] = t.mjd
+        jd1[idx] = t.jd1
+        jd2[idx] = t.jd2
+        xyz[idx] = location_xyz(loc)
+        for jj, ii in enumerate(idx):
+            mjds[ii] = t[jj]
+    flag_col = numpy.empty(ntoas, dtype=object)
+    if flags is None:
+        for ii in range(ntoas):
+            flag_col[ii] = {}
+    else:
+        for ii, f in enumerate(flags):
+            flag_col[ii] = f
+    cols = [numpy.arange(ntoas), mjds, jd1, jd2, mjd_float * u.day,
+            error * u.us, freq * u.MHz, obs, flag_col, obs_itrf_column(xyz)]
+    names = ["index", "mjd", "mjd_jd1", "mjd_jd2", "mjd_float", "error",
+             "freq", "obs", "flags", "obs_itrf_pos"]
+    if columns is not None:
+        for name in sorted(columns.keys()):
+            cols.append(columns[name])
+            names.append(name)
+    return table.Table(cols, names=names,
+                       meta={'filename':filename}).group_by("obs")
+
+
+def location_xyz(loc):
+    """Return the ITRF coordinates (m) of an EarthLocation as an array of
+    shape loc.shape + (3,), all NaN if loc is None."""
+    if loc is None:
+        return numpy.full(3, numpy.nan)
+    return numpy.stack([c.to(u.m).value for c in loc.geocentric], axis=-1)
+
+
+def xyz_location(xyz):
+    """Return the EarthLocation for an N x 3 array of ITRF coordinates (m),
+    as returned by location_xyz().  A scalar EarthLocation is returned if all
+    the rows are the same, None if they are NaN."""
+    xyz = numpy.atleast_2d(xyz)
+    if numpy.isnan(xyz[0, 0]):
+        return None
+    if numpy.all(xyz == xyz[0]):
+        return EarthLocation.from_geocentric(*xyz[0], unit=u.m)
+    return EarthLocation.from_geocentric(xyz[:, 0], xyz[:, 1], xyz[:, 2],
+                                         unit=u.m)
+
+
+def obs_itrf_column(xyz):
+    """Return the 'obs_itrf_pos' TOA table column, holding the observatory
+    ITRF locations attached to the TOA times as an N x 3 array, so that
+    they do not have to be collected from the Time objects row by row."""
+    return table.Column(name='obs_itrf_pos', data=xyz, unit=u.m,
+                        meta={'origin':'EARTH', 'obj':'OBS', 'frame':'ITRF'})
+
+
+def group_time(tab, name='mjd', loind=0, hiind=None):
+    """Return the times of rows loind:hiind of a TOA table (usually one
+    observatory group) as one array-valued Time.
+
+    The Time is built from the two-double columns '<name>_jd1' and
+    '<name>_jd2' (name is 'mjd' or 'tdb'), without touching the per-row
+    Time objects.  The rows must share the scale, format and precision of
+    their first 'mjd' Time; 'tdb' times are in the TDB scale.  The
+    locations are taken from the 'obs_itrf_pos' column if there is one.
+    """
+    if hiind is None:
+        hiind = len(tab)
+    t0 = tab['mjd'][loind]
+    if 'obs_itrf_pos' in tab.colnames:
+        loc = xyz_location(numpy.asarray(tab['obs_itrf_pos'][loind:hiind]))
+    else:
+        loc = t0.location
+    t = time.Time(numpy.asarray(tab[name + '_jd1'][loind:hiind]),
+                  numpy.asarray(tab[name + '_jd2'][loind:hiind]),
+                  format='jd', scale='tdb' if name == 'tdb' else t0.scale,
+                  location=loc, precision=t0.precision)
+    t.format = t0.format
+    return t
+
+
+def set_group_time(tab, loind, t):
+    """Store the array-valued Time t as the TOA times of rows loind: of a
+    TOA table.
+
+    The 'mjd_jd1' and 'mjd_jd2' columns are written as arrays.  The 'mjd'
+    column of scalar Time objects is kept for the readers of the table, so
+    it is still refreshed with one Time slice per row.
+    """
+    n = len(t)
+    tab['mjd_jd1'][loind:loind + n] = t.jd1
+    tab['mjd_jd2'][loind:loind + n] = t.jd2
+    col = tab['mjd']
+    for jj in range(n):
+        col[loind + jj] = t[jj]
+
+
+def add_jd_columns(tab):
+    """Add the two-double time columns to a TOA table that lacks them
+    (e.g. one from an older pickle file), reading them from its Time
+    objects.  An old 'tdb' column of Time objects is replaced by the
+    'tdb_jd1' and 'tdb_jd2' columns."""
+    for name in ('mjd', 'tdb'):
+        if name not in tab.colnames or name + '_jd1' in tab.colnames:
+            continue
+        col = tab[name]
+        jd1 = numpy.array([t.jd1 for t in col], dtype=numpy.float64)
+        jd2 = numpy.array([t.jd2 for t in col], dtype=numpy.float64)
+        ii = tab.colnames.index(name) + 1
+        tab.add_columns([table.Column(name=name + '_jd1', data=jd1),
+                         table.Column(name=name + '_jd2', data=jd2)],
+                        indexes=[ii, ii])
+        if name == 'tdb':
+            tab.remove_column('tdb')
+
+
+def _compute_TDB_chunk(args):
+    """Compute the TDBs of a chunk of TOAs from one observatory.
+
+    This is the worker function for TOAs.compute_TDBs(nproc > 1); it only
+    takes and returns plain arrays so that it is cheap to send to other
+    processes.  Returns the (jd1, jd2, format) of the TDB times.
+    """
+    obs, jd1, jd2, scale, fmt, xyz, method, ephem = args
+    site = get_observatory(obs)
+    t = time.Time(jd1, jd2, format='jd', scale=scale,
+                  location=xyz_location(xyz), precision=9)
+    t.format = fmt
+    tdb = site.get_TDBs(t, method=method, ephem=ephem)
+    return tdb.jd1, tdb.jd2, tdb.format
+
+
 class TOA(object):
     """A time of arrival (TOA) class.
 
@@ -425,7 +655,7 @@ class TOA(object):
 class TOAs(object):
     """A class of multiple TOAs, loaded from zero or more files."""
 
-    def __init__(self, toafile=None, toalist=None):
+    def __init__(self, toafile=None, toalist=None, toatable=None):
         # First, just make an empty container
         self.toas = []
         self.commands = []
@@ -444,27 +674,44 @@ class TOAs(object):
             if toafile.endswith('.pickle') or toafile.endswith('pickle.gz'):
                 log.info('Reading TOAs from pickle file')
                 self.read_pickle_file(toafile)
+            elif toafile.endswith('.pintcache'):
+                self.read_cache_file(toafile)
             else: # Not a pickle file, process as a standard set of TOA lines
-                self.read_toa_file(toafile)
                 self.filename = toafile
+                self.read_toa_file(toafile)
 
         if toalist is not None:
             if not isinstance(toalist, (list, tuple)):
                 log.error('Trying to initialize TOAs from a non-list class')
             self.toas = toalist
 
+        if toatable is not None:
+            if (toalist is not None) or (toafile is not None):
+                log.error('Cannot initialize TOAs from both a table and a '
+                          'file or list.')
+            self.table = toatable
+
         if not hasattr(self, 'table'):
             mjds = self.get_mjds(high_precision=True)
+            xyz = numpy.array([location_xyz(t.location) for t in mjds])
+            jd1 = numpy.array([t.jd1 for t in mjds], dtype=numpy.float64)
+            jd2 = numpy.array([t.jd2 for t in mjds], dtype=numpy.float64)
             # The table is grouped by observatory
-            self.table = table.Table([numpy.arange(len(mjds)), mjds, self.get_mjds(),
+            self.table = table.Table([numpy.arange(len(mjds)), mjds, jd1, jd2,
+                                      self.get_mjds(),
                                       self.get_errors(), self.get_freqs(),
-                                      self.get_obss(), self.get_flags()],
-                                      names=("index", "mjd", "mjd_float", "error",
-                                             "freq", "obs", "flags"),
+                                      self.get_obss(), self.get_flags(),
+                                      obs_itrf_column(xyz.reshape(-1, 3))],
+                                      names=("index", "mjd", "mjd_jd1", "mjd_jd2",
+                                             "mjd_float", "error",
+                                             "freq", "obs", "flags", "obs_itrf_pos"),
                                       meta={'filename':self.filename}).group_by("obs")
+        else:
+            add_jd_columns(self.table)
 
         # We don't need this now that we have a table
-        del(self.toas)
+        if hasattr(self, 'toas'):
+            del(self.toas)
 
     @property
     def ntoas(self):
@@ -494,6 +741,12 @@ class TOAs(object):
                 # Subtracting zero. Do nothing
                 return self
 
+    def get_group_time(self, loind, hiind, name='mjd'):
+        """Return the TOA times (name='mjd') or TDBs (name='tdb') in rows
+        loind:hiind of the table (usually an observatory group) as one
+        array-valued Time."""
+        return group_time(self.table, name, loind, hiind)
+
     def get_freqs(self):
         """Return a numpy array of the observing frequencies in MHz for the TOAs"""
         if hasattr(self, "toas"):
@@ -575,6 +828,44 @@ class TOAs(object):
         else:
             log.warn("TOA pickle method needs a filename.")
 
+    def write_cache(self, filename=None, key=None):
+        """Write the TOAs to a columnar cache file (see pint.toa_cache).
+
+        The default filename is (self.filename).pintcache.  The hashes of
+        the clock files used for the clock corrections are stored with the
+        TOAs so that the cache can be invalidated when they change.
+        """
+        if filename is None:
+            if self.filename is None:
+                log.warn("TOA write_cache method needs a filename.")
+                return
+            filename = self.filename + ".pintcache"
+        deps = {}
+        if self.clock_corr_info:
+            for obs in set(self.table['obs']):
+                site = get_observatory(obs, **self.clock_corr_info)
+                for f in site.clock_files():
+                    deps[f] = toa_cache.file_hash(f)
+        info = {'filename': self.filename,
+                'commands': self.commands,
+                'ephem': self.ephem,
+                'planets': self.planets,
+                'clock_corr_info': self.clock_corr_info}
+        toa_cache.write_cache(filename, self.table, key, deps=deps, info=info)
+
+    def read_cache_file(self, filename):
+        """Read the TOAs from a columnar cache file written by write_cache()."""
+        log.info("Reading TOAs from cache file '%s'..." % filename)
+        tab, info = toa_cache.read_cache(filename)
+        if tab is None:
+            raise ValueError("'%s' is not a valid TOA cache file." % filename)
+        self.table = tab
+        self.filename = info['filename']
+        self.commands = [(c, n) for c, n in info['commands']]
+        self.ephem = info['ephem']
+        self.planets = info['planets']
+        self.clock_corr_info = info['clock_corr_info']
+
     def get_summary(self):
         """Return a short ASCII summary of the TOAs."""
         s = "Number of TOAs:  %d\n" % self.ntoas
@@ -614,15 +905,32 @@ class TOAs(object):
             raise ValueError('Type of argument must be TimeDelta')
         if delta.shape != col.shape:
             raise ValueError('Shape of mjd column and delta must be compatible')
-        for ii in range(len(col)):
-            col[ii] = col[ii] + delta[ii]
+        # Add the deltas one observatory group at a time, as a single
+        # array-valued Time operation.
+        mjd_float = numpy.zeros(self.ntoas)
+        for ii in range(len(self.table.groups.keys)):
+            loind, hiind = self.table.groups.indices[ii:ii+2]
+            grpmjds = self.get_group_time(loind, hiind) + delta[loind:hiind]
+            set_group_time(self.table, loind, grpmjds)
+            mjd_float[loind:hiind] = grpmjds.mjd
 
         # This adjustment invalidates the derived columns in the table, so delete
         # and recompute them
-        self.table['mjd_float'] = self.get_mjds(high_precision=False)
+        self.table['mjd_float'] = mjd_float * u.day
+        self.table_changed()
         self.compute_TDBs()
         self.compute_posvels(self.ephem, self.planets)
 
+    def table_changed(self):
+        """Give the TOA table a new table.meta['version'] number.
+
+        The timing model component cache (see TimingModel.enable_cache)
+        keeps results for a table only as long as this number is unchanged.
+        The TOAs methods that modify the table in place call this; call it
+        after changing the table columns by hand.
+        """
+        self.table.meta['version'] = next(_table_version_counter)
+
     def write_TOA_file(self,filename,name='pint', format='Princeton'):
         """Dump current TOA table out as a TOA file
 
@@ -650,11 +958,15 @@ class TOAs(object):
         # NOTE(@paulray): This really should REMOVE any(?) clock corrections
         # that have been applied!
         # NOTE clock corrections has been removed.
-        for toatime,toaerr,freq,obs,flags in zip(self.table['mjd'],self.table['error'].quantity,
-            self.table['freq'].quantity,self.table['obs'],self.table['flags']):
+        if 'clkcorr' in self.table.colnames:
+            clkcorrs = self.table['clkcorr'].quantity
+        else:
+            clkcorrs = numpy.zeros(self.ntoas) * u.s
+        for toatime,toaerr,freq,obs,flags,clkcorr in zip(self.table['mjd'],self.table['error'].quantity,
+            self.table['freq'].quantity,self.table['obs'],self.table['flags'],clkcorrs):
             obs_obj = Observatory.get(obs)
-            if 'clkcorr' in flags.keys():
-                toatime_out = toatime - time.TimeDelta(flags['clkcorr'])
+            if clkcorr != 0.0 * u.s:
+                toatime_out = toatime - time.TimeDelta(clkcorr)
             else:
                 toatime_out = toatime
             out_str = format_toa_line(toatime_out, toaerr, freq, obs_obj, name=name,
@@ -670,8 +982,10 @@ class TOAs(object):
 
         Apply clock corrections to all the TOAs where corrections are
         available.  This routine actually changes the value of the TOA,
-        although the correction is also listed as a new flag for the TOA
-        called 'clkcorr' so that it can be reversed if necessary.  This
+        although the correction is also stored in a new column of the table
+        called 'clkcorr' (in seconds) so that it can be reversed if
+        necessary.  The corrections are computed and added one observatory
+        group at a time, using array-valued Times.  This
         routine also applies all 'TIME' commands and treats them exactly
         as if they were a part of the observatory clock corrections.
 
@@ -683,93 +997,105 @@ class TOAs(object):
 
         """
         # First make sure that we haven't already applied clock corrections
-        flags = self.table['flags']
-        if any(['clkcorr' in f for f in flags]):
-            log.warn("Some TOAs have 'clkcorr' flag.  Not applying new clock corrections.")
+        if 'clkcorr' in self.table.colnames:
+            log.warn("TOAs have a 'clkcorr' column.  Not applying new clock corrections.")
             return
         # An array of all the time corrections, one for each TOA
         log.info("Applying clock corrections (include_GPS = {0}, include_BIPM = {1}.".format(include_gps,include_bipm))
-        corr = numpy.zeros(self.ntoas) * u.s
-        times = self.table['mjd']
+        # TIME commands are in sec
+        corr = numpy.array([f.get('to', 0.0) for f in self.table['flags']],
+                           dtype=numpy.float64)
         for ii, key in enumerate(self.table.groups.keys):
-            grp = self.table.groups[ii]
             obs = self.table.groups.keys[ii]['obs']
             site = get_observatory(obs, include_gps=include_gps,
                                    include_bipm=include_bipm,
                                    bipm_version=bipm_version)
             loind, hiind = self.table.groups.indices[ii:ii+2]
+            grpmjds = self.get_group_time(loind, hiind)
             # First apply any TIME statements
-            for jj in range(loind, hiind):
-                if 'to' in flags[jj]:
-                    # TIME commands are in sec
-                    # SUGGESTION(@paulray): These time correction units should
-                    # be applied in the parser, not here. In the table the time
-                    # correction should have units.
-                    corr[jj] = flags[jj]['to'] * u.s
-                    times[jj] += time.TimeDelta(corr[jj])
-
-            gcorr = site.clock_corrections(time.Time(grp['mjd']))
-            for jj, cc in enumerate(gcorr):
-                grp['mjd'][jj] += time.TimeDelta(cc)
-            corr[loind:hiind] += gcorr
-            # Now update the flags with the clock correction used
-            for jj in range(loind, hiind):
-                if corr[jj]:
-                    flags[jj]['clkcorr'] = corr[jj]
+            if numpy.any(corr[loind:hiind]):
+                grpmjds = grpmjds + time.TimeDelta(corr[loind:hiind] * u.s)
+            gcorr = site.clock_corrections(grpmjds)
+            grpmjds = grpmjds + time.TimeDelta(gcorr)
+            set_group_time(self.table, loind, grpmjds)
+            corr[loind:hiind] += gcorr.to(u.s).value
+        # Keep the clock correction used so that it can be reversed
+        self.table.add_column(table.Column(name='clkcorr', data=corr,
+                                           unit=u.s))
+        self.table_changed()
         # Updat clock correction info
         self.clock_corr_info.update({'include_bipm':include_bipm,
                                      'bipm_version':bipm_version,
                                      'include_gps':include_gps})
 
-    def compute_TDBs(self, method="astropy", ephem=None):
+    def compute_TDBs(self, method="astropy", ephem=None, nproc=1,
+                     chunk_size=100000):
         """Compute and add TDB and TDB long double columns to the TOA table.
-        This routine creates new columns 'tdb' and 'tdbld' in a TOA table
-        for TDB times, using the Observatory locations and IERS A Earth
-        rotation corrections for UT1.
+        This routine creates new columns 'tdb_jd1', 'tdb_jd2' (the TDB
+        times as two doubles) and 'tdbld' in a TOA table, using the
+        Observatory locations and IERS A Earth rotation corrections for UT1.
+
+        The TDBs are computed in a single vectorized pass per observatory,
+        with the locations taken from the 'obs_itrf_pos' column.  With
+        nproc > 1, observatory groups larger than chunk_size TOAs are split
+        into chunks that are computed by a pool of nproc worker processes
+        (method must then be one of the named methods, not a callable).
         """
         log.info('Computing TDB columns.')
-        if 'tdb' in self.table.colnames:
-            log.info('tdb column already exists. Deleting...')
-            self.table.remove_column('tdb')
-        if 'tdbld' in self.table.colnames:
-            log.info('tdbld column already exists. Deleting...')
-            self.table.remove_column('tdbld')
+        for c in ('tdb_jd1', 'tdb_jd2', 'tdbld'):
+            if c in self.table.colnames:
+                log.info('{0} column already exists. Deleting...'.format(c))
+                self.table.remove_column(c)
 
         # Compute in observatory groups
-        tdbs = numpy.zeros_like(self.table['mjd'])
+        tdb_jd1 = numpy.empty(self.ntoas, dtype=numpy.float64)
+        tdb_jd2 = numpy.empty(self.ntoas, dtype=numpy.float64)
+        tdblds = numpy.empty(self.ntoas, dtype=numpy.longdouble)
+        groups = []
         for ii, key in enumerate(self.table.groups.keys):
-            grp = self.table.groups[ii]
             obs = self.table.groups.keys[ii]['obs']
             loind, hiind = self.table.groups.indices[ii:ii+2]
-            site = get_observatory(obs)
-            if isinstance(site,TopoObs):
-                # For TopoObs, it is safe to assume that all TOAs have same location
-                # I think we should report to astropy that initializing
-                # a Time from a list (or Column) of Times throws away the location information
-                grpmjds = time.Time(grp['mjd'], location=grp['mjd'][0].location)
-            else:
-                # Grab locations for each TOA
-                # It is crazy that I have to deconstruct the locations like
-                # this to build a single EarthLocation object with an array
-                # of locations contained in it.
-                # Is there a more efficient way to convert a list of EarthLocations
-                # into a single EarthLocation object with an array of values internally?
-                loclist = [t.location for t in grp['mjd']]
-                if loclist[0] is None:
-                    grpmjds = time.Time(grp['mjd'],location=None)
-                else:
-                    locs = EarthLocation(numpy.array([l.x.value for l in loclist])*u.m,
-                                         numpy.array([l.y.value for l in loclist])*u.m,
-                                         numpy.array([l.z.value for l in loclist])*u.m)
-                    grpmjds = time.Time(grp['mjd'],location=locs)
-            grptdbs = site.get_TDBs(grpmjds, method=method, ephem=ephem)
-            tdbs[loind:hiind] = numpy.asarray([t for t in grptdbs])
+            groups.append((obs, loind, self.get_group_time(loind, hiind)))
+
+        if nproc > 1 and any(len(t) > chunk_size for o, l, t in groups):
+            # Shard the groups in chunks and compute them in parallel
+            jobs = []
+            for obs, loind, grpmjds in groups:
+                for lo in range(0, len(grpmjds), chunk_size):
+                    t = grpmjds[lo:lo+chunk_size]
+                    jobs.append((obs, t.jd1, t.jd2, t.scale, t.format,
+                                 location_xyz(t.location), method, ephem))
+            pool = multiprocessing.Pool(nproc)
+            try:
+                results = pool.map(_compute_TDB_chunk, jobs)
+            finally:
+                pool.close()
+                pool.join()
+            ichunk = 0
+            for obs, loind, grpmjds in groups:
+                nchunks = -(-len(grpmjds) // chunk_size)
+                chunks = results[ichunk:ichunk+nchunks]
+                ichunk += nchunks
+                jd1 = numpy.concatenate([c[0] for c in chunks])
+                jd2 = numpy.concatenate([c[1] for c in chunks])
+                tdb_jd1[loind:loind+len(jd1)] = jd1
+                tdb_jd2[loind:loind+len(jd1)] = jd2
+                tdblds[loind:loind+len(jd1)] = (numpy.longdouble(jd1 - DJM0)
+                                                + numpy.longdouble(jd2))
+        else:
+            for obs, loind, grpmjds in groups:
+                site = get_observatory(obs)
+                grptdbs = site.get_TDBs(grpmjds, method=method, ephem=ephem)
+                tdb_jd1[loind:loind+len(grptdbs)] = grptdbs.jd1
+                tdb_jd2[loind:loind+len(grptdbs)] = grptdbs.jd2
+                tdblds[loind:loind+len(grptdbs)] = \
+                    utils.time_to_longdouble(grptdbs)
 
         # Now add the new columns to the table
-        col_tdb = table.Column(name='tdb', data=tdbs)
-        col_tdbld = table.Column(name='tdbld',
-                data=[utils.time_to_longdouble(t) for t in tdbs])
-        self.table.add_columns([col_tdb, col_tdbld])
+        self.table.add_columns([table.Column(name='tdb_jd1', data=tdb_jd1),
+                                table.Column(name='tdb_jd2', data=tdb_jd2),
+                                table.Column(name='tdbld', data=tdblds)])
+        self.table_changed()
 
     def compute_posvels(self, ephem="DE421", planets=False):
         """Compute positions and velocities of the observatories and Earth.
@@ -815,28 +1141,32 @@ class TOAs(object):
 
         # Now step through in observatory groups
         for ii, key in enumerate(self.table.groups.keys):
-            grp = self.table.groups[ii]
             obs = self.table.groups.keys[ii]['obs']
             loind, hiind = self.table.groups.indices[ii:ii+2]
             site = get_observatory(obs)
-            tdb = time.Time(grp['tdb'],precision=9)
+            tdb = self.get_group_time(loind, hiind, 'tdb')
             ssb_obs = site.posvel(tdb,ephem)
             log.debug("SSB obs pos {0}".format(ssb_obs.pos[:,0]))
             ssb_obs_pos[loind:hiind,:] = ssb_obs.pos.T.to(u.km)
             ssb_obs_vel[loind:hiind,:] = ssb_obs.vel.T.to(u.km/u.s)
-            sun_obs = objPosVel_wrt_SSB('sun',tdb,ephem) - ssb_obs
+            # All the bodies are evaluated from the kernel in one pass
+            bodies = ['sun']
+            if planets:
+                bodies += ['jupiter', 'saturn', 'venus', 'uranus']
+            ssb_bodies = objsPosVel_wrt_SSB(bodies, tdb, ephem)
+            sun_obs = ssb_bodies['sun'] - ssb_obs
             obs_sun_pos[loind:hiind,:] = sun_obs.pos.T.to(u.km)
             if planets:
                 for p in ('jupiter', 'saturn', 'venus', 'uranus'):
                     name = 'obs_'+p+'_pos'
-                    dest = p
-                    pv = objPosVel_wrt_SSB(dest,tdb,ephem) - ssb_obs
+                    pv = ssb_bodies[p] - ssb_obs
                     plan_poss[name][loind:hiind,:] = pv.pos.T.to(u.km)
         cols_to_add = [ssb_obs_pos, ssb_obs_vel, obs_sun_pos]
         if planets:
             cols_to_add += plan_poss.values()
         log.info('Adding columns ' + ' '.join([cc.name for cc in cols_to_add]))
         self.table.add_columns(cols_to_add)
+        self.table_changed()
         #update ephemeris info
         self.ephem = ephem
         self.planets = planets
@@ -857,16 +1187,21 @@ class TOAs(object):
             self.toas = tmp.toas
         if hasattr(tmp, 'table'):
             self.table = tmp.table.group_by("obs")
+            add_jd_columns(self.table)
         self.commands = tmp.commands
 
     def read_toa_file(self, filename, process_includes=True, top=True):
-        """Read the given filename and return a list of TOA objects.
+        """Read the given filename and build the TOA table.
 
         Will process INCLUDEd files unless process_includes is False.
+
+        Lines are tokenized into per-column lists (no per-line TOA objects
+        are created); at the top level these are converted to NumPy arrays
+        and the TOA table is built with one array-valued Time per
+        observatory (see build_toa_table()).
         """
         ntoas = 0
         if top:
-            self.toas = []
             self.commands = []
             self.cdict = {"EFAC": 1.0, "EQUAD": 0.0*u.us,
                           "EMIN": 0.0*u.us, "EMAX": numpy.inf*u.us,
@@ -876,6 +1211,9 @@ class TOAs(object):
                           "PHA1": None, "PHA2": None,
                           "MODE": 1, "JUMP": [False, 0],
                           "FORMAT": "Unknown", "END": False}
+            self._toacols = dict((k, []) for k in ("mjd_int", "mjd_frac",
+                                 "error", "freq", "obs", "flags"))
+        cols = self._toacols
         with open(filename, "r") as f:
             for l in f.readlines():
                 MJD, d = parse_TOA_line(l, fmt=self.cdict["FORMAT"])
@@ -928,31 +1266,41 @@ class TOAs(object):
                     d["format"] in ("Blank", "Unknown", "Comment", "Command")):
                     continue
                 elif self.cdict["END"]:
-                    if top:
-                        # Clean up our temporaries used when reading TOAs
-                        del self.cdict
-                    return
+                    break
                 else:
-                    newtoa = TOA(MJD, **d)
-                    if ((self.cdict["EMIN"] > newtoa.error) or
-                        (self.cdict["EMAX"] < newtoa.error) or
-                        (self.cdict["FMIN"] > newtoa.freq) or
-                        (self.cdict["FMAX"] < newtoa.freq)):
+                    # The same filtering and error scaling as applied by
+                    # the TOA() constructor, but on plain numbers.
+                    error = d.pop("error", 0.0)
+                    freq = d.pop("freq", float("inf"))
+                    if freq == 0.0:
+                        freq = numpy.inf
+                    if ((self.cdict["EMIN"].to(u.us).value > error) or
+                        (self.cdict["EMAX"].to(u.us).value < error) or
+                        (self.cdict["FMIN"].to(u.MHz).value > freq) or
+                        (self.cdict["FMAX"].to(u.MHz).value < freq)):
                         continue
-                    else:
-                        newtoa.error *= self.cdict["EFAC"]
-                        newtoa.error = numpy.hypot(newtoa.error,
-                                                   self.cdict["EQUAD"])
-                        if self.cdict["INFO"]:
-                            newtoa.flags["info"] = self.cdict["INFO"]
-                        if self.cdict["JUMP"][0]:
-                            newtoa.flags["jump"] = self.cdict["JUMP"][1]
-                        if self.cdict["PHASE"] != 0:
-                            newtoa.flags["phase"] = self.cdict["PHASE"]
-                        if self.cdict["TIME"] != 0.0:
-                            newtoa.flags["to"] = self.cdict["TIME"]
-                        self.toas.append(newtoa)
-                        ntoas += 1
-            if top:
-                # Clean up our temporaries used when reading TOAs
-                del self.cdict
+                    error = numpy.hypot(error * self.cdict["EFAC"],
+                                        self.cdict["EQUAD"].to(u.us).value)
+                    if self.cdict["INFO"]:
+                        d["info"] = self.cdict["INFO"]
+                    if self.cdict["JUMP"][0]:
+                        d["jump"] = self.cdict["JUMP"][1]
+                    if self.cdict["PHASE"] != 0:
+                        d["phase"] = self.cdict["PHASE"]
+                    if self.cdict["TIME"] != 0.0:
+                        d["to"] = self.cdict["TIME"]
+                    cols["mjd_int"].append(MJD[0])
+                    cols["mjd_frac"].append(MJD[1])
+                    cols["error"].append(error)
+                    cols["freq"].append(freq)
+                    cols["obs"].append(d.pop("obs", "Barycenter"))
+                    cols["flags"].append(d)
+                    ntoas += 1
+        if top:
+            self.table = build_toa_table(cols["mjd_int"], cols["mjd_frac"],
+                                         cols["error"], cols["freq"],
+                                         cols["obs"], cols["flags"],
+                                         filename=filename)
+            # Clean up our temporaries used when reading TOAs
+            del self.cdict
+            del self._toacols
@@ -0,0 +1,367 @@
+"""Columnar binary cache of prepared TOA tables.
+
+The cache replaces the gzip pickles of the whole TOAs object.  Every column
+of the TOA table is stored as a contiguous array in a single file that can
+be memory-mapped:
+
+- the 'mjd' column of Time objects as two doubles (jd1, jd2), plus the
+  observatory locations as an N x 3 array,
+- 'tdbld' as two doubles whose (long double) sum is the value,
+- numerical columns (posvels, errors, ...) as they are,
+- 'obs' and 'flags' dictionary-encoded: integer codes per row and the table
+  of distinct values in the file header.
+
+The file starts with a magic string, the format version and a JSON header
+describing the arrays.  The header also holds a key (see cache_key()) built
+from the contents of the tim file and all its INCLUDEs and from the options
+used to prepare the TOAs, and the hashes of all the other files (e.g. clock
+files) the TOAs depend on, so a cache is never reused if any of these have
+changed.
+"""
+from __future__ import absolute_import, print_function, division
+import os
+import json
+import struct
+import hashlib
+import numpy
+import astropy.units as u
+import astropy.table as table
+import astropy.time as time
+from astropy import log
+
+CACHE_MAGIC = b'PINTTOAC'
+CACHE_VERSION = 3
+# Alignment (bytes) of the arrays in the file
+_ALIGN = 64
+# Columns that hold scalar Time objects
+time_columns = ('mjd', 'tdb')
+
+
+def file_hash(filename):
+    """Return the SHA1 hex digest of the contents of filename, or '' if
+    the file does not exist."""
+    if filename is None or not os.path.isfile(filename):
+        return ''
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def tim_file_includes(timfile):
+    """Return the list of timfile and all the files it INCLUDEs, recursively,
+    in reading order.  As in TOAs.read_toa_file(), INCLUDE paths are relative
+    to the current directory."""
+    files = [timfile]
+    if not os.path.isfile(timfile):
+        return files
+    with open(timfile, 'r') as f:
+        for l in f:
+            if l.startswith('INCLUDE'):
+                fields = l.split()
+                if len(fields) > 1:
+                    files.extend(tim_file_includes(fields[1]))
+    return files
+
+
+def cache_key(timfile, **options):
+    """Return the cache key for a tim file prepared with the given options
+    (e.g. ephem, bipm_version, include_gps, ...).  This is a hash of the
+    contents of the tim file and all of its INCLUDEs, of the options and of
+    the cache format version."""
+    h = hashlib.sha1()
+    h.update(('version %d\n' % CACHE_VERSION).encode())
+    for f in tim_file_includes(timfile):
+        h.update(('%s %s\n' % (f, file_hash(f))).encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _encode_value(v):
+    """Convert a flag value to something JSON can store without loss."""
+    if isinstance(v, u.Quantity):
+        return {'value': float(v.value), 'unit': v.unit.to_string()}
+    if isinstance(v, numpy.generic):
+        return v.item()
+    return v
+
+
+def _decode_value(v):
+    if isinstance(v, dict):
+        return v['value'] * u.Unit(v['unit'])
+    return v
+
+
+def _encode_flags(flags):
+    """Dictionary-encode a column of flag dicts.  Returns (keys, values,
+    codes) where codes[i] is an int32 array giving, for each row, the index
+    of the value of keys[i] in values[i] (-1 if the row has no such flag)."""
+    keys = []
+    lookup = {}
+    values = {}
+    codes = {}
+    n = len(flags)
+    for ii, f in enumerate(flags):
+        for k, v in f.items():
+            if k not in lookup:
+                keys.append(k)
+                lookup[k] = {}
+                values[k] = []
+                codes[k] = numpy.full(n, -1, dtype=numpy.int32)
+            ev = _encode_value(v)
+            s = json.dumps(ev)
+            c = lookup[k].get(s)
+            if c is None:
+                c = len(values[k])
+                lookup[k][s] = c
+                values[k].append(ev)
+            codes[k][ii] = c
+    return keys, [values[k] for k in keys], [codes[k] for k in keys]
+
+
+def _decode_flags(keys, values, codes, n):
+    values = [[_decode_value(v) for v in vals] for vals in values]
+    flags = [dict() for ii in range(n)]
+    for k, vals, cc in zip(keys, values, codes):
+        for ii in numpy.where(cc >= 0)[0]:
+            flags[ii][k] = vals[cc[ii]]
+    col = numpy.empty(n, dtype=object)
+    for ii, f in enumerate(flags):
+        col[ii] = f
+    return col
+
+
+def _ld_split(x):
+    """Split a long double array into two doubles whose sum is x."""
+    hi = numpy.asarray(x, dtype=numpy.float64)
+    lo = numpy.asarray(x - numpy.longdouble(hi), dtype=numpy.float64)
+    return hi, lo
+
+
+def _time_column_arrays(toa_table, name, groups):
+    """Return jd1, jd2 arrays and the per-observatory (scale, format) of a
+    column of scalar Time objects.  The two-double '<name>_jd1' and
+    '<name>_jd2' columns are used if the table has them."""
+    col = toa_table[name]
+    if name + '_jd1' in toa_table.colnames:
+        jd1 = numpy.asarray(toa_table[name + '_jd1'], dtype=numpy.float64)
+        jd2 = numpy.asarray(toa_table[name + '_jd2'], dtype=numpy.float64)
+    else:
+        n = len(col)
+        jd1 = numpy.empty(n, dtype=numpy.float64)
+        jd2 = numpy.empty(n, dtype=numpy.float64)
+        for ii, t in enumerate(col):
+            jd1[ii] = t.jd1
+            jd2[ii] = t.jd2
+    info = {}
+    for name, idx in groups.items():
+        t = col[idx[0]]
+        info[name] = (t.scale, t.format)
+    return jd1, jd2, info
+
+
+def _locations(col):
+    """Return the locations of a column of scalar Times as an N x 3 array
+    of ITRF coordinates in meters (NaN where there is no location)."""
+    xyz = numpy.full((len(col), 3), numpy.nan)
+    for ii, t in enumerate(col):
+        if t.location is not None:
+            xyz[ii] = [c.to(u.m).value for c in t.location.geocentric]
+    return xyz
+
+
+def write_cache(filename, toa_table, key, deps=None, info=None):
+    """Write a TOA table to a columnar cache file.
+
+    Parameters
+    ----------
+    filename : str
+        The cache file name.
+    toa_table : astropy.table.Table
+        The TOA table (as in TOAs.table).
+    key : str
+        Cache key, see cache_key().
+    deps : dict, optional
+        Full paths of other files that the table depends on (e.g. clock
+        files), mapped to their hashes.
+    info : dict, optional
+        Other JSON-able information to keep with the table (e.g. the TOA
+        commands, ephemeris, clock correction info).
+    """
+    obs = numpy.asarray(toa_table['obs'])
+    obs_names = sorted(set(obs))
+    obs_codes = numpy.searchsorted(obs_names, obs).astype(numpy.int32)
+    groups = dict((name, numpy.where(obs == name)[0]) for name in obs_names)
+
+    arrays = []
+    columns = []
+    for name in toa_table.colnames:
+        col = toa_table[name]
+        cinfo = {'name': name}
+        if name in time_columns:
+            jd1, jd2, tinfo = _time_column_arrays(toa_table, name, groups)
+            cinfo['kind'] = 'time'
+            cinfo['scales'] = tinfo
+            arrays += [(name + '.jd1', jd1), (name + '.jd2', jd2)]
+            if name == 'mjd':
+                if 'obs_itrf_pos' in toa_table.colnames:
+                    xyz = numpy.asarray(toa_table['obs_itrf_pos'],
+                                        dtype=numpy.float64)
+                else:
+                    xyz = _locations(col)
+                arrays.append(('location', xyz))
+        elif name == 'tdbld':
+            hi, lo = _ld_split(numpy.asarray(col, dtype=numpy.longdouble))
+            cinfo['kind'] = 'longdouble'
+            arrays += [(name + '.hi', hi), (name + '.lo', lo)]
+        elif name == 'obs':
+            cinfo['kind'] = 'dict'
+            cinfo['values'] = obs_names
+            arrays.append((name, obs_codes))
+        elif name == 'flags':
+            keys, values, codes = _encode_flags(col)
+            cinfo['kind'] = 'flags'
+            cinfo['keys'] = keys
+            cinfo['values'] = values
+            arrays += [('flags.%d' % ii, c) for ii, c in enumerate(codes)]
+        else:
+            cinfo['kind'] = 'array'
+            cinfo['unit'] = None if col.unit is None else col.unit.to_string()
+            cinfo['meta'] = dict(col.meta)
+            arrays.append((name, numpy.ascontiguousarray(col)))
+        columns.append(cinfo)
+
+    # Lay out the arrays after the header
+    layout = {}
+    offset = 0
+    for name, a in arrays:
+        layout[name] = {'dtype': a.dtype.str, 'shape': list(a.shape),
+                        'offset': offset}
+        offset += -(-a.nbytes // _ALIGN) * _ALIGN
+    header = {'key': key, 'deps': deps or {}, 'info': info or {},
+              'meta': dict(toa_table.meta), 'nrows': len(toa_table),
+              'columns': columns, 'arrays': layout}
+    hbytes = json.dumps(header).encode()
+    start = -(-(len(CACHE_MAGIC) + 12 + len(hbytes)) // _ALIGN) * _ALIGN
+    with open(filename, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(struct.pack('<IQ', CACHE_VERSION, len(hbytes)))
+        f.write(hbytes)
+        for name, a in arrays:
+            f.seek(start + layout[name]['offset'])
+            f.write(a.tobytes())
+        # Make sure the file covers the last (padded) array
+        f.truncate(start + offset)
+    return filename
+
+
+def read_cache_header(filename):
+    """Return (header, data offset) of a cache file, or (None, None) if it
+    is not a cache file of the current version."""
+    try:
+        with open(filename, 'rb') as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None, None
+            version, hlen = struct.unpack('<IQ', f.read(12))
+            if version != CACHE_VERSION:
+                return None, None
+            header = json.loads(f.read(hlen).decode())
+    except (IOError, OSError, ValueError, struct.error):
+        return None, None
+    start = -(-(len(CACHE_MAGIC) + 12 + hlen) // _ALIGN) * _ALIGN
+    return header, start
+
+
+def check_cache(filename, key):
+    """Return True if filename is a cache of the current version with the
+    given key, whose dependencies have not changed."""
+    header, start = read_cache_header(filename)
+    if header is None:
+        return False
+    if header['key'] != key:
+        log.info('TOA cache {0} is out of date.'.format(filename))
+        return False
+    for dep, h in header['deps'].items():
+        if file_hash(dep) != h:
+            log.info('TOA cache {0} is out of date ({1} has changed).'.format(
+                filename, dep))
+            return False
+    return True
+
+
+def read_cache(filename):
+    """Read a TOA table from a cache file.
+
+    The numerical columns are copy-on-write memory maps of the file.
+
+    Returns
+    -------
+    (astropy.table.Table grouped by observatory, info dict), or (None, None)
+    if filename is not a readable cache file.
+    """
+    header, start = read_cache_header(filename)
+    if header is None:
+        return None, None
+    n = header['nrows']
+
+    def get(name):
+        a = header['arrays'][name]
+        if n == 0 or 0 in a['shape']:
+            return numpy.zeros(a['shape'], dtype=a['dtype'])
+        return numpy.memmap(filename, dtype=numpy.dtype(a['dtype']),
+                            mode='c', offset=start + a['offset'],
+                            shape=tuple(a['shape']))
+
+    obs = None
+    for cinfo in header['columns']:
+        if cinfo['name'] == 'obs':
+            obs = numpy.array(cinfo['values'])[get('obs')]
+    groups = dict((name, numpy.where(obs == name)[0]) for name in set(obs))
+    xyz = get('location')
+    cols = []
+    for cinfo in header['columns']:
+        name = cinfo['name']
+        kind = cinfo['kind']
+        if kind == 'time':
+            data = _times_from_arrays(get(name + '.jd1'), get(name + '.jd2'),
+                                      xyz, groups, cinfo['scales'])
+            cols.append(table.Column(name=name, data=data))
+        elif kind == 'longdouble':
+            data = (numpy.asarray(get(name + '.hi'), dtype=numpy.longdouble)
+                    + numpy.asarray(get(name + '.lo'), dtype=numpy.longdouble))
+            cols.append(table.Column(name=name, data=data))
+        elif kind == 'dict':
+            cols.append(table.Column(name=name, data=obs))
+        elif kind == 'flags':
+            codes = [get('flags.%d' % ii) for ii in range(len(cinfo['keys']))]
+            data = _decode_flags(cinfo['keys'], cinfo['values'], codes, n)
+            cols.append(table.Column(name=name, data=data))
+        else:
+            cols.append(table.Column(name=name, data=get(name),
+                                     unit=cinfo['unit'], meta=cinfo['meta']))
+    t = table.Table(cols, meta=header['meta']).group_by('obs')
+    return t, header['info']
+
+
+def _times_from_arrays(jd1, jd2, xyz, groups, scales):
+    """Rebuild a column of scalar Times, with one array-valued Time per
+    observatory."""
+    from astropy.coordinates import EarthLocation
+    data = numpy.empty(len(jd1), dtype=object)
+    for name, idx in groups.items():
+        scale, fmt = scales[name]
+        loc = xyz[idx]
+        if numpy.isnan(loc[0, 0]):
+            loc = None
+        elif numpy.all(loc == loc[0]):
+            loc = EarthLocation.from_geocentric(*loc[0], unit=u.m)
+        else:
+            loc = EarthLocation.from_geocentric(loc[:, 0], loc[:, 1],
+                                                loc[:, 2], unit=u.m)
+        t = time.Time(numpy.asarray(jd1[idx]), numpy.asarray(jd2[idx]),
+                      format='jd', scale=scale, location=loc, precision=9)
+        t.format = fmt
+        for jj, ii in enumerate(idx):
+            data[ii] = t[jj]
+    return data
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, print_function, division
 import numpy as np
 import copy
+import threading
 
 
 class TOASelect(object):
@@ -30,6 +31,16 @@ class TOASelect(object):
         self.hash_dict = {}
         self.columns_info = {}
         self.select_result = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def check_condition(self, new_cond):
         """
@@ -114,6 +125,11 @@ class TOASelect(object):
         return result
 
     def get_select_index(self, condition, column):
+        # The cache is shared, so the design matrix threads take turns.
+        with self._lock:
+            return self._get_select_index(condition, column)
+
+    def _get_select_index(self, condition, column):
         # Check if condition get changed
         cd_unchg, cd_chg = self.check_condition(condition)
         # check if column get changed.
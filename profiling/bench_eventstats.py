@@ -0,0 +1,63 @@
+""" Benchmark the harmonic sums behind the Z^2_m and H tests.
+
+Compares pint.eventstats.hmw, which generates the harmonics by recurrence
+over chunks of photons, with the two direct evaluations it replaced: the
+outer-product form (an m x N temporary) and the loop over harmonics (one
+cos and one sin evaluation of N phases per harmonic).
+
+usage: python bench_eventstats.py [-n 10000 100000 1000000] [-m 20]
+"""
+from __future__ import print_function, division
+import argparse
+import timeit
+import numpy as np
+from pint.eventstats import hmw, z2mw
+
+TWOPI = 2 * np.pi
+
+
+def z2mw_outer(phases, weights, m=20):
+    x = np.outer(np.arange(1, m + 1), phases * TWOPI)
+    s = np.dot(np.cos(x), weights)**2 + np.dot(np.sin(x), weights)**2
+    return np.cumsum(s) * (2. / (weights**2).sum())
+
+
+def z2mw_loop(phases, weights, m=20):
+    x = phases * TWOPI
+    s = (np.asarray([(np.cos(k * x) * weights).sum()
+                     for k in range(1, m + 1)]))**2 + \
+        (np.asarray([(np.sin(k * x) * weights).sum()
+                     for k in range(1, m + 1)]))**2
+    return np.cumsum(s) * (2. / (weights**2).sum())
+
+
+def hmw_ref(z2mw_func, phases, weights, m=20, c=4):
+    return (z2mw_func(phases, weights, m) - c * np.arange(0, m)).max()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("-n", help="Numbers of photons", type=int,
+                        nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument("-m", help="Number of harmonics", type=int,
+                        default=20)
+    parser.add_argument("--repeat", help="Timing repeats", type=int,
+                        default=3)
+    args = parser.parse_args()
+
+    rs = np.random.RandomState(0)
+    print("%10s %12s %12s %12s %10s" %
+          ("N", "recurrence", "outer", "loop", "max diff"))
+    for n in args.n:
+        phases = np.mod(rs.normal(0.3, 0.05, n), 1)
+        weights = rs.uniform(size=n)
+        times = []
+        for func in (lambda: hmw(phases, weights, m=args.m),
+                     lambda: hmw_ref(z2mw_outer, phases, weights, args.m),
+                     lambda: hmw_ref(z2mw_loop, phases, weights, args.m)):
+            times.append(min(timeit.repeat(func, number=1,
+                                           repeat=args.repeat)))
+        diff = np.abs(z2mw(phases, weights, args.m) -
+                      z2mw_loop(phases, weights, args.m)).max()
+        print("%10d %11.4fs %11.4fs %11.4fs %10.2g" %
+              tuple([n] + times + [diff]))
@@ -24,3 +24,11 @@ class TestTDBMethod(unittest.TestCase):
         diff = (t_astropy.table['tdbld']-t_ephem.table['tdbld'])*86400.0
         assert np.all(np.abs(diff) < 5e-9), "Test TDB method, 'astropy' vs " \
                                             "'ephemeris' failed."
+
+    def test_parallel(self):
+        t = toa.get_TOAs(self.tim, ephem='DE436t')
+        tdbld = t.table['tdbld'].copy()
+        t.compute_TDBs(nproc=2, chunk_size=1000)
+        diff = (t.table['tdbld'] - tdbld) * 86400.0
+        assert np.all(np.abs(diff) < 1e-11), "Parallel TDB computation " \
+                                             "differs from serial one."
@@ -0,0 +1,69 @@
+"""Test the Chebyshev time-frequency phase predictors."""
+from pint.models.cheby_predictor import ChebyPredictor
+from pint.models.polycos import Polycos
+from pint.models import model_builder as mb
+import pint.toa as toa
+import numpy as np
+import os, tempfile, unittest
+from pinttestdata import testdir, datadir
+os.chdir(datadir)
+
+
+class TestChebyPredictor(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.model = mb.get_model('B1855+09_polycos.par')
+        self.pred = ChebyPredictor()
+        self.pred.generate_predictor(self.model, 55000.0, 55000.2, 'ao', 60,
+                                     1100.0, 1700.0, ncoeffTime=12,
+                                     ncoeffFreq=4)
+        rs = np.random.RandomState(7)
+        self.mjds = rs.uniform(55000.0, 55000.2, 20)
+        self.freqs = rs.uniform(1100.0, 1700.0, 20)
+
+    def test_phase(self):
+        tt = toa.build_toa_table(np.floor(self.mjds),
+                                 self.mjds - np.floor(self.mjds), 0.0,
+                                 self.freqs, 'ao', None)
+        toas = toa.get_TOAs_table(tt)
+        ph = self.model.phase(toas.table)
+        order = np.argsort(toas.table['index'])
+        frac = ph.frac.value[order]
+        pred = self.pred.eval_phase(self.mjds, self.freqs)
+        diff = np.mod(np.asarray(pred, dtype=float) - frac + 0.5, 1) - 0.5
+        assert np.all(np.abs(diff) < 1e-6)
+
+    def test_polycos(self):
+        plc = Polycos()
+        plc.generate_polycos(self.model, 55000.0, 55000.2, 'ao', 60, 12,
+                             1400.0)
+        ph = self.pred.eval_abs_phase(self.mjds, 1400.0)
+        plc_ph = plc.eval_abs_phase(self.mjds)
+        diff = (ph.int - plc_ph.int).value + (ph.frac - plc_ph.frac).value
+        assert np.all(np.abs(diff) < 1e-6)
+        f = self.pred.eval_spin_freq(self.mjds, 1400.0)
+        assert np.allclose(f, plc.eval_spin_freq(self.mjds).astype(float),
+                           rtol=1e-12)
+
+    def test_file(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.pred.write_predictor_file(filename)
+            pred = ChebyPredictor()
+            pred.read_predictor_file(filename)
+        finally:
+            os.remove(filename)
+        ph = self.pred.eval_abs_phase(self.mjds, self.freqs)
+        ph2 = pred.eval_abs_phase(self.mjds, self.freqs)
+        assert np.all(ph.int == ph2.int)
+        assert np.all(np.abs((ph.frac - ph2.frac).value) < 1e-12)
+
+    def test_out_of_range(self):
+        with self.assertRaises(ValueError):
+            self.pred.eval_abs_phase(self.mjds, 1800.0)
+        with self.assertRaises(ValueError):
+            self.pred.eval_abs_phase(55000.3, 1400.0)
+
+if __name__ == '__main__':
+    unittest.main()
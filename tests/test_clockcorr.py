@@ -1,7 +1,10 @@
-from pint.observatory import Observatory
-from pint.observatory.clock_file import ClockFile
+from pint.observatory import Observatory, get_observatory
+from pint.observatory.clock_file import ClockFile, ClockChain
+from pint.config import set_cache_dir
+from astropy.time import Time
 import astropy.units as u
 import numpy
+import os, shutil, tempfile
 import unittest
 
 class TestClockcorrection(unittest.TestCase):
@@ -22,3 +25,63 @@ class TestClockcorrection(unittest.TestCase):
 
         idx = numpy.where(numpy.isclose(mjd,55418.27))[0][0]
         assert numpy.isclose(corr[idx],-0.586)
+
+
+class TestClockChain(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        set_cache_dir(self.tmpdir)
+
+    def tearDown(self):
+        set_cache_dir(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_merge(self):
+        obs = get_observatory('gbt', include_gps=True, include_bipm=True)
+        clocks, offset = obs._load_clocks()
+        mjd = numpy.linspace(52000.0, 57000.0, 20001)
+        t = Time(mjd, format='mjd', scale='utc')
+        corr = sum(c.evaluate(t).to(u.us).value for c in clocks) + offset
+        assert numpy.allclose(obs.clock_corrections(t).to(u.us).value, corr,
+                              rtol=0, atol=1e-6)
+
+    def test_steps(self):
+        files = []
+        for ii, lines in enumerate([["50000 0", "50010 1e-6", "50010 3e-6",
+                                     "50020 2e-6"],
+                                    ["49995 0", "50005 2e-6", "50030 0"]]):
+            files.append(os.path.join(self.tmpdir, 'clk%d.clk' % ii))
+            with open(files[-1], 'w') as f:
+                f.write("# UTC(A) UTC\n" + "\n".join(lines) + "\n")
+        clocks = [ClockFile.read(f, format='tempo2') for f in files]
+        chain = ClockChain.merge(clocks)
+        mjd = numpy.array([49990.0, 50005.0, 50010.0 - 1e-9, 50010.0,
+                           50010.0 + 1e-9, 50015.0, 50025.0, 50040.0])
+        t = Time(mjd, format='mjd', scale='utc')
+        corr = sum(c.evaluate(t, limits=None).to(u.us).value for c in clocks)
+        assert numpy.allclose(chain.evaluate(mjd, limits=None).value, corr,
+                              rtol=0, atol=1e-9)
+        with self.assertRaises(RuntimeError):
+            chain.evaluate(mjd, limits='error')
+
+    def test_cache(self):
+        obs = get_observatory('gbt', include_gps=True, include_bipm=False)
+        chain = obs.clock_chain()
+        filename = os.path.join(self.tmpdir, 'gbt.clkc')
+        chain.write(filename, 'key')
+        chain2 = ClockChain.read(filename, 'key')
+        assert numpy.all(chain2.mjd == chain.mjd)
+        assert numpy.all(chain2.clock == chain.clock)
+        assert chain2.ranges == chain.ranges
+        assert ClockChain.read(filename, 'other key') is None
+
+    def test_cache_file(self):
+        obs = get_observatory('gbt', include_gps=True, include_bipm=False)
+        obs._clock_chains = {}
+        chain = obs.clock_chain()
+        assert os.listdir(self.tmpdir) == ['clock_gbt_gps.clkc']
+        obs._clock_chains = {}
+        chain2 = obs.clock_chain()
+        assert chain2 is not chain
+        assert numpy.all(chain2.clock == chain.clock)
+
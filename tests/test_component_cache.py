@@ -0,0 +1,66 @@
+"""Test the per-component delay and phase cache."""
+import pint.models.model_builder as mb
+import pint.toa as toa
+import numpy as np
+import astropy.units as u
+from astropy.time import TimeDelta
+import copy
+import os, unittest
+
+from pinttestdata import testdir, datadir
+
+os.chdir(datadir)
+
+class TestComponentCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.m = mb.get_model('B1855+09_NANOGrav_dfg+12_DMX.par')
+        self.t = toa.get_TOAs('B1855+09_NANOGrav_dfg+12.tim', ephem='DE405')
+
+    def setUp(self):
+        self.cm = copy.deepcopy(self.m)
+        self.cm.enable_cache()
+        self.cm.phase(self.t.table)
+
+    def cached(self, name):
+        return self.cm._component_cache[name][2]
+
+    def check_phase(self, table=None):
+        if table is None:
+            table = self.t.table
+        ref = copy.deepcopy(self.cm)
+        ref.disable_cache()
+        p1 = self.cm.phase(table)
+        p2 = ref.phase(table)
+        assert np.all(p1.int == p2.int)
+        assert np.allclose(p1.frac, p2.frac, rtol=0, atol=1e-12)
+
+    def test_phase_param(self):
+        before = dict((cp.__class__.__name__,
+                       self.cached(cp.__class__.__name__))
+                      for cp in self.cm.DelayComponent_list)
+        self.cm.F0.value = self.cm.F0.value * (1 + 1e-12)
+        self.check_phase()
+        for name, d in before.items():
+            assert self.cached(name) is d, name
+
+    def test_delay_param(self):
+        astrometry = self.cached('AstrometryEquatorial')
+        dispersion = self.cached('DispersionDMX')
+        self.cm.DMX_0001.value = self.cm.DMX_0001.value + 1e-3
+        self.check_phase()
+        assert self.cached('AstrometryEquatorial') is astrometry
+        assert self.cached('DispersionDMX') is not dispersion
+
+    def test_new_table(self):
+        table = self.t.table[:100].group_by('obs')
+        d = self.cm.delay(table)
+        ref = copy.deepcopy(self.cm)
+        ref.disable_cache()
+        assert np.all(d == ref.delay(table))
+
+    def test_adjust_toas(self):
+        t = copy.deepcopy(self.t)
+        self.cm.phase(t.table)
+        t.adjust_TOAs(TimeDelta(np.ones(t.ntoas) * 0.01 * u.s))
+        self.check_phase(t.table)
@@ -0,0 +1,64 @@
+"""Test the design matrix assembly options."""
+import pint.models.model_builder as mb
+import pint.toa as toa
+import numpy as np
+import scipy.sparse as sps
+import os, unittest
+
+from pinttestdata import testdir, datadir
+
+os.chdir(datadir)
+
+class TestDesignMatrix(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.par = 'B1855+09_NANOGrav_9yv1.gls.par'
+        self.tim = 'B1855+09_NANOGrav_9yv1.tim'
+        self.m = mb.get_model(self.par)
+        self.t = toa.get_TOAs(self.tim, ephem='DE421', planets=False,
+                              include_bipm=False)
+        self.M, self.params, self.units, _ = \
+            self.m.designmatrix(self.t.table)
+
+    def test_columns(self):
+        delay = self.m.delay(self.t.table)
+        F0 = self.m.F0.value
+        assert self.params[0] == 'Offset'
+        assert np.all(self.M[:, 0] == 1.0)
+        for p in ['F0', 'RAJ', 'A1', 'PB', 'DMX_0001', 'JUMP1']:
+            if p not in self.params:
+                continue
+            ii = self.params.index(p)
+            q = -self.m.d_phase_d_param(self.t.table, delay, p).value / F0
+            assert np.allclose(self.M[:, ii], q, rtol=1e-12, atol=0), p
+
+    def test_accumulated_delays(self):
+        delay, acc_delays = self.m.accumulated_delays(self.t.table)
+        assert np.all(delay == self.m.delay(self.t.table))
+        for cp in self.m.DelayComponent_list:
+            name = cp.__class__.__name__
+            ref = self.m.delay(self.t.table, name, False)
+            assert np.allclose(acc_delays[name].value, ref.value,
+                               rtol=0, atol=1e-15), name
+
+    def test_threads_and_chunks(self):
+        for nproc, chunk_size in [(4, None), (1, 1000), (3, 777)]:
+            M, params, units, _ = self.m.designmatrix(self.t.table,
+                                                      nproc=nproc,
+                                                      chunk_size=chunk_size)
+            assert params == self.params
+            assert units == self.units
+            assert np.allclose(M, self.M, rtol=1e-12, atol=0), \
+                (nproc, chunk_size)
+
+    def test_sparse(self):
+        sparse_params = self.m.sparse_deriv_params(self.params)
+        assert 'DMX_0001' in sparse_params
+        assert 'F0' not in sparse_params
+        M, params, units, _ = self.m.designmatrix(self.t.table, sparse=True,
+                                                  chunk_size=1000)
+        assert sps.issparse(M)
+        assert params == self.params
+        assert np.allclose(M.toarray(), self.M, rtol=1e-12, atol=0)
+        ii = params.index('DMX_0001')
+        assert M[:, ii].nnz == np.count_nonzero(self.M[:, ii])
@@ -0,0 +1,36 @@
+"""Test the observatory GCRS positions from pint.erfautils."""
+import unittest
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from pint import erfautils
+from pint.observatory import Observatory
+
+
+class TestGCRSPosVel(unittest.TestCase):
+    def setUp(self):
+        self.loc = Observatory.get('gbt').earth_location_itrf()
+        rs = np.random.RandomState(9)
+        self.t = Time(np.sort(rs.uniform(54000, 54010, 500)), format='mjd',
+                      scale='utc')
+
+    def test_grid(self):
+        exact = erfautils.gcrs_posvel_from_itrf(self.loc, self.t)
+        grid = erfautils.TerrestrialRotation()
+        pv = erfautils.gcrs_posvel_from_itrf(self.loc, self.t, grid=grid)
+        assert np.abs((pv.pos - exact.pos).to(u.m).value).max() < 0.01
+        assert np.abs((pv.vel - exact.vel).to(u.m/u.s).value).max() < 1e-6
+        # A second call over the same span reuses the grid nodes
+        nnodes = len(grid._nodes)
+        erfautils.gcrs_posvel_from_itrf(self.loc, self.t[::2], grid=grid)
+        assert len(grid._nodes) == nnodes
+
+    def test_scalar(self):
+        pv = erfautils.gcrs_posvel_from_itrf(self.loc, self.t)
+        pv1 = erfautils.gcrs_posvel_from_itrf(self.loc, self.t[7])
+        assert pv1.pos.shape == (3, 1)
+        assert np.allclose(pv1.pos[:, 0].to(u.m).value,
+                           pv.pos[:, 7].to(u.m).value, rtol=0, atol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+from __future__ import division, print_function
+import os
+import unittest
+import numpy as np
+import pint.toa as toa
+from pint.event_toas import load_RXTE_TOAs, get_RXTE_TOAs
+from pint.observatory.rxte_obs import RXTEObs
+from pinttestdata import testdir, datadir
+
+eventfile = os.path.join(datadir, 'B1509_RXTE_short.fits')
+orbfile = os.path.join(datadir, 'FPorbit_Day6223')
+
+class TestEventTOAs(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        RXTEObs(name='RXTE', FPorbname=orbfile, tt2tdb_mode='spacecraft')
+
+    def test_direct_table(self):
+        tl = load_RXTE_TOAs(eventfile)
+        ts = get_RXTE_TOAs(eventfile, planets=False)
+        tsl = toa.TOAs(toalist=tl)
+        assert ts.ntoas == len(tl)
+        assert np.all(ts.table['obs'] == tsl.table['obs'])
+        assert np.allclose(ts.get_mjds().value, tsl.get_mjds().value,
+                           rtol=0, atol=1e-11)
+        assert ts.table['pha'].dtype.kind == 'u'
+        assert np.all(ts.table['pha'] == [f['pha'] for f in tsl.table['flags']])
+        assert 'tdbld' in ts.table.colnames
+        assert 'ssb_obs_pos' in ts.table.colnames
+
+    def test_mjd_range(self):
+        ts = get_RXTE_TOAs(eventfile, weights=np.arange(25828.0))
+        mjds = ts.get_mjds().value
+        mid = np.median(mjds)
+        tsr = get_RXTE_TOAs(eventfile, weights=np.arange(25828.0),
+                            maxmjd=mid)
+        assert tsr.ntoas == np.sum(mjds < mid)
+        assert np.all(tsr.get_mjds().value < mid)
+        assert np.all(ts.table['weight'] == ts.table['index'])
+
+if __name__ == '__main__':
+    unittest.main()
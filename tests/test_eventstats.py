@@ -0,0 +1,44 @@
+"""Test the pulsation statistics in pint.eventstats."""
+import unittest
+import numpy as np
+from pint.eventstats import harmonic_sums, z2m, z2mw, hm, hmw, em_four
+
+class TestHarmonicSums(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(11)
+        self.phases = np.mod(rs.normal(0.3, 0.05, 3000), 1)
+        self.weights = rs.uniform(size=3000)
+        x = np.outer(np.arange(1, 21), self.phases * 2 * np.pi)
+        self.c, self.s = np.cos(x), np.sin(x)
+
+    def test_sums(self):
+        c, s = harmonic_sums(self.phases, 20, weights=self.weights,
+                             chunksize=1000)
+        assert np.allclose(c, np.dot(self.c, self.weights), rtol=0,
+                           atol=1e-9)
+        assert np.allclose(s, np.dot(self.s, self.weights), rtol=0,
+                           atol=1e-9)
+        # Phases are reduced modulo 1
+        c2, s2 = harmonic_sums(self.phases + 1e6, 20, weights=self.weights)
+        assert np.allclose(c2, c, rtol=0, atol=1e-6)
+
+    def test_statistics(self):
+        n = len(self.phases)
+        z = (2. / n) * np.cumsum(self.c.sum(axis=1)**2 +
+                                 self.s.sum(axis=1)**2)
+        assert np.allclose(z2m(self.phases, m=20), z)
+        assert np.isclose(hm(self.phases), (z - 4 * np.arange(20)).max())
+        w = self.weights
+        zw = np.cumsum(np.dot(self.c, w)**2 + np.dot(self.s, w)**2) * \
+            (2. / (w**2).sum())
+        assert np.allclose(z2mw(self.phases, w, m=20), zw)
+        assert np.isclose(hmw(self.phases, w), (zw - 4 * np.arange(20)).max())
+        aks, bks = em_four(self.phases, m=3, weights=w)
+        assert np.allclose(aks, np.dot(self.c[:3], w) / w.sum())
+
+    def test_bad_weights(self):
+        with self.assertRaises(ValueError):
+            harmonic_sums(self.phases, 2, weights=self.weights[:10])
+
+if __name__ == '__main__':
+    unittest.main()
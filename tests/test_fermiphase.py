@@ -8,9 +8,10 @@ except ImportError:
 import unittest
 import numpy as np
 import astropy.units as u
+from astropy.coordinates import SkyCoord
 import pint.scripts.fermiphase as fermiphase
 from pint.observatory.fermi_obs import FermiObs
-from pint.fermi_toas import load_Fermi_TOAs
+from pint.fermi_toas import load_Fermi_TOAs, get_Fermi_TOAs
 import pint.toa as toa
 import pint.models
 from pinttestdata import testdir, datadir
@@ -50,6 +51,31 @@ class TestFermiPhase(unittest.TestCase):
         phases = np.where(phss < 0.0 * u.cycle, phss + 1.0 * u.cycle, phss)
 
 
+    def test_direct_table(self):
+        tl = load_Fermi_TOAs(eventfile, weightcolumn='CALC',
+                             targetcoord=self.targetcoord(), maxmjd=55000)
+        ts = get_Fermi_TOAs(eventfile, weightcolumn='CALC',
+                            targetcoord=self.targetcoord(), maxmjd=55000)
+        tsl = toa.get_TOAs_list(tl, include_gps=False, include_bipm=False)
+        assert ts.ntoas == len(tl)
+        assert np.all(ts.table['obs'] == tsl.table['obs'])
+        assert np.allclose(ts.get_mjds().value, tsl.get_mjds().value,
+                           rtol=0, atol=1e-11)
+        # The TOA objects round the sum of the FITS MJD tuples to a double
+        # (~0.2 us), while the table keeps it exactly
+        assert np.all(np.abs(ts.table['tdbld'] - tsl.table['tdbld'])
+                      * 86400.0 < 1e-6)
+        energies = [f['energy'].value for f in tsl.table['flags']]
+        weights = [f['weight'] for f in tsl.table['flags']]
+        assert np.all(ts.table['energy'] == energies)
+        assert np.allclose(ts.table['weight'], weights)
+        assert ts.table['flags'][0] == {}
+
+    def targetcoord(self):
+        modelin = pint.models.get_model(parfile)
+        return SkyCoord(modelin.RAJ.quantity, modelin.DECJ.quantity,
+                        frame='icrs')
+
 
 if __name__ == '__main__':
     unittest.main()
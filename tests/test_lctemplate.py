@@ -0,0 +1,78 @@
+"""Test the interpolated light curve template cache."""
+import unittest
+import numpy as np
+from pint.templates.lctemplate import get_gauss2
+from pint.templates.lcfitters import LCFitter, fft_phase_shifts
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.t = get_gauss2()
+        self.x = np.random.RandomState(4).uniform(size=10000)
+
+    def check(self, rtol):
+        exact = self.t(self.x)
+        cached = self.t(self.x, use_cache=True)
+        assert np.abs(cached - exact).max() < rtol * exact.max()
+
+    def test_interpolation(self):
+        self.check(2e-3)
+        self.t.set_cache(1000, interpolation='cubic')
+        self.check(1e-5)
+        assert np.isclose(self.t(1.3, use_cache=True), self.t(0.3))
+
+    def test_invalidation(self):
+        self.t.set_cache(2000, interpolation='cubic')
+        self.check(1e-5)
+        p = self.t.get_parameters()
+        p[1] += 0.05
+        self.t.set_parameters(p)
+        self.check(1e-5)
+        self.t.set_overall_phase(0.7)
+        self.check(1e-5)
+        # Direct changes to a primitive are detected too
+        self.t.primitives[1].p[0] *= 1.5
+        self.check(1e-5)
+
+    def test_bad_interpolation(self):
+        with self.assertRaises(ValueError):
+            self.t.set_cache(interpolation='nearest')
+
+
+class TestFFTPhaseShifts(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(8)
+        self.t = get_gauss2(pulse_frac=0.5)
+        self.true = np.random.uniform(-0.3, 0.3, 200)
+        self.phases = np.concatenate(
+            [np.mod(self.t.random(300) + d, 1) for d in self.true])
+        self.segments = np.repeat(np.arange(200), 300)
+
+    def test_segments(self):
+        s, e = fft_phase_shifts(self.t, self.phases, segments=self.segments)
+        pulls = (s - self.true) / e
+        assert np.all(np.abs(pulls) < 5)
+        assert 0.7 < np.std(pulls) < 1.3
+        w = np.ones_like(self.phases)
+        sw, ew = fft_phase_shifts(self.t, self.phases, weights=w,
+                                  segments=self.segments)
+        assert np.allclose(sw, s, rtol=0, atol=1e-5)
+        s, e = fft_phase_shifts(self.t, self.phases, segments=self.segments,
+                                refine=False)
+        assert np.all(np.abs(s - self.true) < 0.02)
+
+    def test_empty_segment(self):
+        segments = self.segments.copy()
+        segments[segments == 3] = 4
+        s, e = fft_phase_shifts(self.t, self.phases, segments=segments)
+        assert np.isnan(s[3]) and np.isnan(e[3])
+        assert np.all(np.isfinite(s[4:]))
+
+    def test_fit_position(self):
+        phases = self.phases[:300]
+        ph0 = self.t.get_location()
+        shift, err = LCFitter(self.t, phases).fit_position(method='fft')
+        assert abs(shift - self.true[0]) < 5 * err
+        assert np.isclose(self.t.get_location(), (ph0 + shift) % 1)
+
+if __name__ == '__main__':
+    unittest.main()
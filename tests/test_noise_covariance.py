@@ -0,0 +1,119 @@
+"""Test the low-rank plus diagonal noise covariance."""
+import pint.models.model_builder as mb
+import pint.toa as toa
+from pint.noise_covariance import WoodburyCovariance
+from pint.models.noise_model import quantization_epochs, \
+    create_quantization_matrix
+import scipy.sparse as sps
+from pint.residuals import resids
+import numpy as np
+import os, unittest
+
+from pinttestdata import testdir, datadir
+
+os.chdir(datadir)
+
+class TestWoodburyCovariance(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(42)
+        self.n = 300
+        self.Nvec = rs.uniform(1.0, 2.0, self.n)
+        self.T = rs.normal(size=(self.n, 12))
+        self.phi = rs.uniform(0.5, 3.0, 12)
+        self.C = WoodburyCovariance(self.Nvec, self.T, self.phi)
+        self.dense = np.diag(self.Nvec) + \
+            np.dot(self.T * self.phi, self.T.T)
+        self.x = rs.normal(size=self.n)
+        self.X = rs.normal(size=(self.n, 3))
+
+    def test_dense(self):
+        assert np.allclose(self.C.toarray(), self.dense)
+
+    def test_solve(self):
+        assert np.allclose(self.C.solve(self.x),
+                           np.linalg.solve(self.dense, self.x))
+        assert np.allclose(self.C.solve(self.X),
+                           np.linalg.solve(self.dense, self.X))
+
+    def test_logdet_quad_form(self):
+        sign, ld = np.linalg.slogdet(self.dense)
+        assert np.isclose(self.C.logdet(), ld)
+        q = np.dot(self.x, np.linalg.solve(self.dense, self.x))
+        assert np.isclose(self.C.quad_form(self.x), q)
+        lnl = -0.5 * (q + ld + self.n * np.log(2 * np.pi))
+        assert np.isclose(self.C.lnlikelihood(self.x), lnl)
+
+    def test_diagonal(self):
+        C = WoodburyCovariance(self.Nvec)
+        assert C.rank == 0
+        assert np.allclose(C.solve(self.x), self.x / self.Nvec)
+        assert np.isclose(C.logdet(), np.sum(np.log(self.Nvec)))
+
+    def test_ecorr_epochs(self):
+        rs = np.random.RandomState(1)
+        perm = rs.permutation(self.n)
+        epochs = [perm[i:i+4] for i in range(0, 240, 4)]
+        J = rs.uniform(0.5, 2.0, len(epochs))
+        C = WoodburyCovariance(self.Nvec, self.T, self.phi, epochs=epochs,
+                               epoch_weights=J)
+        assert C.rank == self.T.shape[1]
+        dense = self.dense.copy()
+        for e, w in zip(epochs, J):
+            dense[np.ix_(e, e)] += w
+        assert np.allclose(C.toarray(), dense)
+        assert np.allclose(C.solve(self.X), np.linalg.solve(dense, self.X))
+        assert np.isclose(C.logdet(), np.linalg.slogdet(dense)[1])
+        Xs = sps.csc_matrix(self.X * (rs.uniform(size=self.X.shape) < 0.2))
+        assert np.allclose(C.quad_form(Xs, self.x),
+                           np.dot(Xs.toarray().T,
+                                  np.linalg.solve(dense, self.x)))
+
+    def test_overlapping_epochs(self):
+        epochs = [np.arange(5), np.arange(3, 8)]
+        C = WoodburyCovariance(self.Nvec, epochs=epochs,
+                               epoch_weights=[1.0, 2.0])
+        assert C.rank == 2
+        assert np.allclose(C.solve(self.x),
+                           np.linalg.solve(C.toarray(), self.x))
+
+
+class TestQuantization(unittest.TestCase):
+    def test_epochs(self):
+        rs = np.random.RandomState(7)
+        t = np.sort(rs.uniform(0, 50, 400)) * 86400.0
+        t = np.concatenate((t, t[::3] + 0.3, t[::5] + 0.6))
+        rs.shuffle(t)
+        # Reference grouping: each epoch starts at its earliest TOA.
+        isort = np.argsort(t)
+        buckets = [[isort[0]]]
+        for i in isort[1:]:
+            if t[i] - t[buckets[-1][0]] < 1:
+                buckets[-1].append(i)
+            else:
+                buckets.append([i])
+        ref = [sorted(b) for b in buckets if len(b) >= 2]
+        epochs = [sorted(e) for e in quantization_epochs(t)]
+        assert epochs == ref
+        U = create_quantization_matrix(t)
+        assert U.shape == (len(t), len(ref))
+        assert np.all(U.sum(axis=0) == [len(e) for e in ref])
+
+
+class TestModelNoiseCovariance(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.m = mb.get_model('B1855+09_NANOGrav_9yv1.gls.par')
+        self.t = toa.get_TOAs('B1855+09_NANOGrav_9yv1.tim', ephem='DE436')
+
+    def test_matches_covariance_matrix(self):
+        table = self.t.table[:400]
+        cov = self.m.noise_covariance(table)
+        assert np.allclose(cov.toarray(), self.m.covariance_matrix(table),
+                           rtol=1e-10, atol=0)
+
+    def test_chi2(self):
+        r = resids(self.t, self.m)
+        cov = self.m.noise_covariance(self.t.table)
+        tr = r.time_resids.value
+        assert np.isclose(r.chi2, np.dot(tr, cov.solve(tr)))
+        assert np.isfinite(r.lnlikelihood())
@@ -0,0 +1,67 @@
+"""Test the Taylor expansion of the pulse phases."""
+import pint.models.model_builder as mb
+import pint.toa as toa
+from pint.phase_surrogate import PhaseSurrogate
+import numpy as np
+import os, unittest
+
+from pinttestdata import testdir, datadir
+
+os.chdir(datadir)
+
+def phase_diff(a, b):
+    return np.abs(np.mod(a - b + 0.5, 1.0) - 0.5)
+
+class TestPhaseSurrogate(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.m = mb.get_model('NGC6440E.par')
+        self.t = toa.get_TOAs('NGC6440E.tim', ephem='DE421')
+        self.params = ['F0', 'F1', 'DM']
+        self.scales = [1e-10, 1e-18, 1e-2]
+        self.p0 = [getattr(self.m, p).value for p in self.params]
+
+    def tearDown(self):
+        for p, v in zip(self.params, self.p0):
+            getattr(self.m, p).value = v
+
+    def exact(self, values):
+        for p, v in zip(self.params, values):
+            getattr(self.m, p).value = v
+        frac = self.m.phase(self.t.table).frac
+        return np.asarray(getattr(frac, 'value', frac), dtype=np.float64)
+
+    def test_linear(self):
+        s = PhaseSurrogate(self.m, self.t, self.params, scales=self.scales)
+        assert np.all(s.frac0 == self.exact(self.p0))
+        values = [v + 2 * d for v, d in zip(self.p0, self.scales)]
+        assert s.in_trust_region(values)
+        assert phase_diff(s.phases(values), self.exact(values)).max() < 1e-6
+        assert s.nsurrogate == 1
+
+    def test_second_order(self):
+        s = PhaseSurrogate(self.m, self.t, self.params, scales=self.scales,
+                           order=2)
+        assert s.H.shape == (self.t.ntoas, 6)
+        values = [v - 2 * d for v, d in zip(self.p0, self.scales)]
+        assert phase_diff(s.phases(values), self.exact(values)).max() < 1e-6
+        assert np.all(s.frac0 == self.exact(self.p0))
+
+    def test_trust_region(self):
+        s = PhaseSurrogate(self.m, self.t, self.params, scales=self.scales,
+                           trust_radius=3.0)
+        values = list(self.p0)
+        values[0] = values[0] + 5 * self.scales[0]
+        assert not s.in_trust_region(values)
+        self.m.F0.value = values[0]
+        phs = s.model_phases(self.m, self.t)
+        assert s.nexact == 1 and s.nsurrogate == 0
+        assert np.all((phs >= 0) & (phs < 1))
+        assert phase_diff(phs, self.exact(values)).max() < 1e-12
+
+    def test_bad_scales(self):
+        with self.assertRaises(ValueError):
+            PhaseSurrogate(self.m, self.t, self.params, scales=[1, 0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
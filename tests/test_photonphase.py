@@ -7,6 +7,7 @@ except ImportError:
     from io import StringIO
 import unittest
 import numpy as np
+import astropy.io.fits as pyfits
 import pint.scripts.photonphase as photonphase
 from pinttestdata import testdir, datadir
 
@@ -29,6 +30,62 @@ class TestPhotonPhase(unittest.TestCase):
         # # Check that H-test is greater than 725
         # self.assertTrue(v>725)
         # photonphase.sys.stdout = saved_stdout
+    def test_stream_writer(self):
+        hdulist = pyfits.open(eventfile, memmap=True)
+        nrows = len(hdulist[1].data)
+        outfile = os.path.join(testdir, 'photonstream.fits')
+        writer = photonphase._EventStreamWriter(
+            hdulist, outfile, [('PULSE_PHASE', 'D'), ('ABS_PHASE', 'K'),
+                               ('PHA', 'D')])
+        for start in range(0, nrows, 5000):
+            rows = np.arange(start, min(start + 5000, nrows))
+            writer.write(start, {'PULSE_PHASE': rows * 1e-5,
+                                 'ABS_PHASE': rows, 'PHA': rows % 7})
+        writer.close()
+        out = pyfits.open(outfile)
+        assert len(out) == len(hdulist)
+        data = out[1].data
+        assert np.all(data['TIME'] == hdulist[1].data['TIME'])
+        assert np.all(data['PCUID'] == hdulist[1].data['PCUID'])
+        assert np.all(data['PULSE_PHASE'] == np.arange(nrows) * 1e-5)
+        assert np.all(data['ABS_PHASE'] == np.arange(nrows))
+        assert np.all(data['PHA'] == np.arange(nrows) % 7)
+        out.close()
+        hdulist.close()
+        os.remove(outfile)
+
+    def _run_photonphase(self, extra):
+        """Run photonphase on the test events, returning the H-test value
+        and the PULSE_PHASE and ABS_PHASE columns it writes."""
+        outfile = os.path.join(testdir, 'photonchunks.fits')
+        cmd = '{0} {1} --orbfile={2} --absphase --outfile {3} {4}'.format(
+            eventfile, parfile, orbfile, outfile, extra)
+        saved_stdout, photonphase.sys.stdout = photonphase.sys.stdout, \
+            StringIO()
+        try:
+            photonphase.main(cmd.split())
+            lines = photonphase.sys.stdout.getvalue()
+        finally:
+            photonphase.sys.stdout = saved_stdout
+        h = None
+        for l in lines.split('\n'):
+            if l.startswith('Htest'):
+                h = float(l.split()[2])
+        out = pyfits.open(outfile)
+        phases = np.array(out[1].data['PULSE_PHASE'])
+        absphases = np.array(out[1].data['ABS_PHASE'])
+        out.close()
+        os.remove(outfile)
+        return h, phases, absphases
+
+    def test_chunked(self):
+        h, phases, absphases = self._run_photonphase('')
+        for extra in ['--chunksize 5000', '--chunksize 5000 --nproc 2']:
+            hc, phasesc, absphasesc = self._run_photonphase(extra)
+            assert np.allclose(phasesc, phases, rtol=0, atol=1e-9)
+            assert np.all(absphasesc == absphases)
+            # The printed H-test is rounded to two decimals
+            assert abs(hc - h) <= 0.01
 
 if __name__ == '__main__':
     unittest.main()
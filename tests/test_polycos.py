@@ -0,0 +1,77 @@
+"""Test polyco generation and evaluation."""
+from pint.models.polycos import Polycos
+from pint.models import model_builder as mb
+import pint.toa as toa
+import numpy as np
+import os, unittest
+from pinttestdata import testdir, datadir
+os.chdir(datadir)
+
+
+class TestPolycos(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.model = mb.get_model('B1855+09_polycos.par')
+        self.plc = Polycos()
+        self.plc.generate_polycos(self.model, 55000.0, 55000.2, 'ao', 60, 12,
+                                  1400.0)
+        rs = np.random.RandomState(3)
+        self.mjds = np.sort(rs.uniform(55000.0, 55000.2, 20))
+        tl = [toa.TOA((np.floor(m), m - np.floor(m)), obs='ao', freq=1400.0)
+              for m in self.mjds]
+        self.toas = toa.get_TOAs_list(tl)
+
+    def test_segments(self):
+        t = self.plc.polycoTable
+        assert len(t) == 5
+        assert np.allclose(t['t_stop'][:-1], t['t_start'][1:])
+        assert np.isclose(t['t_stop'][-1], 55000.2)
+
+    def test_phase(self):
+        ph = self.model.phase(self.toas.table)
+        order = np.argsort(self.toas.table['index'])
+        frac = ph.frac.value[order]
+        plc_frac = self.plc.eval_phase(self.mjds)
+        diff = np.mod(np.asarray(plc_frac, dtype=float) - frac + 0.5, 1) - 0.5
+        assert np.all(np.abs(diff) < 1e-6)
+
+    def test_input_order(self):
+        perm = np.random.RandomState(5).permutation(len(self.mjds))
+        ph = self.plc.eval_abs_phase(self.mjds)
+        php = self.plc.eval_abs_phase(self.mjds[perm])
+        assert np.all(php.int == ph.int[perm])
+        assert np.all(php.frac == ph.frac[perm])
+        f = self.plc.eval_spin_freq(self.mjds)
+        assert np.all(self.plc.eval_spin_freq(self.mjds[perm]) == f[perm])
+
+    def test_entries(self):
+        ph = self.plc.eval_abs_phase(self.mjds)
+        idx = self.plc.find_entry(self.mjds)
+        entries = self.plc.polycoTable['entry']
+        for i, t in enumerate(self.mjds):
+            e = entries[idx[i]]
+            phe = e.evalabsphase(t)
+            assert ph.int[i] == phe.int[0]
+            assert abs((ph.frac[i] - phe.frac[0]).value) < 1e-12
+            assert np.isclose(self.plc.eval_spin_freq(t)[0], e.evalfreq(t),
+                              rtol=1e-15)
+        with self.assertRaises(ValueError):
+            self.plc.eval_abs_phase(np.array([54999.9, 55000.1]))
+
+    def test_nproc(self):
+        plc = Polycos()
+        plc.generate_polycos(self.model, 55000.0, 55000.2, 'ao', 60, 12,
+                             1400.0, nproc=2)
+        for e1, e2 in zip(plc.polycoTable['entry'],
+                          self.plc.polycoTable['entry']):
+            assert e1.rphase.int == e2.rphase.int
+            assert e1.rphase.frac == e2.rphase.frac
+        # The blocks are fitted separately, so the coefficients can differ
+        # in their last bits, but not the phases they predict
+        ph1 = plc.eval_abs_phase(self.mjds)
+        ph2 = self.plc.eval_abs_phase(self.mjds)
+        assert np.all(ph1.int == ph2.int)
+        assert np.all(np.abs((ph1.frac - ph2.frac).value) < 1e-11)
+
+if __name__ == '__main__':
+    unittest.main()
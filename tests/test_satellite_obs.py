@@ -0,0 +1,83 @@
+"""Test the spacecraft orbit interpolation and ITRS rotation."""
+import os
+import unittest
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import GCRS, ITRS, CartesianRepresentation
+from pint.observatory.satellite_obs import SpacecraftOrbit, \
+    TerrestrialRotation
+from pint.observatory.rxte_obs import RXTEObs
+from pinttestdata import testdir, datadir
+
+orbfile = os.path.join(datadir, 'FPorbit_Day6223')
+
+class TestSpacecraftOrbit(unittest.TestCase):
+    def setUp(self):
+        self.w = 2 * np.pi / 5400.0
+        self.r = 7e6
+        t = np.arange(0, 20000, 30.0)
+        self.mjd0 = 55000.0
+        self.mjd = self.mjd0 + t / 86400.0
+        self.pos, self.vel = self.circular(t)
+        rs = np.random.RandomState(3)
+        self.tq = rs.uniform(100, 19000, 1000)
+
+    def circular(self, t):
+        pos = self.r * np.array([np.cos(self.w * t), np.sin(self.w * t),
+                                 np.zeros_like(t)])
+        vel = self.r * self.w * np.array([-np.sin(self.w * t),
+                                          np.cos(self.w * t),
+                                          np.zeros_like(t)])
+        return pos, vel
+
+    def test_hermite(self):
+        orbit = SpacecraftOrbit(self.mjd, self.pos.T, self.vel.T)
+        pos, vel = orbit.posvel(self.mjd0 + self.tq / 86400.0)
+        pt, vt = self.circular(self.tq)
+        assert np.abs(pos - pt).max() < 0.1
+        assert np.abs(vel - vt).max() < 0.01
+        pos, vel = orbit.posvel(self.mjd[5])
+        assert pos.shape == (3,)
+        assert np.allclose(pos, self.pos[:, 5], rtol=0, atol=1e-6)
+        assert np.allclose(vel, self.vel[:, 5], rtol=0, atol=1e-9)
+
+    def test_spline(self):
+        orbit = SpacecraftOrbit(self.mjd, self.pos.T)
+        pos, vel = orbit.posvel(self.mjd0 + self.tq / 86400.0)
+        pt, vt = self.circular(self.tq)
+        assert np.abs(pos - pt).max() < 0.1
+        assert np.abs(vel - vt).max() < 0.01
+
+
+class TestTerrestrialRotation(unittest.TestCase):
+    def test_astropy(self):
+        rs = np.random.RandomState(5)
+        t = Time(55000 + np.sort(rs.uniform(0, 2, 200)), format='mjd',
+                 scale='tt')
+        pos = rs.normal(size=(3, 200)) * 7e6
+        x, y, z = TerrestrialRotation().gcrs_to_itrs(t, pos)
+        c = GCRS(CartesianRepresentation(pos[0]*u.m, pos[1]*u.m,
+                                         pos[2]*u.m),
+                 obstime=t).transform_to(ITRS(obstime=t))
+        c = c.cartesian
+        assert np.abs(c.x.to(u.m).value - x).max() < 1.0
+        assert np.abs(c.y.to(u.m).value - y).max() < 1.0
+        assert np.abs(c.z.to(u.m).value - z).max() < 1.0
+
+
+class TestRXTEObs(unittest.TestCase):
+    def test_knots(self):
+        obs = RXTEObs(name='RXTE', FPorbname=orbfile)
+        orb = obs.FPorb[10:20]
+        t = Time(np.asarray(orb['MJD_TT']), format='mjd', scale='tt')
+        pos, vel = obs.orbit.posvel(t.mjd)
+        assert np.allclose(pos[0], orb['X'], rtol=0, atol=1e-3)
+        assert np.allclose(vel[2], orb['Vz'], rtol=0, atol=1e-6)
+        loc = obs.earth_location_itrf(t)
+        r = np.sqrt(sum(c.to(u.m).value**2 for c in loc.geocentric))
+        assert np.allclose(r, np.sqrt(orb['X']**2 + orb['Y']**2 +
+                                      orb['Z']**2), rtol=1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
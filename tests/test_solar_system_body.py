@@ -2,8 +2,10 @@
 from __future__ import division, absolute_import, print_function
 
 import unittest
-from astropy.coordinates import solar_system_ephemeris
-from pint.solar_system_ephemerides import objPosVel_wrt_SSB, objPosVel
+from astropy.coordinates import solar_system_ephemeris, get_body_barycentric_posvel
+import astropy.units as u
+from pint.solar_system_ephemerides import objPosVel_wrt_SSB, objPosVel, \
+    load_kernel, set_kernel_dir
 import numpy as np
 import astropy.time as time
 import os
@@ -66,3 +68,38 @@ class TestSolarSystemDynamic(unittest.TestCase):
         assert a.vel.shape == (3, 10000)
         print("value {0}, path {1}".format(solar_system_ephemeris._value,path))
         assert solar_system_ephemeris._value == path
+
+    def test_kernel_registry(self):
+        k1 = load_kernel('de421')
+        k2 = load_kernel('de421')
+        assert k1 is k2
+
+    def test_pinned_dir(self):
+        path = os.path.dirname(datapath('de432s.bsp'))
+        set_kernel_dir(path)
+        try:
+            a = objPosVel_wrt_SSB('earth', self.tdb_time, 'de432s')
+            assert a.pos.shape == (3, 10000)
+            assert solar_system_ephemeris._value == \
+                os.path.join(path, 'de432s.bsp')
+        finally:
+            set_kernel_dir(None)
+
+    def test_pinned_dir_only(self):
+        # A kernel missing from the pinned directory is not taken from the
+        # PINT data directory instead
+        set_kernel_dir(testdir)
+        try:
+            self.assertRaises(ValueError, load_kernel, 'de421')
+        finally:
+            set_kernel_dir(None)
+
+    def test_astropy_agreement(self):
+        for obj in self.planets + ['earth', 'sun']:
+            a = objPosVel_wrt_SSB(obj, self.tdb_time, 'de421')
+            # The astropy ephemeris is set to the same kernel
+            pos, vel = get_body_barycentric_posvel(obj, self.tdb_time)
+            assert np.allclose(a.pos.to(u.km).value, pos.xyz.to(u.km).value,
+                               rtol=0, atol=1e-6)
+            assert np.allclose(a.vel.to(u.km/u.s).value,
+                               vel.xyz.to(u.km/u.s).value, rtol=0, atol=1e-9)
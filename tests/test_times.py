@@ -55,7 +55,7 @@ for line, TOA in zip(goodlines, ts.table):
     # print utils.time_toq_mjd_string(TOA.mjd.tt), line.split()[-1]
     tempo_tt = utils.time_from_mjd_string(line.split()[-1], scale='tt')
     # Ensure that the clock corrections are accurate to better than 0.1 ns
-    assert(math.fabs((oclk*u.s + gps_utc*u.s - TOA['flags']["clkcorr"]).to(u.ns).value) < 0.1)
+    assert(math.fabs((oclk*u.s + gps_utc*u.s - TOA['clkcorr']*u.s).to(u.ns).value) < 0.1)
 
     log.info("TOA in tt difference is: %.2f ns" % \
              ((TOA['mjd'].tt - tempo_tt.tt).sec * u.s).to(u.ns).value)
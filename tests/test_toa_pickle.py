@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 from pint import toa
 import os
+import numpy
 
 import unittest
 from pinttestdata import testdir, datadir
@@ -10,14 +11,15 @@ class TestTOAReader(unittest.TestCase):
     def setUp(self):
         # First, read the TOAs from the tim file.
         # This should also create the pickle file.
-        try:
-            os.remove('test1.tim.pickle.gz')
-            os.remove('test1.tim.pickle')
-        except OSError:
-            pass
+        for f in ('test1.tim.pickle.gz', 'test1.tim.pickle',
+                  'test1.tim.pintcache'):
+            try:
+                os.remove(f)
+            except OSError:
+                pass
         tt = toa.get_TOAs("test1.tim",usepickle=False, include_bipm=False)
         self.numtoas = tt.ntoas
-        del tt
+        self.ref = tt
         # Now read them from the pickle
         self.t = toa.get_TOAs("test1.tim",usepickle=True, include_bipm=False)
 
@@ -26,6 +28,28 @@ class TestTOAReader(unittest.TestCase):
         # of TOAs came out of the pickle as went in.
         assert self.t.ntoas == self.numtoas
 
+    def test_cache_contents(self):
+        # The second read comes from the cache written by the first one
+        t = toa.get_TOAs("test1.tim",usepickle=True, include_bipm=False)
+        for tab in (self.t.table, t.table):
+            assert list(tab['index']) == list(self.ref.table['index'])
+            assert list(tab['flags']) == list(self.ref.table['flags'])
+            assert numpy.all(tab['tdbld'] == self.ref.table['tdbld'])
+            assert numpy.all(tab['ssb_obs_pos'] == self.ref.table['ssb_obs_pos'])
+            for t1, t2 in zip(tab['mjd'], self.ref.table['mjd']):
+                assert t1.scale == t2.scale
+                # The sum jd1 + jd2 only resolves ~40 us; the difference
+                # checks the full two-double precision
+                dt = t1 - t2
+                assert dt.jd1 == 0 and dt.jd2 == 0
+        assert t.commands == self.ref.commands
+
+    def test_cache_options(self):
+        # A different ephemeris must not reuse the cache
+        key1 = toa.toa_cache.cache_key("test1.tim", ephem="de421")
+        key2 = toa.toa_cache.cache_key("test1.tim", ephem="de436")
+        assert key1 != key2
+
 if __name__ == '__main__':
     t = TestTOAReader()
     t.setUp()
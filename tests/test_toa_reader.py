@@ -1,5 +1,6 @@
 from pint import toa
 import os
+import numpy
 
 from pinttestdata import testdir, datadir
 os.chdir(datadir)
@@ -30,6 +31,47 @@ class TestTOAReader:
         assert self.x.table[-1]['flags']["jump"] == 1
     def test_obs(self):
         assert self.x.table[1]["obs"]=="gbt"
+    def test_clkcorr(self):
+        # The TIME statement is part of the clock correction
+        assert "clkcorr" not in self.x.table[3]['flags']
+        assert abs(self.x.table[3]['clkcorr'] - 1.0) < 1e-3
+        assert abs(self.x.table[4]['clkcorr']) < 1e-3
+    def test_jd_columns(self):
+        # The two-double columns follow the clock corrected Time objects
+        for row in self.x.table:
+            assert row['mjd_jd1'] == row['mjd'].jd1
+            assert row['mjd_jd2'] == row['mjd'].jd2
+        tdb = self.x.get_group_time(0, self.x.ntoas, 'tdb')
+        assert tdb.scale == 'tdb'
+        assert numpy.all(numpy.abs(tdb.mjd - self.x.table['tdbld']) < 1e-9)
+
+class TestBuildTOATable:
+    def setUp(self):
+        self.mjds = [(55336, 0.989701997555466), (55336, 0.989701995786016),
+                     (55656, 0.3983754206933)]
+        self.errs = [3.469, 3.291, 2.943]
+        self.freqs = [1404.0, 0.0, 349.999]
+        self.obss = ['gbt', '1', 'ao']
+        self.flags = [{'be': 'GASP'}, {'be': 'GASP'}, {}]
+    def test_same_as_toalist(self):
+        tl = [toa.TOA(m, e, obs=o, freq=f, **fl) for m, e, f, o, fl in
+              zip(self.mjds, self.errs, self.freqs, self.obss, self.flags)]
+        ref = toa.TOAs(toalist=tl).table
+        tab = toa.build_toa_table([m[0] for m in self.mjds],
+                                  [m[1] for m in self.mjds], self.errs,
+                                  self.freqs, self.obss, self.flags)
+        assert list(tab['index']) == list(ref['index'])
+        assert list(tab['obs']) == list(ref['obs'])
+        assert list(tab['flags']) == list(ref['flags'])
+        assert numpy.all(tab['freq'] == ref['freq'])
+        assert numpy.all(tab['error'] == ref['error'])
+        assert numpy.all(tab['mjd_float'] == ref['mjd_float'])
+        assert numpy.all(tab['mjd_jd1'] == ref['mjd_jd1'])
+        assert numpy.all(tab['mjd_jd2'] == ref['mjd_jd2'])
+        for t1, t2 in zip(tab['mjd'], ref['mjd']):
+            assert t1.scale == t2.scale
+            assert t1.jd1 == t2.jd1 and t1.jd2 == t2.jd2
+            assert t1.location == t2.location
 
 if __name__ == '__main__':
     t = TestTOAReader()
@@ -46,3 +88,4 @@ if __name__ == '__main__':
     t.test_time_2()
     t.test_jump_3()
     t.test_obs()
+    t.test_clkcorr()
@@ -45,3 +45,20 @@ class Testwls(unittest.TestCase):
             tol = 2.6
             msg = "Fitting parameter " + p + " failed. with chi2_red " + str(chi2_red)
             assert chi2_red < tol, msg
+
+    def test_sparse_fit(self):
+        # The normal equations with the sparse DMX/JUMP columns give the
+        # same fit as the dense SVD
+        self.f.reset_model()
+        self.f.set_fitparams('F0', 'F1', 'DMX_0003', 'JUMP3')
+        self.f.fit_toas()
+        dense = dict((p, (getattr(self.f.model, p).value,
+                          getattr(self.f.model, p).uncertainty_value))
+                     for p in self.f.get_fitparams())
+        self.f.reset_model()
+        self.f.set_fitparams('F0', 'F1', 'DMX_0003', 'JUMP3')
+        self.f.fit_toas(sparse=True)
+        for p, (v, e) in dense.items():
+            par = getattr(self.f.model, p)
+            assert abs(par.value - v) < 1e-3 * e, p
+            assert abs(par.uncertainty_value - e) < 1e-3 * e, p